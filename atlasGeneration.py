@@ -1,13 +1,24 @@
-from .jmbNumeric import S16_BE
-from .jmbStruct import stFontParam
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from .atlasPacking import AtlasPacker, SkylinePacker, get_packer
+from .jmbCache import DiskCache
+from .jmbNumeric import CtlCode, CtlKind
+from .jmbStruct import FilePayload, stFontParam, stTex, texMeta, texStrImage, texStrImageHeader, SIStrPack, SIStr, SIChr
 from . import jmbConst
 from wand.image import Image
 from wand.color import Color
 from wand.font import Font
 from wand.display import display
 from wand.drawing import Drawing
+from wand.exceptions import WandException
 
-def char_register(input: str) -> tuple[dict[int, str], dict[str, int], str]:
+GLYPH_CACHE_VERSION = 1
+
+def char_register(input: str, base: dict[str, int] | None = None, glyph_num: int | None = None
+                  ) -> tuple[dict[int, str], dict[str, int], str]:
     """
     Register unique characters from input text, create control code mappings.
 
@@ -16,24 +27,35 @@ def char_register(input: str) -> tuple[dict[int, str], dict[str, int], str]:
 
     Args:
         input_text: Input string containing text to process
+        base: Existing char2ctl mapping to extend; its codes are kept and only
+            characters missing from it are registered
+        glyph_num: Index of the first new glyph (defaults to one past the highest glyph index of `base`)
 
     Returns:
         Tuple containing:
         - ctl2char_dict: Mapping from control codes to characters
         - char2ctl_dict: Mapping from characters to control codes
-        - unique_jmk: String containing unique characters in order of appearance
+        - unique_jmk: String containing unique (new, with `base`) characters in order of appearance
 
     Raises:
-        AssertionError: If '@' sequences are malformed
+        AssertionError: If '@' sequences are malformed, or the glyph indices run out
     """
     counter = 0
     unique_jmk = ""
     ctl2char_dict = {}
     char2ctl_dict = {}
-    ctl2char_dict[-3] = " "
-    char2ctl_dict[" "] = -3
-    ctl2char_dict[-4] = "　"
-    char2ctl_dict["　"] = -4
+    ctl2char_dict[CtlCode.SPACE_H] = " "
+    char2ctl_dict[" "] = CtlCode.SPACE_H
+    ctl2char_dict[CtlCode.SPACE_Z] = "　"
+    char2ctl_dict["　"] = CtlCode.SPACE_Z
+    if base is not None:
+        for char, code in base.items():
+            char2ctl_dict[char] = code
+            ctl2char_dict.setdefault(code, char)
+            counter = max(counter, CtlCode(code).glyph_index + 1)
+    if glyph_num is not None:
+        assert glyph_num >= counter, f"glyph_num {glyph_num} overlaps the existing glyphs (0..{counter - 1})"
+        counter = glyph_num
 
     i = 0
     while i < len(input):
@@ -47,7 +69,7 @@ def char_register(input: str) -> tuple[dict[int, str], dict[str, int], str]:
             continue
 
         if char == "、" or char == "。":
-            char2ctl_dict[char] = -3
+            char2ctl_dict[char] = CtlCode.SPACE_H
             i += 1
             continue
 
@@ -58,25 +80,32 @@ def char_register(input: str) -> tuple[dict[int, str], dict[str, int], str]:
         if char not in char2ctl_dict:
             unique_jmk += char
             if char == "殺":
-                counter_s16 = S16_BE(counter)
-                signed = (counter_s16 | jmbConst.SATSU_FLAG).to_int()
-                ctl2char_dict[signed] = char
-                char2ctl_dict[char] = signed
+                kind = CtlKind.SATSU
             elif char == "死":
-                counter_s16 = S16_BE(counter)
-                signed = (counter_s16 | jmbConst.SHI_FLAG).to_int()
-                ctl2char_dict[signed] = char
-                char2ctl_dict[char] = signed
+                kind = CtlKind.SHI
             else:
-                ctl2char_dict[counter] = char
-                char2ctl_dict[char] = counter
+                kind = CtlKind.GLYPH
+            assert counter <= CtlCode.GLYPH_MASK, f"too many glyphs: {counter + 1}"
+            signed = int(CtlCode.glyph(counter, kind))
+            ctl2char_dict[signed] = char
+            char2ctl_dict[char] = signed
             counter += 1
         i += 1
 
     return ctl2char_dict, char2ctl_dict, unique_jmk
 
 
-def gen_char_image_US(char: str, font_size: int, font_path: str, debug: bool = False) -> Image:
+def _glyph_drawing(font_path: str, font_size: int) -> Drawing:
+    """
+    Drawing with the glyph font settings, reused for measuring and as the template of every glyph
+    """
+    draw = Drawing()
+    draw.font = font_path
+    draw.font_size = font_size
+    return draw
+
+def gen_char_image_US(char: str, font_size: int, font_path: str, debug: bool = False,
+                      font: Font | None = None, draw: Drawing | None = None) -> Image:
     """
     Generate a single character image with proper metrics and cropping.
 
@@ -88,6 +117,8 @@ def gen_char_image_US(char: str, font_size: int, font_path: str, debug: bool = F
         font_size: Font size in pixels
         font_path: Path to font file
         debug: If True, adds a red bounding box for visualization
+        font: Preloaded Font of font_path/font_size, reused across calls (see rasterize_glyphs)
+        draw: Drawing from _glyph_drawing(font_path, font_size), reused across calls (never drawn on)
 
     Returns:
         Wand Image object containing the rendered character
@@ -96,26 +127,33 @@ def gen_char_image_US(char: str, font_size: int, font_path: str, debug: bool = F
         AssertionError: If input is not a single character
     """
     assert len(char) == 1, f"Please input single character: {char}"
-    img = Image(width=font_size*16, height=font_size*16, background=Color('transparent'))
-
-    img.font = Font(
-        path=font_path,
-        color = Color('white'),
-        size = font_size
-    )
-
-    with Drawing() as draw:
-        draw.font = font_path
-        draw.font_size = img.font_size
-        metrics = draw.get_font_metrics(img, char)
-        text_width = int(metrics.text_width)
-        text_height = int(metrics.ascender - metrics.descender)
+    if font is None:
+        font = Font(
+            path=font_path,
+            color = Color('white'),
+            size = font_size
+        )
+
+    if draw is None:
+        with _glyph_drawing(font_path, font.size) as draw:
+            return gen_char_image_US(char, font_size, font_path, debug, font, draw)
+
+    # NOTE: 先在1x1的图上测量，再直接画到裁剪后的大小，不再分配font_size*16的正方形画布
+    with Image(width=1, height=1) as probe:
+        probe.font = font
+        metrics = draw.get_font_metrics(probe, char)
+    text_width = max(int(metrics.text_width), 1)
+    text_height = max(int(metrics.ascender - metrics.descender), 1)
+
+    img = Image(width=text_width, height=text_height, background=Color('transparent'))
+    img.font = font
+    # NOTE: 文字指令画在副本上，共用的draw保持只有字体设置
+    with draw.clone() as text:
         x_offset = 0
         y_offset = int(metrics.ascender)
-        draw.text(x_offset, y_offset, char)
-        draw(img)
+        text.text(x_offset, y_offset, char)
+        text(img)
 
-    img.crop(0, 0, width=text_width, height=text_height)
     # bounding box indicator
     if debug:
         with Drawing() as draw:
@@ -129,6 +167,140 @@ def gen_char_image_US(char: str, font_size: int, font_path: str, debug: bool = F
 
     return img
 
+class GlyphCache(DiskCache):
+    """
+    On-disk cache of gen_char_image_US results, shared across gen_atlas_US calls and runs.
+
+    Entries are keyed by (font file content hash, font size, character, debug) and stored as
+    cropped PNGs, so the glyph metrics (its size) come back with the bitmap. Entries are
+    evicted least recently used first once they exceed `max_bytes` in total.
+    """
+    def __init__(self, directory: str, max_bytes: int = 64 << 20):
+        super().__init__(directory, max_bytes, '.png')
+        self._font_hashes : dict[tuple, str] = {}
+
+    def font_hash(self, font_path: str) -> str:
+        """
+        SHA-256 of the font file, computed once per (path, size, mtime)
+        """
+        st = os.stat(font_path)
+        stamp = (os.path.abspath(font_path), st.st_size, st.st_mtime_ns)
+        digest = self._font_hashes.get(stamp)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(font_path, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(FilePayload.COPY_CHUNK), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            self._font_hashes[stamp] = digest
+        return digest
+
+    def _glyph_path(self, char: str, font_size: int, font_path: str, debug: bool) -> str:
+        key = f"v{GLYPH_CACHE_VERSION}\0{self.font_hash(font_path)}\0{font_size}\0{ord(char)}\0{int(debug)}"
+        return self._key_path(hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, char: str, font_size: int, font_path: str, debug: bool = False) -> Image | None:
+        entry_path = self._glyph_path(char, font_size, font_path, debug)
+        blob = self._read_bytes(entry_path)
+        if blob is None:
+            return None
+        try:
+            return Image(blob=blob)
+        except WandException:
+            # 损坏的条目直接丢弃
+            os.remove(entry_path)
+            return None
+
+    def put(self, char: str, font_size: int, font_path: str, debug: bool, blob: bytes):
+        self._write_bytes(self._glyph_path(char, font_size, font_path, debug), blob)
+
+    def render(self, char: str, font_size: int, font_path: str, debug: bool = False) -> Image:
+        """
+        Same as gen_char_image_US, but only rasterizes characters missing from the cache.
+        """
+        img = self.get(char, font_size, font_path, debug)
+        if img is None:
+            img = gen_char_image_US(char, font_size, font_path, debug)
+            self.put(char, font_size, font_path, debug, img.make_blob('png'))
+        return img
+
+# font and configured Drawing of the rasterize_glyphs worker process (live until the worker exits)
+_worker_font : Font | None = None
+_worker_draw : Drawing | None = None
+
+def _init_rasterizer(font_path: str, font_size: int):
+    global _worker_font, _worker_draw
+    _worker_font = Font(path=font_path, color=Color('white'), size=font_size)
+    _worker_draw = _glyph_drawing(font_path, font_size)
+
+def _rasterize_chunk(chars: str, font_size: int, font_path: str, debug: bool) -> list[bytes]:
+    blobs = []
+    for char in chars:
+        with gen_char_image_US(char, font_size, font_path, debug, _worker_font, _worker_draw) as img:
+            blobs.append(img.make_blob('png'))
+    return blobs
+
+def rasterize_glyphs(
+    chars: str,
+    font_size: int,
+    font_path: str,
+    debug: bool = False,
+    workers: int | None = 1,
+    glyph_cache: GlyphCache | None = None
+    ) -> list[Image]:
+    """
+    Render every character of `chars` with gen_char_image_US, in parallel.
+
+    Characters found in `glyph_cache` are not rendered again; the others are split into chunks
+    rendered by a process pool whose workers set up the font and Drawing once. Results (and cache writes)
+    are collected in input order, so the output does not depend on `workers`.
+    On Windows the calling script needs an `if __name__ == "__main__":` guard when workers > 1.
+
+    Args:
+        chars: Characters to render
+        font_size: Font size in pixels
+        font_path: Path to font file
+        debug: If True, adds a red bounding box for visualization
+        workers: Number of processes (None: one per CPU, 1: render in this process)
+        glyph_cache: Cache to read glyphs from and store newly rendered ones into
+
+    Returns:
+        One Wand Image per character of `chars`, in the same order (the caller closes them)
+    """
+    glyphs : list[Image | None] = [None] * len(chars)
+    missing = []
+    for i, char in enumerate(chars):
+        if glyph_cache is not None:
+            glyphs[i] = glyph_cache.get(char, font_size, font_path, debug)
+        if glyphs[i] is None:
+            missing.append(i)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(missing) <= 1:
+        if not missing:
+            return glyphs
+        font = Font(path=font_path, color=Color('white'), size=font_size)
+        with _glyph_drawing(font_path, font_size) as draw:
+            for i in missing:
+                glyphs[i] = gen_char_image_US(chars[i], font_size, font_path, debug, font, draw)
+                if glyph_cache is not None:
+                    glyph_cache.put(chars[i], font_size, font_path, debug, glyphs[i].make_blob('png'))
+        return glyphs
+
+    # NOTE: 每个worker分几块，避免单个字符一次IPC
+    chunk_size = -(-len(missing) // (workers * 4))
+    chunks = [missing[k:k + chunk_size] for k in range(0, len(missing), chunk_size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             initializer=_init_rasterizer, initargs=(font_path, font_size)) as pool:
+        results = pool.map(_rasterize_chunk, [''.join(chars[i] for i in chunk) for chunk in chunks],
+                           repeat(font_size), repeat(font_path), repeat(debug))
+        for chunk, blobs in zip(chunks, results):
+            for i, blob in zip(chunk, blobs):
+                glyphs[i] = Image(blob=blob)
+                if glyph_cache is not None:
+                    glyph_cache.put(chars[i], font_size, font_path, debug, blob)
+    return glyphs
+
 def gen_atlas_US(
     font_path: str,
     unique_chars: str,
@@ -137,13 +309,18 @@ def gen_atlas_US(
     scale_factor: int,
 
     max_width: int = jmbConst.JIMAKU_TEX_WIDTH,
-    debug: bool = False
+    debug: bool = False,
+    glyph_cache: GlyphCache | None = None,
+    workers: int | None = 1,
+    packer: str | AtlasPacker = 'shelf'
     ) -> tuple[Image, list[stFontParam]]:
     """
     Generate a texture atlas containing all unique characters.
 
     Creates a packed texture atlas with characters arranged, and calculates
     font parameters for each character's position and dimensions in the atlas.
+    Glyphs are rasterized first (in parallel, see rasterize_glyphs), then laid out by `packer`
+    and composited onto a canvas of exactly the packed size, so the result does not depend on `workers`.
 
     Args:
         font_path: Path to font file
@@ -153,6 +330,10 @@ def gen_atlas_US(
         scale_factor: Scaling factor
         max_width: Maximum width of the atlas texture
         debug: Enable debug visualization for character images (red border)
+        glyph_cache: Reuse glyphs rendered by earlier calls/runs (only new characters are rasterized)
+        workers: Rasterization processes (None: one per CPU, 1: render in this process)
+        packer: 'shelf' (original row layout), 'skyline', or an AtlasPacker instance, whose
+            `result` (PackResult, with the occupancy) is kept after the call
 
     Returns:
         Tuple containing:
@@ -163,53 +344,408 @@ def gen_atlas_US(
         AssertionError: If generated character height doesn't match expected scaled height
     """
 
-    ORI_HEIGHT = original_char_height
-    PHY_HEIGHT = ORI_HEIGHT * scale_factor
-    ORI_MAX_WIDTH = max_width
-    PHY_MAX_WIDTH = ORI_MAX_WIDTH * scale_factor
+    glyphs = rasterize_glyphs(unique_chars, scaled_font_size, font_path, debug, workers, glyph_cache)
+    for char_img in glyphs:
+        _check_glyph_height(char_img, original_char_height, scaled_font_size, scale_factor)
+    try:
+        return compose_atlas_US(glyphs, scale_factor, max_width, packer)
+    finally:
+        for char_img in glyphs:
+            char_img.close()
+
+def _check_glyph_height(char_img: Image, original_char_height: int, scaled_font_size: int, scale_factor: int):
+    phy_char_h = char_img.height
+    assert phy_char_h // scale_factor == original_char_height, \
+        f"Character height validation failed: {phy_char_h}px // {scale_factor} = {phy_char_h // scale_factor}, " \
+        f"expected {original_char_height}. Ensure font size [{scaled_font_size}] produces " \
+        f"height around [{original_char_height * scale_factor}px] when scaled."
+
+def compose_atlas_US(
+    glyphs: list[Image],
+    scale_factor: int,
+    max_width: int = jmbConst.JIMAKU_TEX_WIDTH,
+    packer: str | AtlasPacker = 'shelf'
+    ) -> tuple[Image, list[stFontParam]]:
+    """
+    Pack already rasterized glyphs into a new atlas (the packing stage of gen_atlas_US).
 
-    canvas_width = PHY_MAX_WIDTH
-    canvas_height = PHY_HEIGHT * ((len(unique_chars) // 8)+1)
-    canvas = Image(width=canvas_width, height=canvas_height, background=Color('transparent'))
+    Args:
+        glyphs: Glyph images (see rasterize_glyphs); they are not closed, so they can be reused
+        scale_factor: Scaling factor
+        max_width: Maximum width of the atlas texture
+        packer: 'shelf', 'skyline', or an AtlasPacker instance (see gen_atlas_US)
 
-    phy_current_x = 0
-    phy_current_y = 0
-    row_count = 0
-    col_count = 0
-    phy_current_max_width = 0
-    fontParams : list[stFontParam] = []
+    Returns:
+        Tuple containing:
+        - canvas: Image object containing the packed character atlas
+        - fontParams: List of stFontParam objects, in the order of `glyphs`
+    """
+    PHY_MAX_WIDTH = max_width * scale_factor
+    packer = get_packer(packer)
 
-    FUNC_PADDING = lambda x: ((x + scale_factor - 1) // scale_factor) * scale_factor
+    # NOTE: 高度按fParam实际覆盖的区域（向下取整）参与排布
+    sizes = [(img.width, img.height // scale_factor * scale_factor) for img in glyphs]
+    result = packer.pack(sizes, PHY_MAX_WIDTH, scale_factor)
 
-    for char in unique_chars:
-        char_img = gen_char_image_US(char, scaled_font_size, font_path, debug)
+    canvas = Image(width=result.width, height=result.height, background=Color('transparent'))
+    fontParams : list[stFontParam] = []
+    for char_img, (phy_x, phy_y) in zip(glyphs, result.positions):
         phy_char_w, phy_char_h = char_img.size
-        assert phy_char_h // scale_factor == original_char_height, \
-            f"Character height validation failed: {phy_char_h}px // {scale_factor} = {phy_char_h // scale_factor}, " \
-            f"expected {original_char_height}. Ensure font size [{scaled_font_size}] produces " \
-            f"height around [{original_char_height * scale_factor}px] when scaled."
-
-        if phy_current_x + phy_char_w >= PHY_MAX_WIDTH:
-            phy_current_x = 0
-            phy_current_y += PHY_HEIGHT
-            row_count += 1
-            col_count = 0
-
-        canvas.composite(char_img, left=phy_current_x, top=phy_current_y)
-        char_img.close()
+        canvas.composite(char_img, left=phy_x, top=phy_y)
         fontParams.append(stFontParam(
-            u=phy_current_x // scale_factor,
-            v=phy_current_y // scale_factor,
-            w=phy_char_w    // scale_factor,
-            h=phy_char_h    // scale_factor,
+            u=phy_x      // scale_factor,
+            v=phy_y      // scale_factor,
+            w=phy_char_w // scale_factor,
+            h=phy_char_h // scale_factor,
         ))
 
-        phy_current_x = FUNC_PADDING(phy_current_x + phy_char_w)
-        col_count += 1
-        phy_current_max_width = max(phy_current_max_width, phy_current_x)
+    return canvas, fontParams
+
+
+class AtlasUpdate:
+    """
+    Result of update_atlas_US.
+
+    Only the rows from `top` down differ from the original atlas: encode band() to DDS with the same
+    settings as the original texture and pass it to BaseGdat.splice_tex(dds_path, top), so the rows
+    above are neither re-encoded nor recompressed. top == 0 means the whole texture changed (e.g. it got wider).
+    """
+    # NOTE: BC格式的DDS以4x4像素为一个块
+    DDS_BLOCK = 4
+
+    def __init__(self, canvas: Image, fontParams: list[stFontParam], ctl2char: dict[int, str],
+                 char2ctl: dict[str, int], new_chars: str, top: int):
+        self.canvas = canvas            # whole updated atlas
+        self.fontParams = fontParams    # original fontParams + one appended entry per new character
+        self.ctl2char = ctl2char
+        self.char2ctl = char2ctl        # original codes unchanged, new characters appended
+        self.new_chars = new_chars
+        self.top = top                  # first changed row (physical pixels, on a DDS block boundary)
+
+    def band(self) -> Image:
+        """
+        rows of the canvas from `top` down
+        """
+        return self.canvas[0:self.canvas.width, self.top:self.canvas.height]
+
+def update_atlas_US(
+    atlas: Image,
+    fontParams: list[stFontParam],
+    char2ctl_lookup: dict[str, int],
+    text: str,
+    font_path: str,
+    original_char_height: int,
+    scaled_font_size: int,
+    scale_factor: int,
+
+    max_width: int = jmbConst.JIMAKU_TEX_WIDTH,
+    debug: bool = False,
+    glyph_cache: GlyphCache | None = None,
+    workers: int | None = 1
+    ) -> AtlasUpdate | None:
+    """
+    Add the characters of `text` missing from an existing atlas, keeping every existing control code.
 
-    actual_height = phy_current_y + PHY_HEIGHT
-    actual_width = FUNC_PADDING(phy_current_max_width)
-    canvas.crop(0, 0, width=actual_width, height=actual_height)
+    New glyphs are placed in the free space after the existing ones (SkylinePacker around the
+    current fontParams), within the current atlas width when they fit, so that only the rows
+    from the first new glyph down change; the atlas grows downwards if needed.
 
-    return canvas, fontParams
\ No newline at end of file
+    Args:
+        atlas: Image of the current atlas (physical size, e.g. the PNG saved by gen_atlas_US)
+        fontParams: Current font parameters of the JMB
+        char2ctl_lookup: Character to control code mapping the JMB was encoded with
+        text: Text to support (characters already registered are skipped)
+        font_path: Path to font file
+        original_char_height: Target character height before upscaling
+        scaled_font_size: Font size for rendering
+        scale_factor: Scaling factor
+        max_width: Maximum width of the atlas texture
+        debug: Enable debug visualization for character images (red border)
+        glyph_cache: Reuse glyphs rendered by earlier calls/runs (see GlyphCache)
+        workers: Rasterization processes (see rasterize_glyphs)
+
+    Returns:
+        AtlasUpdate with the new atlas, fontParams and mappings, and the first changed row;
+        None if every character of `text` is already in the atlas (nothing to update)
+
+    Raises:
+        AssertionError: If generated character height doesn't match expected scaled height
+    """
+    ctl2char, char2ctl, new_chars = char_register(text, char2ctl_lookup, glyph_num=len(fontParams))
+    if not new_chars:
+        return None
+    glyphs = rasterize_glyphs(new_chars, scaled_font_size, font_path, debug, workers, glyph_cache)
+    for char_img in glyphs:
+        _check_glyph_height(char_img, original_char_height, scaled_font_size, scale_factor)
+
+    sizes = [(img.width, img.height // scale_factor * scale_factor) for img in glyphs]
+    # NOTE: fParam的宽度是向下取整的，原图中字形可能再多占一个单位
+    occupied = [(p.u * scale_factor, p.v * scale_factor, (p.w + 1) * scale_factor, p.h * scale_factor)
+                for p in fontParams]
+    phy_width = atlas.width
+    if any(w > phy_width for w, h in sizes):
+        phy_width = max_width * scale_factor
+    result = SkylinePacker().pack(sizes, phy_width, scale_factor, occupied)
+
+    width = max(atlas.width, result.width)
+    height = max(atlas.height, result.height)
+    canvas = Image(width=width, height=height, background=Color('transparent'))
+    canvas.composite(atlas, left=0, top=0)
+    new_fontParams = list(fontParams)
+    for char_img, (phy_x, phy_y) in zip(glyphs, result.positions):
+        canvas.composite(char_img, left=phy_x, top=phy_y)
+        new_fontParams.append(stFontParam(
+            u=phy_x           // scale_factor,
+            v=phy_y           // scale_factor,
+            w=char_img.width  // scale_factor,
+            h=char_img.height // scale_factor,
+        ))
+        char_img.close()
+
+    if width != atlas.width:
+        top = 0
+    else:
+        top = min(y for x, y in result.positions) // AtlasUpdate.DDS_BLOCK * AtlasUpdate.DDS_BLOCK
+    return AtlasUpdate(canvas, new_fontParams, ctl2char, char2ctl, new_chars, top)
+
+class AtlasGroup:
+    """
+    One atlas of gen_atlases_US and the files using it.
+    """
+    def __init__(self, names: list[str], canvas: Image, fontParams: list[stFontParam],
+                 ctl2char: dict[int, str], char2ctl: dict[str, int], unique_chars: str):
+        self.names = names              # keys of the translations sharing this atlas
+        self.canvas = canvas
+        self.fontParams = fontParams
+        self.ctl2char = ctl2char
+        self.char2ctl = char2ctl        # encodes the text of every file in `names`
+        self.unique_chars = unique_chars
+
+    def __repr__(self):
+        return f"AtlasGroup({len(self.names)} files, {len(self.unique_chars)} glyphs, {self.canvas.width}x{self.canvas.height})"
+
+def _group_files(file_chars: dict[str, str], sizes: dict[str, tuple[int, int]], scale_factor: int,
+                 max_width: int, max_height: int, packer: AtlasPacker) -> list[list[str]]:
+    """
+    consecutive files whose glyph union still packs into max_width x max_height (next-fit)
+    """
+    groups = []
+    group, group_chars = [], {}
+    for name, chars in file_chars.items():
+        candidate = {**group_chars, **dict.fromkeys(chars)}
+        if group and len(candidate) > CtlCode.GLYPH_MASK + 1:
+            fits = False
+        elif group:
+            result = packer.pack([sizes[ch] for ch in candidate], max_width * scale_factor, scale_factor)
+            fits = result.height <= max_height * scale_factor
+        else:
+            fits = True
+        if not fits:
+            groups.append(group)
+            group, candidate = [], dict.fromkeys(chars)
+        group.append(name)
+        group_chars = candidate
+    if group:
+        groups.append(group)
+    return groups
+
+def gen_atlases_US(
+    translations: dict[str, str],
+    font_path: str,
+    original_char_height: int,
+    scaled_font_size: int,
+    scale_factor: int,
+
+    max_width: int = jmbConst.JIMAKU_TEX_WIDTH,
+    shared: bool = False,
+    max_height: int = jmbConst.JIMAKU_TEX_WIDTH,
+    debug: bool = False,
+    glyph_cache: GlyphCache | None = None,
+    workers: int | None = 1,
+    packer: str | AtlasPacker = 'shelf'
+    ) -> list[AtlasGroup]:
+    """
+    Generate the atlases of many JMB files, rasterizing each distinct glyph only once.
+
+    The glyph union of all files is rendered in one rasterize_glyphs pass; each atlas is then
+    packed from those shared rasters. With shared=True, consecutive files (in the order of
+    `translations`) are grouped while their combined glyphs still fit in max_width x max_height,
+    and each group gets a single atlas and control code mapping (one texture to convert per group).
+
+    Args:
+        translations: File name -> flattened translated text of that file
+        font_path: Path to font file
+        original_char_height: Target character height before upscaling
+        scaled_font_size: Font size for rendering
+        scale_factor: Scaling factor
+        max_width: Maximum width of the atlas texture
+        shared: Share one atlas between consecutive files that fit together
+        max_height: Maximum height of a shared atlas (texture units)
+        debug: Enable debug visualization for character images (red border)
+        glyph_cache: Reuse glyphs rendered by earlier calls/runs (see GlyphCache)
+        workers: Rasterization processes (see rasterize_glyphs)
+        packer: Atlas layout (see gen_atlas_US)
+
+    Returns:
+        One AtlasGroup per atlas (per file when shared=False), in the order of `translations`
+
+    Raises:
+        AssertionError: If generated character height doesn't match expected scaled height
+    """
+    file_chars = {name: char_register(text)[2] for name, text in translations.items()}
+    union = ''.join(dict.fromkeys(ch for chars in file_chars.values() for ch in chars))
+    glyphs = rasterize_glyphs(union, scaled_font_size, font_path, debug, workers, glyph_cache)
+    try:
+        for char_img in glyphs:
+            _check_glyph_height(char_img, original_char_height, scaled_font_size, scale_factor)
+        by_char = dict(zip(union, glyphs))
+        if shared:
+            sizes = {ch: (img.width, img.height // scale_factor * scale_factor) for ch, img in by_char.items()}
+            groups = _group_files(file_chars, sizes, scale_factor, max_width, max_height, get_packer(packer))
+        else:
+            groups = [[name] for name in translations]
+
+        atlases = []
+        for names in groups:
+            ctl2char, char2ctl, unique_chars = char_register(''.join(translations[name] for name in names))
+            canvas, fontParams = compose_atlas_US([by_char[ch] for ch in unique_chars], scale_factor, max_width, packer)
+            atlases.append(AtlasGroup(names, canvas, fontParams, ctl2char, char2ctl, unique_chars))
+        return atlases
+    finally:
+        for char_img in glyphs:
+            char_img.close()
+
+def strimage_unique_chars(packs: list[list[str]]) -> str:
+    """
+    Unique characters of all strings of all packs, in order of first appearance.
+    """
+    return ''.join(dict.fromkeys(ch for pack in packs for text in pack for ch in text))
+
+def build_strimage(
+    packs: list[list[str]],
+    unique_chars: str,
+    fontParams: list[stFontParam],
+    original_char_height: int,
+    tume: int = 0,
+    base: texStrImage | None = None,
+    ) -> texStrImage:
+    """
+    Build the STRIMAGE tables for `packs` on an existing glyph atlas.
+
+    Identical strings share one SIStr, every character one SIChr (placed at its fParam).
+
+    Args:
+        packs: String packs; each pack is a list of strings
+        unique_chars: Characters of the atlas, in the order of `fontParams`
+        fontParams: Position and size of each character in the atlas (texture units)
+        original_char_height: STRIMAGE line height
+        tume: Extra spacing between characters
+        base: Original STRIMAGE to copy the texture header (magic/encoding) from
+
+    Returns:
+        texStrImage with an empty texture; call `tex.replace_dds()` with the converted atlas before writing
+
+    Raises:
+        AssertionError: If a pack, a string or the number of packs exceeds the STRIMAGE limits
+    """
+    assert len(unique_chars) == len(fontParams), f"{len(unique_chars)=} != {len(fontParams)=}"
+    assert len(packs) <= jmbConst.STRIMAGE_MAXSTRPACKNUM, f"too many string packs: {len(packs)}"
+
+    chr_index = {}
+    chb = []
+    for ch, param in zip(unique_chars, fontParams):
+        if ch in chr_index:
+            continue
+        si_chr = SIChr()
+        si_chr.code = si_chr.code2 = ord(ch)
+        si_chr.x, si_chr.y, si_chr.w, si_chr.h = param.u, param.v, param.w, param.h
+        si_chr.addx = param.w
+        chr_index[ch] = len(chb)
+        chb.append(si_chr)
+
+    str_index = {}
+    strs = []
+    strpacks = []
+    for pack in packs:
+        # NOTE: 两张索引表都以-1结尾并填充
+        assert len(pack) < jmbConst.STRIMAGE_SIMAXSTRNUM, f"too many strings in one pack: {len(pack)}"
+        si_pack = SIStrPack()
+        for text in pack:
+            if text not in str_index:
+                assert len(text) < jmbConst.STRIMAGE_SIMAXSTRCHRNUM, f"string too long: {text}"
+                si_str = SIStr()
+                si_str.strIndex = [chr_index[ch] for ch in text]
+                si_str.strIndex += [-1] * (jmbConst.STRIMAGE_SIMAXSTRCHRNUM - len(text))
+                str_index[text] = len(strs)
+                strs.append(si_str)
+            si_pack.strIndex.append(str_index[text])
+        si_pack.strIndex += [-1] * (jmbConst.STRIMAGE_SIMAXSTRNUM - len(pack))
+        strpacks.append(si_pack)
+
+    strimage = texStrImage()
+    strimage.header = texStrImageHeader()
+    strimage.header.magic = b'STRIMAGE'
+    strimage.header.height = original_char_height
+    strimage.header.strPackNum = len(strpacks)
+    strimage.header.strNum = len(strs)
+    strimage.header.chrNum = len(chb)
+    strimage.header.tume = tume
+    strimage.strpack = strpacks
+    strimage.str = strs
+    strimage.chb = chb
+
+    strimage.tex = stTex()
+    strimage.tex.header = texMeta()
+    strimage.tex.header.magic = b'GCT0'
+    if base is not None:
+        strimage.tex.header.magic = base.tex.header.magic
+        strimage.tex.header.encoding = base.tex.header.encoding
+    strimage.tex.dds = b''
+    return strimage
+
+def gen_strimage(
+    packs: list[list[str]],
+    font_path: str,
+    original_char_height: int,
+    scaled_font_size: int,
+    scale_factor: int,
+
+    max_width: int = jmbConst.JIMAKU_TEX_WIDTH,
+    tume: int = 0,
+    base: texStrImage | None = None,
+    debug: bool = False,
+    glyph_cache: GlyphCache | None = None,
+    workers: int | None = 1,
+    packer: str | AtlasPacker = 'shelf'
+    ) -> tuple[texStrImage, Image]:
+    """
+    Generate a new STRIMAGE (tables + glyph atlas) from translated string packs.
+
+    Glyphs are deduplicated across all packs and packed into one atlas with gen_atlas_US.
+
+    Args:
+        packs: String packs; each pack is a list of strings
+        font_path: Path to font file
+        original_char_height: Target character height before upscaling
+        scaled_font_size: Font size for rendering
+        scale_factor: Scaling factor
+        max_width: Maximum width of the atlas texture
+        tume: Extra spacing between characters
+        base: Original STRIMAGE to copy the texture header from
+        debug: Enable debug visualization for character images (red border)
+        glyph_cache: Reuse glyphs rendered by earlier calls/runs (see GlyphCache)
+        workers: Rasterization processes (see rasterize_glyphs)
+        packer: Atlas layout (see gen_atlas_US)
+
+    Returns:
+        Tuple containing:
+        - strimage: texStrImage with an empty texture (see build_strimage)
+        - canvas: Image object containing the packed character atlas
+    """
+    unique_chars = strimage_unique_chars(packs)
+    canvas, fontParams = gen_atlas_US(font_path, unique_chars, original_char_height,
+                                      scaled_font_size, scale_factor, max_width, debug, glyph_cache, workers, packer)
+    strimage = build_strimage(packs, unique_chars, fontParams, original_char_height, tume, base)
+    strimage.tex.header.w = canvas.width // scale_factor
+    strimage.tex.header.h = canvas.height // scale_factor
+    return strimage, canvas
@@ -0,0 +1,172 @@
+"""
+Rectangle packers placing glyph images into an atlas of bounded width (see atlasGeneration.gen_atlas_US).
+
+Everything is in physical (upscaled) pixels; positions are multiples of `align` (the scale factor),
+so that they stay exact in texture units.
+"""
+from abc import ABC, abstractmethod
+
+class PackResult:
+    def __init__(self, positions: list[tuple[int, int]], width: int, height: int, used_area: int):
+        self.positions = positions      # (x, y) of each rectangle, in input order
+        self.width = width              # final atlas size, multiples of align
+        self.height = height
+        self.used_area = used_area      # total area of the packed rectangles
+
+    @property
+    def occupancy(self) -> float:
+        """
+        fraction of the atlas covered by rectangles
+        """
+        area = self.width * self.height
+        return self.used_area / area if area else 0.0
+
+    def __repr__(self):
+        return f"PackResult({len(self.positions)} rects, {self.width}x{self.height}, occupancy={self.occupancy:.1%})"
+
+def _align_up(x: int, align: int) -> int:
+    return (x + align - 1) // align * align
+
+class AtlasPacker(ABC):
+    """
+    Base class of the packers; pack() also keeps its result in self.result.
+    """
+    def __init__(self):
+        self.result : PackResult | None = None
+
+    def pack(self, sizes: list[tuple[int, int]], max_width: int, align: int = 1,
+             occupied: list[tuple[int, int, int, int]] = ()) -> PackResult:
+        """
+        Place `sizes` (w, h) around the `occupied` rectangles (x, y, w, h) already in the atlas;
+        the result's size and used area include the occupied rectangles.
+        """
+        for w, h in sizes:
+            assert 0 < _align_up(w, align) <= max_width, f"rectangle wider than the atlas: {w} > {max_width}"
+        occupied = [(x, y, min(w, max_width - x), h) for x, y, w, h in occupied]
+        result = self._pack(sizes, max_width, align, occupied)
+        result.width = max([result.width] + [_align_up(x + w, align) for x, y, w, h in occupied])
+        result.height = max([result.height] + [_align_up(y + h, align) for x, y, w, h in occupied])
+        result.used_area += sum(w * h for x, y, w, h in occupied)
+        self.result = result
+        return result
+
+    @abstractmethod
+    def _pack(self, sizes: list[tuple[int, int]], max_width: int, align: int, occupied: list) -> PackResult:
+        pass
+
+class ShelfPacker(AtlasPacker):
+    """
+    Next-fit shelves in input order; each shelf is as tall as its tallest rectangle.
+    With equal heights this is the original gen_atlas_US layout.
+    The first shelf starts below all occupied rectangles.
+    """
+    def _pack(self, sizes, max_width, align, occupied):
+        positions = []
+        x = 0
+        y = max([0] + [_align_up(oy + oh, align) for ox, oy, ow, oh in occupied])
+        shelf_height = 0
+        max_x = 0
+        for w, h in sizes:
+            # NOTE: 与原实现一致，恰好碰到右边界也换行
+            if x > 0 and x + w >= max_width:
+                x = 0
+                y += shelf_height
+                shelf_height = 0
+            positions.append((x, y))
+            x = _align_up(x + w, align)
+            shelf_height = max(shelf_height, _align_up(h, align))
+            max_x = max(max_x, x)
+        used_area = sum(w * h for w, h in sizes)
+        return PackResult(positions, _align_up(max_x, align), y + shelf_height, used_area)
+
+class SkylinePacker(AtlasPacker):
+    """
+    Bottom-left skyline, tallest rectangles first: each rectangle goes where its top edge is lowest
+    (leftmost on ties), filling the gaps that shelves leave with mixed heights.
+    Ties in the ordering keep input order, so the layout is deterministic.
+    Occupied rectangles raise the initial skyline (holes under them are not reused).
+    """
+    def _pack(self, sizes, max_width, align, occupied):
+        aligned = [(_align_up(w, align), _align_up(h, align)) for w, h in sizes]
+        order = sorted(range(len(sizes)), key=lambda i: (-aligned[i][1], -aligned[i][0], i))
+        skyline = self._initial_skyline(occupied, max_width, align)   # segments [x, y, width], left to right
+        positions : list[tuple[int, int] | None] = [None] * len(sizes)
+        width = height = 0
+        for i in order:
+            w, h = aligned[i]
+            best = None
+            for start in range(len(skyline)):
+                y = self._fit(skyline, start, w, max_width)
+                if y is not None and (best is None or (y + h, skyline[start][0]) < best[0]):
+                    best = ((y + h, skyline[start][0]), start, y)
+            _, start, y = best
+            x = skyline[start][0]
+            self._place(skyline, start, x, y + h, w)
+            positions[i] = (x, y)
+            width = max(width, x + w)
+            height = max(height, y + h)
+        used_area = sum(w * h for w, h in sizes)
+        return PackResult(positions, width, height, used_area)
+
+    @staticmethod
+    def _initial_skyline(occupied: list, max_width: int, align: int) -> list:
+        edges = sorted({0, max_width} | {min(_align_up(x, align), max_width) for x, y, w, h in occupied}
+                       | {min(_align_up(x + w, align), max_width) for x, y, w, h in occupied})
+        skyline = []
+        for left, right in zip(edges, edges[1:]):
+            top = max([0] + [_align_up(y + h, align) for x, y, w, h in occupied if x < right and x + w > left])
+            if skyline and skyline[-1][1] == top:
+                skyline[-1][2] += right - left
+            else:
+                skyline.append([left, top, right - left])
+        return skyline
+
+    @staticmethod
+    def _fit(skyline: list, start: int, w: int, max_width: int) -> int | None:
+        """
+        lowest y at which a rectangle `w` wide fits from skyline[start], None past the right edge
+        """
+        x = skyline[start][0]
+        if x + w > max_width:
+            return None
+        y = 0
+        i = start
+        while x + w > skyline[i][0]:
+            y = max(y, skyline[i][1])
+            i += 1
+            if i == len(skyline):
+                break
+        return y
+
+    @staticmethod
+    def _place(skyline: list, start: int, x: int, top: int, w: int):
+        end = x + w
+        i = start
+        while i < len(skyline) and skyline[i][0] < end:
+            seg_end = skyline[i][0] + skyline[i][2]
+            if seg_end <= end:
+                del skyline[i]
+            else:
+                skyline[i][2] = seg_end - end
+                skyline[i][0] = end
+                break
+        skyline.insert(start, [x, top, w])
+        # NOTE: 合并相同高度的相邻段
+        i = max(start - 1, 0)
+        while i + 1 < len(skyline):
+            if skyline[i][1] == skyline[i + 1][1]:
+                skyline[i][2] += skyline[i + 1][2]
+                del skyline[i + 1]
+            else:
+                i += 1
+
+PACKERS : dict[str, type[AtlasPacker]] = {
+    'shelf': ShelfPacker,
+    'skyline': SkylinePacker,
+}
+
+def get_packer(packer: str | AtlasPacker) -> AtlasPacker:
+    if isinstance(packer, AtlasPacker):
+        return packer
+    assert packer in PACKERS, f"unknown packer: {packer} (expecting one of {list(PACKERS)})"
+    return PACKERS[packer]()
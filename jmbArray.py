@@ -0,0 +1,249 @@
+"""
+NumPy structured-array views of the fixed-size JMB sentence tables.
+
+Requires NumPy (only this module does).
+"""
+import functools
+
+import numpy as np
+
+from . import jmbConst
+from .jmbConst import CharDataProblem
+from .jmbStruct import LazyRecordList, pack_records_into, record_codec, stJimaku_US, stOneSentence, untracked
+from .jmbPacked import PackedRecordStore
+from .jmbNumeric import CtlCode, CtlKind
+
+def _endian(bigEndian: bool) -> str:
+    return '>' if bigEndian else '<'
+
+def rubi_dtype(bigEndian = False) -> np.dtype:
+    e = _endian(bigEndian)
+    return np.dtype([
+        ('from_num',    'i1'),
+        ('to_num',      'i1'),
+        ('char_id',     f'{e}i2', (jmbConst.JIMAKU_RUBI_MAX,)),
+    ])
+
+def jimaku_ja_dtype(bigEndian = False) -> np.dtype:
+    e = _endian(bigEndian)
+    return np.dtype([
+        ('wait',        f'{e}i4'),
+        ('disp_time',   f'{e}i4'),
+        ('char_data',   f'{e}i2', (jmbConst.JIMAKU_CHAR_MAX,)),
+        ('rubi_data',   rubi_dtype(bigEndian), (jmbConst.JIMAKU_RUBI_DAT_MAX,)),
+    ])
+
+def info_dtype(bigEndian = False) -> np.dtype:
+    e = _endian(bigEndian)
+    return np.dtype([
+        ('wait',        f'{e}i4'),
+        ('hps_file',    f'S{jmbConst.FILE_LENGTH}'),
+        ('mth_file',    f'S{jmbConst.FILE_LENGTH}'),
+        ('back_locate', f'{e}i2'),
+        ('countinue',   f'{e}i2'),
+        ('key',         f'{e}i2'),
+        ('padding',     'V2'),
+    ])
+
+def one_sentence_dtype(bigEndian = False) -> np.dtype:
+    return np.dtype([
+        ('info',        info_dtype(bigEndian)),
+        ('jimaku_list', jimaku_ja_dtype(bigEndian), (jmbConst.JIMAKU_LINE_MAX,)),
+    ])
+
+def jimaku_us_dtype(bigEndian = False) -> np.dtype:
+    e = _endian(bigEndian)
+    return np.dtype([
+        ('wait',        f'{e}i4'),
+        ('disp_time',   f'{e}i4'),
+        ('char_data',   f'{e}i2', (jmbConst.US_JIMAKU_CHAR_MAX,)),
+    ])
+
+def _record_cls(gdat):
+    # NOTE: 避免循环引用jmbData，按句子表的类型判断
+    from .jmbData import gDat_JA
+    return stOneSentence if isinstance(gdat, gDat_JA) else stJimaku_US
+
+def sentence_dtype(gdat) -> np.dtype:
+    """
+    stOneSentence (6860 bytes) for gDat_JA, stJimaku_US (264 bytes) for gDat_US, in the file's byte order.
+    """
+    if _record_cls(gdat) is stOneSentence:
+        dtype = one_sentence_dtype(gdat.bigEndian)
+    else:
+        dtype = jimaku_us_dtype(gdat.bigEndian)
+    assert dtype.itemsize == record_codec(_record_cls(gdat).FORMAT).size
+    return dtype
+
+def sentence_array(gdat, writable = True) -> np.ndarray:
+    """
+    Sentence table of `gdat` as a structured array (one element per sentence).
+
+    writable=True returns an array over a fresh buffer holding the packed sentences;
+    pass it to set_sentence_array() to make the edits part of `gdat`. For a lazily read
+    file that buffer is one copy of the mapped table, with only the already decoded
+    sentences re-encoded over it.
+    writable=False always returns a read-only array; on a lazily read file with no
+    decoded sentence yet it is a view directly over the mapped file, without decoding anything.
+    In packed mode the array is a view of the PackedRecordStore buffer itself,
+    so edits apply immediately.
+    """
+    dtype = sentence_dtype(gdat)
+    sentences = gdat.sentences
+    if isinstance(sentences, PackedRecordStore):
+        arr = np.frombuffer(sentences._buf, dtype=dtype, count=len(sentences), offset=sentences._offset)
+    elif isinstance(sentences, LazyRecordList):
+        if not writable and not sentences.loaded_indices():
+            # NOTE: rebase之后_buf是bytearray，这里的视图并不一定只读
+            arr = np.frombuffer(sentences._buf, dtype=dtype, count=len(sentences), offset=sentences._offset)
+        else:
+            arr = np.frombuffer(sentences.table_bytes(), dtype=dtype)
+    else:
+        buf = bytearray(dtype.itemsize * len(sentences))
+        pack_records_into(buf, 0, untracked(sentences))
+        arr = np.frombuffer(buf, dtype=dtype)
+    if not writable:
+        arr.flags.writeable = False
+    return arr
+
+def set_sentence_array(gdat, arr: np.ndarray):
+    """
+    Replace the sentences of `gdat` with the records stored in `arr` (as returned by sentence_array()).
+    The array becomes the backing store: sentences are decoded from it on access and by write().
+    """
+    dtype = sentence_dtype(gdat)
+    assert arr.dtype == dtype, f"dtype mismatch: {arr.dtype} != {dtype}"
+    sentences = gdat.sentences
+    if isinstance(sentences, PackedRecordStore) and np.shares_memory(arr.view(np.uint8), np.frombuffer(sentences._buf, np.uint8)):
+        return
+    arr = np.ascontiguousarray(arr)
+    assert arr.ndim == 1 and len(arr) == gdat.meta.sentence_num, (
+        f"expecting {gdat.meta.sentence_num} sentences, got shape {arr.shape}"
+    )
+    gdat.sentences = LazyRecordList(arr.view(np.uint8), 0, _record_cls(gdat), len(arr), gdat.bigEndian)
+    gdat.sentences.mark_changed()
+
+@functools.lru_cache(maxsize=None)
+def _ctl_kind_table() -> np.ndarray:
+    """
+    CtlKind of every unsigned 16-bit code (64 KiB lookup table, built once)
+    """
+    codes = np.arange(0x10000, dtype=np.uint32)
+    table = np.full(0x10000, CtlKind.GLYPH, dtype=np.uint8)
+    table[(codes & CtlCode.SHI_FLAG) != 0] = CtlKind.SHI
+    table[(codes & CtlCode.SATSU_FLAG) != 0] = CtlKind.SATSU
+    table[(codes & CtlCode.BUTTON_MASK) == CtlCode.BUTTON_MASK] = CtlKind.BUTTON
+    table[CtlCode.SPACE_H & 0xffff] = CtlKind.SPACE_H
+    table[CtlCode.SPACE_Z & 0xffff] = CtlKind.SPACE_Z
+    table[CtlCode.RET & 0xffff] = CtlKind.RET
+    table[CtlCode.PAD & 0xffff] = CtlKind.PAD
+    table.flags.writeable = False
+    return table
+
+def classify_char_data(char_data, glyph_num: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode control codes of any shape (one char_data, or e.g. arr['jimaku_list']['char_data'] of a whole file).
+
+    Returns (glyph_index, kind, valid), each with the shape of `char_data`:
+      glyph_index: index into fParams, -1 for codes without a glyph
+      kind:        CtlKind values (uint8)
+      valid:       False for glyph codes whose index is >= glyph_num (all True when glyph_num is None)
+    """
+    unsigned = np.asarray(char_data).astype(np.uint16)
+    kind = _ctl_kind_table()[unsigned]
+    has_glyph = kind <= CtlKind.SHI
+    glyph_index = np.where(has_glyph, unsigned & CtlCode.GLYPH_MASK, -1).astype(np.int16)
+    if glyph_num is None:
+        valid = np.ones(kind.shape, dtype=bool)
+    else:
+        valid = ~has_glyph | (glyph_index < glyph_num)
+    return glyph_index, kind, valid
+
+class CharDataIssue:
+    def __init__(self, file, sentence: int, line: int, position: int, problem: CharDataProblem, code: int):
+        self.file = file                # name (or index) of the gDat in the validated batch
+        self.sentence = sentence
+        self.line = line                # jimaku_list index for JA, always 0 for US
+        self.position = position        # index in char_data
+        self.problem = problem
+        self.code = code                # offending control code (-1 for NO_RET)
+
+    def __repr__(self):
+        return (f"CharDataIssue({self.problem.name}, file={self.file!r}, sentence={self.sentence}, "
+                f"line={self.line}, position={self.position}, code={self.code})")
+
+class CharDataReport:
+    """
+    All char_data violations found by validate_char_data(); empty means valid.
+    """
+    def __init__(self):
+        self.issues : list[CharDataIssue] = []
+        self.checked_lines = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def by_problem(self, problem: CharDataProblem) -> list[CharDataIssue]:
+        return [issue for issue in self.issues if issue.problem == problem]
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __iter__(self):
+        return iter(self.issues)
+
+    def __repr__(self):
+        counts = ', '.join(f"{problem.name}={len(self.by_problem(problem))}" for problem in CharDataProblem)
+        return f"CharDataReport(checked_lines={self.checked_lines}, {counts})"
+
+def _char_data_lines(gdat) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (codes, sentence, line): every char_data of `gdat` as rows of a 2D array
+    """
+    arr = sentence_array(gdat, writable=False)
+    if _record_cls(gdat) is stOneSentence:
+        codes = arr['jimaku_list']['char_data']
+        sentence, line = np.divmod(np.arange(codes.shape[0] * codes.shape[1]), codes.shape[1])
+        return codes.reshape(-1, codes.shape[2]), sentence, line
+    codes = arr['char_data']
+    return codes, np.arange(len(codes)), np.zeros(len(codes), dtype=np.intp)
+
+def validate_char_data(gdats, names = None) -> CharDataReport:
+    """
+    Check every valid line (char_data[0] != -1) of one gDat or a batch of them, one vectorized pass per file:
+    RET present (so valid_len < JIMAKU_CHAR_MAX / US_JIMAKU_CHAR_MAX), only padding after RET,
+    and glyph indices before RET within len(fParams).
+    `names` labels the files in the report (defaults to their index in the batch).
+    """
+    if not isinstance(gdats, (list, tuple)):
+        gdats = [gdats]
+    if names is None:
+        names = range(len(gdats))
+    report = CharDataReport()
+    for name, gdat in zip(names, gdats):
+        codes, sentence, line = _char_data_lines(gdat)
+        codes = codes.astype(np.int16)
+        glyph_index, kind, valid = classify_char_data(codes, len(gdat.fParams))
+
+        line_valid = codes[:, 0] != CtlCode.PAD
+        is_ret = kind == CtlKind.RET
+        has_ret = is_ret.any(axis=1)
+        ret_pos = np.where(has_ret, is_ret.argmax(axis=1), codes.shape[1])
+        position = np.arange(codes.shape[1])
+        after_ret = (position > ret_pos[:, None]) & (kind != CtlKind.PAD) & line_valid[:, None]
+        out_of_range = (position < ret_pos[:, None]) & ~valid & line_valid[:, None]
+        report.checked_lines += int(line_valid.sum())
+
+        def add(rows, cols, problem):
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                code = int(codes[row, col]) if col < codes.shape[1] else CtlCode.PAD
+                report.issues.append(CharDataIssue(name, int(sentence[row]), int(line[row]), col, problem, code))
+
+        rows = np.nonzero(line_valid & ~has_ret)[0]
+        add(rows, np.full(len(rows), codes.shape[1]), CharDataProblem.NO_RET)
+        # NOTE: RET之后只报告第一个非padding的位置
+        rows = np.nonzero(after_ret.any(axis=1))[0]
+        add(rows, after_ret[rows].argmax(axis=1), CharDataProblem.CODE_AFTER_RET)
+        add(*np.nonzero(out_of_range), CharDataProblem.GLYPH_OUT_OF_RANGE)
+    return report
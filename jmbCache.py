@@ -0,0 +1,208 @@
+"""
+On-disk cache of parsed JMB / STRIMAGE files, so unchanged originals are not decoded again on every run.
+"""
+import glob
+import hashlib
+import os
+import pickle
+
+from .jmbConst import FileKind
+from .jmbData import gDat_JA, gDat_US
+from .jmbPacked import PACKED_RECORDS, PackedRecordStore
+from .jmbSniff import sniff
+from .jmbStruct import FilePayload, LazyRecordList, RecordList, stJimaku_US, stOneSentence, stTex, texStrImage
+
+CACHE_VERSION = 1
+
+class _GdatEntry:
+    """
+    Compact form of a gDat: decoded meta/fParams/texMeta, the raw sentence table and motions.
+    The DDS is only referenced by its offset in the original file.
+    """
+    def __init__(self, kind: FileKind, gdat):
+        self.kind = kind
+        self.bigEndian = gdat.bigEndian
+        self.meta = gdat.meta
+        self.fParams = list(gdat.fParams)
+        self.tex_header = gdat.tex.header
+        self.dds_offset = gdat.meta.tex_offset + gdat.tex.header.STRUCT_SIZE
+        sentences = gdat.sentences
+        start = sentences.record_offset(0) if len(sentences) else 0
+        self.sentences = bytes(sentences._buf[start:start + len(sentences) * sentences._record_size])
+        self.end_by_tex = getattr(gdat, 'end_by_tex', True)
+        self.motions = [bytes(motion) for motion in gdat._motion_blobs()]
+
+    def build(self, path: str, packed = False):
+        if self.kind == FileKind.JMB_JA:
+            gdat, record_cls = gDat_JA(bigEndian=self.bigEndian, packed=packed), stOneSentence
+            gdat.end_by_tex = self.end_by_tex
+            gdat.motions = list(self.motions)
+        else:
+            gdat, record_cls = gDat_US(bigEndian=self.bigEndian, packed=packed), stJimaku_US
+        gdat.bigEndian = self.bigEndian
+        gdat.meta = self.meta
+        gdat.fParams = RecordList(self.fParams)
+        gdat.tex = stTex(bigEndian=self.bigEndian)
+        gdat.tex.header = self.tex_header
+        gdat.tex.dds = FilePayload(path, self.dds_offset, self.tex_header.dds_size)
+        count = self.meta.sentence_num
+        if packed:
+            gdat.sentences = PackedRecordStore(bytearray(self.sentences), PACKED_RECORDS[record_cls], count, self.bigEndian)
+        else:
+            gdat.sentences = LazyRecordList(self.sentences, 0, record_cls, count, self.bigEndian)
+        gdat._set_origin(path, None)
+        return gdat
+
+class _StrImageEntry:
+    def __init__(self, strimage: texStrImage, dds_offset: int):
+        self.dds_offset = dds_offset
+        self.dds_size = len(strimage.tex.dds)
+        strimage.tex.dds = b''
+        self.strimage = strimage
+
+    def build(self, path: str, packed = False):
+        strimage = self.strimage
+        strimage.tex.dds = FilePayload(path, self.dds_offset, self.dds_size)
+        return strimage
+
+class DiskCache:
+    """
+    Directory of `<key><suffix>` files, evicted least recently used first (file mtime = last use)
+    once they exceed `max_bytes` in total. Writes are atomic (temporary file + os.replace).
+
+    The total is kept as a running count (one directory scan per process), and eviction goes
+    down to `EVICT_TO` of `max_bytes`, so the directory is only scanned again after that margin
+    has been filled.
+    """
+    EVICT_TO = 0.9
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._total : int | None = None     # running size of the entries, None until first scanned
+        os.makedirs(directory, exist_ok=True)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _read_bytes(self, entry_path: str) -> bytes | None:
+        try:
+            with open(entry_path, 'rb') as fp:
+                data = fp.read()
+        except FileNotFoundError:
+            return None
+        os.utime(entry_path)        # LRU: mtime = last use
+        return data
+
+    def _write_bytes(self, entry_path: str, data: bytes):
+        if self._total is None:
+            self._total = self.total_size()
+        try:
+            self._total -= os.stat(entry_path).st_size
+        except FileNotFoundError:
+            pass
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fp:
+            fp.write(data)
+        os.replace(tmp_path, entry_path)
+        self._total += len(data)
+        if self._total > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for entry_path in glob.glob(os.path.join(glob.escape(self.directory), '*' + self.suffix)):
+            try:
+                st = os.stat(entry_path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry_path))
+        return entries
+
+    def total_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # NOTE: 重新扫描目录，顺便校正其他进程写入造成的计数误差
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * self.EVICT_TO)
+        for _, size, entry_path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._total = total
+
+    def clear(self):
+        for _, _, entry_path in self._entries():
+            os.remove(entry_path)
+        self._total = 0
+
+class ParseCache(DiskCache):
+    """
+    Parsed files stored under `directory`, one pickle per file version.
+
+    key='stat' identifies a file by absolute path + size + mtime (nothing is read on a hit),
+    key='content' by the SHA-256 of its content (survives copies and touch, but reads the file).
+    Entries are evicted least recently used first once they exceed `max_bytes` in total.
+
+    JMB files come back with their sentences undecoded (LazyRecordList over the cached table,
+    or a PackedRecordStore with packed=True); textures come back as a FilePayload into the
+    original file, so the original must not change while the object is in use.
+    """
+    def __init__(self, directory: str, max_bytes: int = 256 << 20, key: str = 'stat'):
+        assert key in ('stat', 'content'), f"unknown cache key: {key}"
+        super().__init__(directory, max_bytes, '.pkl')
+        self.key = key
+
+    def load(self, path: str, packed = False):
+        """
+        gDat_JA / gDat_US / texStrImage of `path`, from the cache when the file is unchanged.
+        """
+        entry_path = self._entry_path(path)
+        entry = self._read_entry(entry_path)
+        if entry is None:
+            entry = self._parse(path)
+            self._write_bytes(entry_path, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        return entry.build(path, packed)
+
+    def _entry_path(self, path: str) -> str:
+        digest = hashlib.sha256(f"v{CACHE_VERSION}\0".encode())
+        if self.key == 'stat':
+            st = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}".encode())
+        else:
+            with open(path, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(FilePayload.COPY_CHUNK), b''):
+                    digest.update(chunk)
+        return self._key_path(digest.hexdigest())
+
+    def _parse(self, path: str):
+        kind, bigEndian = sniff(path)
+        if kind in (FileKind.JMB_JA, FileKind.JMB_US):
+            gdat_cls = gDat_JA if kind == FileKind.JMB_JA else gDat_US
+            # NOTE: lazy读取只取原始表格，句子本身不解码
+            with gdat_cls(path, bigEndian, lazy=True) as gdat:
+                return _GdatEntry(kind, gdat)
+        if kind == FileKind.STRIMAGE:
+            with open(path, 'rb') as fp:
+                strimage = texStrImage(fp)
+                dds_offset = fp.tell() - len(strimage.tex.dds)
+            return _StrImageEntry(strimage, dds_offset)
+        assert False, f"cannot cache {kind.name} file: {path}"
+
+    def _read_entry(self, entry_path: str):
+        data = self._read_bytes(entry_path)
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # 损坏或过时的条目直接丢弃
+            os.remove(entry_path)
+            return None
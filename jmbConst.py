@@ -10,6 +10,8 @@ JIMAKU_LINE_MAX = 16
 
 US_JIMAKU_CHAR_MAX = 128
 
+JIMAKU_TIME_UNIT = 4800     # wait/disp_time are s32 in 1/4800 s
+
 STRIMAGE_MAXSTRPACKNUM = 500
 STRIMAGE_SIMAXSTRNUM = (30 + 1)
 STRIMAGE_SIMAXSTRCHRNUM = (128 + 1)
@@ -19,7 +21,7 @@ SHI_FLAG        = S16_BE("7000")
 SPACE_H_FLAG    = S16_BE("fffd")
 SPACE_Z_FLAG    = S16_BE("fffc")
 
-from enum import Enum, auto
+from enum import Enum, IntEnum, auto
 
 class JmkUsage(Enum):
     Default = auto()
@@ -31,3 +33,20 @@ class JmkUsage(Enum):
 class JmkKind(Enum):
     JA = auto()
     US = auto()
+
+class ValidationLevel(IntEnum):
+    OFF = 0             # no size checks
+    STRUCTURAL = 1      # record formats checked once per class, section bounds once per file
+    PARANOID = 2        # additionally fp.tell() around every record read/write
+
+class CharDataProblem(Enum):
+    NO_RET = auto()                 # valid line without RET (-2) within its char_data
+    CODE_AFTER_RET = auto()         # something other than padding (-1) after RET
+    GLYPH_OUT_OF_RANGE = auto()     # glyph index >= len(fParams)
+
+class FileKind(Enum):
+    JMB_JA = auto()
+    JMB_US = auto()
+    STRIMAGE = auto()
+    TEX_BIN = auto()        # bare texMeta + DDS
+    UNKNOWN = auto()
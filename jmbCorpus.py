@@ -0,0 +1,122 @@
+"""
+Run a function over every JMB / STRIMAGE / texture BIN file of a directory tree with a process pool.
+"""
+import os
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterable, Iterator
+
+from .jmbConst import FileKind
+from .jmbData import gDat_JA, gDat_US
+from .jmbSniff import sniff
+from .jmbStruct import stTex, texStrImage
+
+def classify_file(path: str) -> FileKind:
+    """
+    Kind from the file header (jmbSniff), whatever the extension.
+    """
+    return sniff(path)[0]
+
+class CorpusFile:
+    def __init__(self, path: str, kind: FileKind, bigEndian = False):
+        self.path = path
+        self.kind = kind
+        self.bigEndian = bigEndian
+
+    def open(self, lazy = False, packed = False):
+        """
+        gDat_JA / gDat_US for JMB files, texStrImage for STRIMAGE, stTex (payload left on disk) for texture BIN.
+        """
+        if self.kind == FileKind.JMB_JA:
+            return gDat_JA(self.path, self.bigEndian, lazy=lazy, packed=packed)
+        if self.kind == FileKind.JMB_US:
+            return gDat_US(self.path, lazy=lazy, packed=packed)
+        if self.kind == FileKind.STRIMAGE:
+            with open(self.path, 'rb') as fp:
+                return texStrImage(fp)
+        if self.kind == FileKind.TEX_BIN:
+            return stTex.from_file(self.path, bigEndian=self.bigEndian)
+        assert False, f"cannot open {self.kind} file: {self.path}"
+
+    def __repr__(self):
+        return f"CorpusFile({self.path!r}, {self.kind.name})"
+
+class CorpusResult:
+    def __init__(self, file: CorpusFile, value = None, error: str | None = None):
+        self.file = file
+        self.value = value          # return value of the user function
+        self.error = error          # formatted traceback if the function raised
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else self.error.strip().splitlines()[-1]
+        return f"CorpusResult({self.file.path!r}, {self.file.kind.name}, {status})"
+
+def discover(root: str, kinds: Iterable[FileKind] | None = None) -> Iterator[CorpusFile]:
+    """
+    Walk `root` in sorted order and yield every recognised file (optionally only the given kinds).
+    """
+    kinds = set(kinds) if kinds is not None else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            kind, bigEndian = sniff(path)
+            if kind == FileKind.UNKNOWN or (kinds is not None and kind not in kinds):
+                continue
+            yield CorpusFile(path, kind, bigEndian)
+
+def _apply(func: Callable, file: CorpusFile) -> CorpusResult:
+    try:
+        return CorpusResult(file, func(file))
+    except Exception:
+        return CorpusResult(file, error=traceback.format_exc())
+
+def run_corpus(func: Callable[[CorpusFile], object], files, workers: int | None = None,
+               max_pending: int | None = None, max_tasks_per_child: int | None = None) -> Iterator[CorpusResult]:
+    """
+    Map `func(CorpusFile)` over `files` (a directory to discover, or an iterable of CorpusFile)
+    and yield a CorpusResult per file as soon as it completes.
+
+    Exceptions raised by `func` are stored in CorpusResult.error and do not stop the run.
+    At most `max_pending` files (default 2 * workers) are in flight, so neither the task
+    queue nor the finished-but-unread results grow with the corpus;
+    `max_tasks_per_child` recycles worker processes to bound their memory (Python 3.11+).
+    workers=1 runs in this process (no pickling, easier debugging).
+    `func` and its return value must be picklable (module-level function) when workers > 1.
+    """
+    if isinstance(files, str):
+        files = discover(files)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for file in files:
+            yield _apply(func, file)
+        return
+
+    max_pending = max_pending or 2 * workers
+    # NOTE: max_tasks_per_child 需要 Python 3.11，未指定时不传
+    options = {} if max_tasks_per_child is None else {'max_tasks_per_child': max_tasks_per_child}
+    with ProcessPoolExecutor(max_workers=workers, **options) as pool:
+        pending = {}
+        files = iter(files)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                file = next(files, None)
+                if file is None:
+                    exhausted = True
+                    break
+                pending[pool.submit(_apply, func, file)] = file
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file = pending.pop(future)
+                try:
+                    yield future.result()
+                except Exception:
+                    # NOTE: worker崩溃或返回值无法pickle，同样只记录错误
+                    yield CorpusResult(file, error=traceback.format_exc())
@@ -1,44 +1,149 @@
-from typing import overload, Literal
+from typing import Iterator, NamedTuple, overload, Literal
 from abc import ABC, abstractmethod
 import io
+import mmap
 import os
 
-import wand.image
-
 from .jmbStruct import *
-from .jmbNumeric import S16_BE
+from .jmbNumeric import CtlCode
+from .jmbLayout import JmbLayout, padding_before, padding_kept, padding_to
+from .jmbPacked import PACKED_RECORDS, PackedRecordStore
 from . import jmbConst
-from .jmbConst import JmkKind
+from .jmbConst import FileKind, JmkKind, ValidationLevel
+from .jmbSniff import sniff
 
 class BaseGdat(ABC):
-    def __init__(self, source = None, bigEndian = False):
+    def __init__(self, source = None, bigEndian = False, lazy = False, packed = False):
         self.fParams : list[stFontParam]
         self.tex : stTex
+        self.bigEndian : bool = bigEndian
+        self.packed : bool = packed
+        assert not (lazy and packed), "lazy and packed modes are exclusive"
+        self._mmap : mmap.mmap | None = None
+        # NOTE: 记录读取时的文件状态，用于patch_file的脏区检测
+        self._origin_path : str | None = None
+        self._origin_stat : tuple[int, int] | None = None
+        self._origin_buf = None         # lazy模式下为原文件的mmap，否则patch时从磁盘读取
+        self._origin_dds = None
+        self._origin_motions : list = []
 
         if source is not None:
-            if isinstance(source, str):
+            if lazy:
+                buf = self._map_source(source)
+                self.read_buffer(buf, bigEndian)
+                file_size = len(buf)
+                if isinstance(source, str):
+                    self._set_origin(source, buf)
+            elif isinstance(source, str):
                 with open(source, 'rb') as fp:
                     self.read(fp, bigEndian)
+                    file_size = os.fstat(fp.fileno()).st_size
+                self._set_origin(source, None)
             else:
                 self.read(source, bigEndian)
+                pos = source.tell()
+                file_size = source.seek(0, os.SEEK_END)
+                source.seek(pos)
+            if validation_level() >= ValidationLevel.STRUCTURAL:
+                self._check_sections(file_size)
+
+    def _read_sentences(self, fp, record_cls, count: int, bigEndian = False):
+        """
+        packed mode: keep the table as one bytearray behind flyweight accessors (jmbPacked)
+        """
+        if self.packed:
+            return PackedRecordStore.read(fp, PACKED_RECORDS[record_cls], count, bigEndian)
+        return RecordList(read_records(fp, record_cls, count, bigEndian))
+
+    def _origin_table(self, size: int):
+        """
+        first `size` bytes of the file that was read (only valid while its stat is unchanged)
+        """
+        if self._origin_buf is not None:
+            return self._origin_buf
+        with open(self._origin_path, 'rb') as fp:
+            return fp.read(size)
+
+    def _set_origin(self, path: str, table_buf):
+        st = os.stat(path)
+        self._origin_path = os.path.abspath(path)
+        self._origin_stat = (st.st_size, st.st_mtime_ns)
+        self._origin_buf = table_buf
+        self._origin_dds = self.tex.dds
+        self._origin_motions = list(self._motion_blobs())
+
+    def _motion_blobs(self) -> list:
+        return []
+
+    def _map_source(self, source):
+        """
+        lazy mode: mmap the file (path or real file object), otherwise fall back to the whole content in memory
+        """
+        if isinstance(source, str):
+            with open(source, 'rb') as fp:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mmap
+        try:
+            fileno = source.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            source.seek(0)
+            return source.read()
+        self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self):
+        """
+        Release the mapping opened in lazy mode.
+        Sentences that have not been accessed yet can no longer be decoded afterwards.
+        """
+        if self._mmap is None:
+            return
+        if self._origin_buf is self._mmap:
+            self._origin_buf = None
+        for view in [*self._buffer_views(), self._origin_dds, *self._origin_motions]:
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _buffer_views(self) -> list:
+        return [self.tex.dds]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     @overload
     @classmethod
-    def create(cls, source: str, kind: Literal[JmkKind.JA]) -> 'gDat_JA': ...
+    def create(cls, source: str, kind: Literal[JmkKind.JA], lazy: bool = False, packed: bool = False) -> 'gDat_JA': ...
     @overload
     @classmethod
-    def create(cls, source: str, kind: Literal[JmkKind.US]) -> 'gDat_US': ...
+    def create(cls, source: str, kind: Literal[JmkKind.US], lazy: bool = False, packed: bool = False) -> 'gDat_US': ...
+    @overload
+    @classmethod
+    def create(cls, source: str, kind: None = None, lazy: bool = False, packed: bool = False) -> 'gDat': ...
     @classmethod
-    def create(cls, source, kind: JmkKind):
+    def create(cls, source, kind: JmkKind | None = None, lazy: bool = False, packed: bool = False):
         """
         source: filepath (str) | fp
-        kind: JmkKind (JA | US)
+        kind: JmkKind (JA | US), None to detect kind and endianness from the header (jmbSniff)
+        lazy: mmap the file and decode sentences on first access;
+              texture and motion data stay as memoryview slices of the mapping
+        packed: keep sentences as one bytearray with flyweight accessors (low memory, same attribute API)
         """
+        if kind is None:
+            file_kind, bigEndian = sniff(source)
+            assert file_kind in (FileKind.JMB_JA, FileKind.JMB_US), f"not a JMB file: {file_kind.name}"
+            if file_kind == FileKind.JMB_JA:
+                return gDat_JA(source, bigEndian, lazy=lazy, packed=packed)
+            return gDat_US(source, lazy=lazy, packed=packed)
         assert isinstance(kind, JmkKind), "kind must be JmkKind"
         if kind == JmkKind.JA:
-            return gDat_JA(source)
+            return gDat_JA(source, lazy=lazy, packed=packed)
         elif kind == JmkKind.US:
-            return gDat_US(source)
+            return gDat_US(source, lazy=lazy, packed=packed)
         else:
             assert False, "unreachable"
 
@@ -46,24 +151,223 @@ class BaseGdat(ABC):
     def read(self, fp, bigEndian = False):
         pass
 
+    @abstractmethod
+    def read_buffer(self, buf, bigEndian = False):
+        pass
+
     @abstractmethod
     def ready_to_write(self) -> bool:
         pass
 
     def write_to_file(self, writepath: str, validation=True):
         writepath = os.path.abspath(writepath)
+        if writepath == self._origin_path or self._payload_in(writepath):
+            # NOTE: 数据仍从该文件读取(mmap/FilePayload)，不能直接截断
+            self._replace_file(writepath, validation)
+            return
         os.makedirs(os.path.dirname(writepath), exist_ok=True)
         with open(writepath, 'wb') as fp:
             self.write(fp, validation)
 
+    def _payload_in(self, path: str) -> bool:
+        return isinstance(self.tex.dds, FilePayload) and self.tex.dds.path == path
+
+    def _replace_file(self, path: str, validation=True):
+        """
+        Full write through a temporary file + os.replace. A texture payload streamed from `path`
+        itself is pointed at its new offset afterwards, since the old offset is gone with the old file.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as fp:
+            self.write(fp, validation)
+        os.replace(tmp_path, path)
+        if self._payload_in(path):
+            self.tex.dds = FilePayload(path, self.meta.tex_offset + self.tex.header.STRUCT_SIZE, len(self.tex.dds))
+
+    @abstractmethod
+    def plan_layout(self, recalculate = True) -> JmbLayout:
+        pass
+
+    def _pack_tables(self, layout: JmbLayout) -> bytearray:
+        """
+        meta, sentences, fParams (+ padding) and the texMeta header packed into one preallocated buffer
+        """
+        buf = bytearray(layout['tex'].offset + self.tex.header.STRUCT_SIZE)
+        buf[0:layout['meta'].size] = self.meta.pack()
+        after_sent = pack_records_into(buf, layout['sentences'].offset, untracked(self.sentences))
+        assert(after_sent == layout['fParams'].offset)
+        after_char = pack_records_into(buf, layout['fParams'].offset, untracked(self.fParams))
+        assert(after_char + layout['fParams'].padding == layout['tex'].offset)
+        self.tex.header.pack_into(buf, layout['tex'].offset)
+        if validation_level() >= ValidationLevel.PARANOID:
+            assert self.tex.header.dds_size == len(self.tex.dds), (
+                f"texMeta declares {self.tex.header.dds_size} DDS bytes, payload is {len(self.tex.dds)}"
+            )
+        return buf
+
+    def _section_offsets(self) -> dict[str, int]:
+        return {
+            'meta': 0,
+            'sentences': self.meta.sentence_offset,
+            'fParams': self.meta.char_offset,
+            'tex': self.meta.tex_offset,
+        }
+
+    def _check_sections(self, file_size: int):
+        """
+        structural validation once per file read: the sections declared by meta
+        must be in order, must not overlap, and must lie inside the file
+        """
+        offsets = self._section_offsets()
+        end = 0
+        for section in self.plan_layout(recalculate=False):
+            offset = offsets[section.name]
+            assert offset >= end, f"{section.name} at {offset} overlaps the previous section (ends at {end})"
+            end = offset + section.size
+        assert end <= file_size, f"sections end at {end}, past the end of file ({file_size})"
+
+    def _check_end(self, fp, name: str, end: int):
+        """
+        PARANOID only: after reading/writing a section `fp` must stand exactly at its expected end
+        """
+        if validation_level() >= ValidationLevel.PARANOID:
+            assert fp.tell() == end, f"{name}: expected to end at {end}, stopped at {fp.tell()}"
+
+    def _check_layout(self, layout: JmbLayout):
+        assert layout['meta'].size == self.meta.sentence_offset, (
+            f"expecting sentence_offset : {self.meta.sentence_offset}",
+            f"writed pos after meta : {layout['meta'].size}"
+        )
+        assert(layout['fParams'].offset == self.meta.char_offset)
+        assert(layout['tex'].offset == self.meta.tex_offset)
+
     @abstractmethod
-    def recalculate_meta(self):
+    def recalculate_meta(self) -> JmbLayout:
         pass
 
     @abstractmethod
     def write(self, fp, validation=True):
         pass
 
+    def _dirty_patches(self, layout: JmbLayout) -> list[tuple[int, object]]:
+        """
+        (offset, data) for every record/section that differs from the file read.
+        Only the records that may have been edited are compared (dirty_indices() of a
+        RecordList / LazyRecordList); packed tables are compared as raw bytes.
+        """
+        assert self._origin_path is not None, "no origin file to compare with"
+        origin = self._origin_table(layout['tex'].offset + self.tex.header.STRUCT_SIZE)
+        patches = []
+        def diff(offset, data):
+            old = origin[offset:offset + len(data)]
+            if old == data:
+                return
+            # 只保留实际变化的字节区间
+            start, end = 0, len(data)
+            if len(old) == end:
+                while old[start] == data[start]:
+                    start += 1
+                while old[end - 1] == data[end - 1]:
+                    end -= 1
+            patches.append((offset + start, data[start:end]))
+
+        diff(0, self.meta.pack())
+        self._diff_records(diff, self.sentences, layout['sentences'])
+        self._diff_records(diff, self.fParams, layout['fParams'])
+        diff(layout['tex'].offset, self.tex.header.pack())
+
+        tex_payload = layout['tex'].offset + self.tex.header.STRUCT_SIZE
+        if self.tex.dds is not self._origin_dds:
+            patches.append((tex_payload, self.tex.dds))
+            if layout['tex'].padding:
+                patches.append((tex_payload + len(self.tex.dds), bytes(layout['tex'].padding)))
+
+        pos = layout['tex'].end
+        for motion, origin_motion in zip(self._motion_blobs(), self._origin_motions):
+            if motion is not origin_motion:
+                patches.append((pos, motion))
+            pos += len(motion)
+        return patches
+
+    @staticmethod
+    def _diff_records(diff, records, section):
+        if not len(records):
+            return
+        record_size = section.size // len(records)
+        if isinstance(records, LazyRecordList):
+            # NOTE: 未解码的行按原始字节比较，无需解码
+            for i in records.dirty_indices():
+                data = records[i].pack() if records.is_loaded(i) else records.raw(i)
+                diff(section.offset + i * record_size, data)
+        elif isinstance(records, RecordList):
+            for i in records.dirty_indices():
+                diff(section.offset + i * record_size, records.peek(i).pack())
+        else:
+            for i, record in enumerate(records):
+                diff(section.offset + i * record_size, record.pack())
+
+    def dirty_ranges(self) -> list[tuple[int, int]]:
+        """
+        (offset, size) of the byte ranges that patch_file() would rewrite, using the current meta.
+        """
+        return [(offset, len(data)) for offset, data in self._dirty_patches(self.plan_layout(recalculate=False))]
+
+    def _matches_meta(self, layout: JmbLayout) -> bool:
+        """
+        every section of `layout` starts at the offset the current meta declares,
+        and the record counts in the meta are up to date
+        """
+        offsets = self._section_offsets()
+        return (len(self.sentences) == self.meta.sentence_num and len(self.fParams) == self.meta.char_num
+                and all(section.offset == offsets[section.name] for section in layout))
+
+    def _can_patch(self, path: str, layout: JmbLayout) -> bool:
+        if self._origin_path != path or not os.path.exists(path):
+            return False
+        st = os.stat(path)
+        if (st.st_size, st.st_mtime_ns) != self._origin_stat:
+            return False
+        # meta 不变 (offset/数量/motion大小) 且文件大小不变 => 所有section位置不变
+        meta_bytes = self.meta.pack()
+        return (self._matches_meta(layout) and layout.file_size == st.st_size and
+                self._origin_table(len(meta_bytes))[0:len(meta_bytes)] == meta_bytes)
+
+    def patch_file(self, path: str | None = None) -> bool:
+        """
+        Save edits into the file this object was read from, writing only the modified
+        sentences / font params / texture / motion ranges in place.
+        The layout is planned with the current meta (recalculate=False); the file is fully
+        rewritten (temp file + replace, meta recalculated) only when that layout no longer
+        matches the meta (records added or removed, a section that outgrew its slot),
+        or when the file on disk is not the one that was read.
+
+        Only the records that may have been edited are re-encoded and diffed against the file:
+        the sentences / font params handed out or assigned since the file was read (see RecordList;
+        the decoded ones in lazy mode) and the rows rewritten by table edits (jmbTimeline).
+        Packed sentence tables are compared as raw bytes.
+
+        Returns True if the file was patched in place, False if it was fully rewritten.
+        """
+        path = os.path.abspath(path if path is not None else self._origin_path)
+        layout = self.plan_layout(recalculate=False)
+
+        if not self._can_patch(path, layout):
+            self.recalculate_meta()
+            self._replace_file(path, validation=False)
+            self._set_origin(path, None)
+            print(f"patch: layout changed, fully rewritten {path}")
+            return False
+
+        patches = self._dirty_patches(layout)
+        with open(path, 'r+b') as fp:
+            for offset, data in patches:
+                fp.seek(offset)
+                write_payload(fp, data)
+        self._set_origin(path, self._origin_buf)
+        print(f"patch: {len(patches)} ranges, {sum(len(data) for _, data in patches)} bytes written to {path}")
+        return True
+
     def no_diff_with(self, filename: str) -> bool:
         gen_buf = io.BytesIO()
         self.write(gen_buf, validation=False)
@@ -71,25 +375,32 @@ class BaseGdat(ABC):
             return f_ori.read() == gen_buf.getvalue()
 
     def reimport_tex(self, filename: str):
+        """
+        The new DDS is referenced on disk (FilePayload) and streamed on write,
+        so `filename` must stay unchanged until the JMB has been written.
+        """
         assert os.path.exists(filename), f"file not found: {filename}"
         old_len = len(self.tex.dds)
         old_w, old_h = self.tex.header.w, self.tex.header.h
 
-        with open(filename, 'rb') as fp:
-            dds_bytes = fp.read()
-            self.tex.dds = dds_bytes
-            assert self.tex.dds[:4] == b'DDS ', "not a valid DDS file"
+        width, height = self.tex.replace_dds(filename)
 
         new_len = len(self.tex.dds)
         print(f"tex reimported from {filename} ({old_len} -> {new_len})")
+        print(f"DDS texture changed: {old_w}x{old_h} -> {width//4}x{height//4}")
 
-        img = wand.image.Image(blob=dds_bytes)
-        width, height = img.size
-        img.close()
-        assert width % 4 == 0 and height % 4 == 0, "DDS width/height must be multiples of 4"
-        self.tex.header.w = width // 4
-        self.tex.header.h = height // 4
-        self.tex.header.dds_size = new_len
+    def splice_tex(self, filename: str, top: int):
+        """
+        Replace the texture rows from `top` (DDS pixels) down with the DDS `filename` (see stTex.splice_dds).
+        """
+        assert os.path.exists(filename), f"file not found: {filename}"
+        old_len = len(self.tex.dds)
+        old_w, old_h = self.tex.header.w, self.tex.header.h
+
+        width, height = self.tex.splice_dds(filename, top)
+
+        new_len = len(self.tex.dds)
+        print(f"tex rows {top}.. spliced from {filename} ({old_len} -> {new_len})")
         print(f"DDS texture changed: {old_w}x{old_h} -> {width//4}x{height//4}")
 
     @abstractmethod
@@ -97,29 +408,35 @@ class BaseGdat(ABC):
         pass
 
 class gDat_US(BaseGdat):
-    def __init__(self, fp = None, bigEndian = False):
+    def __init__(self, fp = None, bigEndian = False, lazy = False, packed = False):
         self.meta : MetaData_US
         self.sentences : list[stJimaku_US]
         self.fParams : list[stFontParam]
         self.tex : stTex
 
-        super().__init__(fp)
+        super().__init__(fp, lazy=lazy, packed=packed)
 
     def read(self, fp, bigEndian = False):
         self.meta = MetaData_US(fp)
 
         fp.seek(self.meta.sentence_offset)
-        self.sentences : list[stJimaku_US] = []
-        for _ in range(self.meta.sentence_num):
-            self.sentences.append(stJimaku_US(fp))
+        self.sentences : list[stJimaku_US] = self._read_sentences(fp, stJimaku_US, self.meta.sentence_num)
+        self._check_end(fp, 'sentences', self.meta.sentence_offset + self.meta.sentence_num * record_codec(stJimaku_US.FORMAT).size)
 
         fp.seek(self.meta.char_offset)
-        self.fParams : list[stFontParam] = []
-        for _ in range(self.meta.char_num):
-            self.fParams.append(stFontParam(fp))
+        self.fParams : list[stFontParam] = RecordList(read_records(fp, stFontParam, self.meta.char_num))
+        self._check_end(fp, 'fParams', self.meta.char_offset + self.meta.char_num * stFontParam.STRUCT_SIZE)
 
         fp.seek(self.meta.tex_offset)
         self.tex = stTex(fp)
+        self._check_end(fp, 'tex', self.meta.tex_offset + self.tex.size())
+
+    def read_buffer(self, buf, bigEndian = False):
+        self.meta = MetaData_US()
+        self.meta.unpack_from(buf)
+        self.sentences = LazyRecordList(buf, self.meta.sentence_offset, stJimaku_US, self.meta.sentence_num)
+        self.fParams = RecordList(unpack_records(buf, self.meta.char_offset, stFontParam, self.meta.char_num))
+        self.tex = stTex.from_buffer(buf, self.meta.tex_offset)
 
     def ready_to_write(self) -> bool:
         ready : bool = True
@@ -129,25 +446,36 @@ class gDat_US(BaseGdat):
         ready &= (self.tex != None)
         return ready
 
-    def recalculate_meta(self):
+    def plan_layout(self, recalculate = True) -> JmbLayout:
+        """
+        Compute the section map write() will produce from record sizes alone (the texture is not touched).
+        recalculate=False describes a write with the current meta offsets (validation=False).
+        """
+        layout = JmbLayout()
+        layout.append('meta', len(self.meta.pack()))
+        layout.append('sentences', len(self.sentences) * record_codec(stJimaku_US.FORMAT).size)
+        after_char = layout.append('fParams', len(self.fParams) * stFontParam.STRUCT_SIZE).end
+        if recalculate:
+            layout['fParams'].padding = padding_before(after_char, self.meta.tex_offset)
+        else:
+            layout['fParams'].padding = padding_kept(after_char, self.meta.tex_offset)
+        layout.append('tex', self.tex.size())
+        return layout
+
+    def recalculate_meta(self) -> JmbLayout:
         assert self.ready_to_write(), "not ready to write"
-        dummy_fp = io.BytesIO()
+        layout = self.plan_layout()
 
         # NOTE: jimaku_offset 前面是Metadata, offset应该不会改变
-        self.meta.write(dummy_fp)
-        after_meta = dummy_fp.tell()
-        assert(after_meta == self.meta.sentence_offset)
+        assert(layout['meta'].size == self.meta.sentence_offset)
 
         # NOTE: 只要句子个数不变，对char_offset应该不存在修改
         assert(len(self.sentences) == self.meta.sentence_num)
-        for sent in self.sentences:
-            sent.write(dummy_fp)
-        after_sent = dummy_fp.tell()
         if True:
-            touch = after_sent
+            touch = layout['fParams'].offset
             not_touched : bool = (self.meta.char_offset == touch)
             print(f"meta: char_offset {self.meta.char_offset} -> {'[SAME]' if not_touched else touch}")
-            self.meta.char_offset = after_sent
+            self.meta.char_offset = touch
 
         # NOTE: ENABLED: 对fParams的修改
         if True:
@@ -156,55 +484,29 @@ class gDat_US(BaseGdat):
             print(f"meta: char_num {self.meta.char_num} -> {'[SAME]' if not_touched else touch}")
             self.meta.char_num = len(self.fParams)
 
-        assert(len(self.fParams) == self.meta.char_num)
-        for fparam in self.fParams:
-            fparam.write(dummy_fp)
-        after_char = dummy_fp.tell()
-        # padding
-        if after_char != self.meta.tex_offset:
-            padding_size = 32 - (after_char % 32)
-            dummy_fp.write(b'\x00' * padding_size)
-            after_char = dummy_fp.tell()
         if True:
-            touch = after_char
+            touch = layout['tex'].offset
             not_touched : bool = (self.meta.tex_offset == touch)
             print(f"meta: tex_offset {self.meta.tex_offset} -> {'[SAME]' if not_touched else touch}")
-            self.meta.tex_offset = after_char
+            self.meta.tex_offset = touch
 
-        assert(dummy_fp.tell() == self.meta.tex_offset)
-        self.tex.write(dummy_fp)
-        del dummy_fp
+        return layout
 
     def write(self, fp, validation = True):
         assert self.ready_to_write(), "not ready to write"
         if validation:
-            self.recalculate_meta()
+            layout = self.recalculate_meta()
             print("MetaData Recalculated...")
+        else:
+            layout = self.plan_layout(recalculate=False)
 
-        self.meta.write(fp)
-        after_meta = fp.tell()
-        assert after_meta == self.meta.sentence_offset, (
-            f"expecting sentence_offset : {self.meta.sentence_offset}",
-            f"writed pos after meta : {after_meta}"
-        )
-
-        for sent in self.sentences:
-            sent.write(fp)
-
-        after_sent = fp.tell()
-        assert(after_sent == self.meta.char_offset)
-
-        for fparam in self.fParams:
-            fparam.write(fp)
-
-        after_char = fp.tell()
-        if after_char != self.meta.tex_offset:
-            # 补全 0，直到与32 byte alignment
-            padding_size = 32 - (after_char % 32)
-            fp.write(b'\x00' * padding_size)
-        assert(fp.tell() == self.meta.tex_offset)
+        self._check_layout(layout)
 
-        self.tex.write(fp)
+        # 表格部分一次写入，纹理单独流式写入
+        start = fp.tell() if validation_level() >= ValidationLevel.PARANOID else 0
+        fp.write(self._pack_tables(layout))
+        write_payload(fp, self.tex.dds)
+        self._check_end(fp, 'tex', start + layout['tex'].offset + layout['tex'].size)
 
     def update_sentence_ctl(self, translation: list[str], char2ctl_lookup: dict[str, int], validation_mode = False):
         assert self.meta.sentence_num == len(translation)
@@ -213,9 +515,9 @@ class gDat_US(BaseGdat):
             local_ctls = [char2ctl_lookup[ch] for ch in local_sent]
             assert len(local_ctls) < jmbConst.US_JIMAKU_CHAR_MAX
 
-            local_ctls.append(-2)
+            local_ctls.append(CtlCode.RET)
             while len(local_ctls) < jmbConst.US_JIMAKU_CHAR_MAX:
-                local_ctls.append(-1)
+                local_ctls.append(CtlCode.PAD)
             assert len(local_ctls) == len(self.sentences[i].char_data)
 
             if validation_mode:
@@ -226,7 +528,7 @@ class gDat_US(BaseGdat):
                 self.sentences[i].overwrite_ctl(local_ctls)
 
 class gDat_JA(BaseGdat):
-    def __init__(self, fp = None, bigEndian = False):
+    def __init__(self, fp = None, bigEndian = False, lazy = False, packed = False):
         self.meta : MetaData_JA
         self.sentences : list[stOneSentence]
         self.fParams : list[stFontParam]
@@ -234,24 +536,23 @@ class gDat_JA(BaseGdat):
         self.motions : list[bytes]
 
         self.end_by_tex : bool = False
-        super().__init__(fp, bigEndian)
+        super().__init__(fp, bigEndian, lazy, packed)
 
     def read(self, fp, bigEndian = False):
         self.meta = MetaData_JA(fp, bigEndian)
 
         fp.seek(self.meta.sentence_offset)
-        self.sentences : list[stOneSentence] = []
-        for _ in range(self.meta.sentence_num):
-            self.sentences.append(stOneSentence(fp, bigEndian))
+        self.sentences : list[stOneSentence] = self._read_sentences(fp, stOneSentence, self.meta.sentence_num, bigEndian)
+        self._check_end(fp, 'sentences', self.meta.sentence_offset + self.meta.sentence_num * record_codec(stOneSentence.FORMAT).size)
 
         fp.seek(self.meta.char_offset)
-        self.fParams : list[stFontParam] = []
-        for _ in range(self.meta.char_num):
-            self.fParams.append(stFontParam(fp, bigEndian = bigEndian))
+        self.fParams : list[stFontParam] = RecordList(read_records(fp, stFontParam, self.meta.char_num, bigEndian))
+        self._check_end(fp, 'fParams', self.meta.char_offset + self.meta.char_num * stFontParam.STRUCT_SIZE)
 
         fp.seek(self.meta.tex_offset)
         self.tex = stTex(fp, bigEndian)
         after_tex = fp.tell()
+        self._check_end(fp, 'tex', self.meta.tex_offset + self.tex.size())
         if after_tex % 32 != 0:
             padding_size = 32 - (after_tex % 32)
             self.end_by_tex = (self.meta.s_motion_offset == after_tex + padding_size)
@@ -264,6 +565,51 @@ class gDat_JA(BaseGdat):
             self.motions = []
             for cur_motion_size in self.meta.s_motion_size_tbl:
                 self.motions.append(fp.read(cur_motion_size))
+            self._check_end(fp, 'motions', self.meta.s_motion_offset + sum(self.meta.s_motion_size_tbl))
+
+    def read_buffer(self, buf, bigEndian = False):
+        self.meta = MetaData_JA(bigEndian=bigEndian)
+        self.meta.unpack_from(buf)
+        self.sentences = LazyRecordList(buf, self.meta.sentence_offset, stOneSentence, self.meta.sentence_num, bigEndian)
+        self.fParams = RecordList(unpack_records(buf, self.meta.char_offset, stFontParam, self.meta.char_num, bigEndian))
+        self.tex = stTex.from_buffer(buf, self.meta.tex_offset, bigEndian)
+
+        after_tex = self.meta.tex_offset + self.tex.header.STRUCT_SIZE + self.tex.header.dds_size
+        if after_tex % 32 != 0:
+            padding_size = 32 - (after_tex % 32)
+            self.end_by_tex = (self.meta.s_motion_offset == after_tex + padding_size)
+        else:
+            self.end_by_tex = (self.meta.s_motion_offset == after_tex)
+
+        if not self.end_by_tex:
+            assert(len(self.meta.s_motion_size_tbl) == self.meta.sentence_num)
+            view = memoryview(buf)
+            pos = self.meta.s_motion_offset
+            self.motions = []
+            for cur_motion_size in self.meta.s_motion_size_tbl:
+                self.motions.append(view[pos:pos + cur_motion_size])
+                pos += cur_motion_size
+
+    def _buffer_views(self) -> list:
+        return [self.tex.dds, *self._motion_blobs()]
+
+    def _section_offsets(self) -> dict[str, int]:
+        offsets = super()._section_offsets()
+        offsets['motions'] = self.meta.s_motion_offset
+        return offsets
+
+    def _matches_meta(self, layout: JmbLayout) -> bool:
+        # NOTE: 没有motion时s_motion_offset指向tex的末尾
+        if layout['tex'].end != self.meta.s_motion_offset:
+            return False
+        if not self.end_by_tex and self.meta.s_motion_size_tbl != [len(motion) for motion in self.motions]:
+            return False
+        return super()._matches_meta(layout)
+
+    def _motion_blobs(self) -> list:
+        if self.end_by_tex:
+            return []
+        return self.motions
 
     def ready_to_write(self) -> bool:
         ready : bool = True
@@ -276,25 +622,42 @@ class gDat_JA(BaseGdat):
         ready &= (self.motions != None)
         return ready
 
-    def recalculate_meta(self):
+    def plan_layout(self, recalculate = True) -> JmbLayout:
+        """
+        Compute the section map write() will produce from record sizes alone (the texture is not touched).
+        recalculate=False describes a write with the current meta offsets (validation=False).
+        """
+        layout = JmbLayout()
+        layout.append('meta', len(self.meta.pack()))
+        layout.append('sentences', len(self.sentences) * record_codec(stOneSentence.FORMAT).size)
+        after_char = layout.append('fParams', len(self.fParams) * stFontParam.STRUCT_SIZE).end
+        if recalculate:
+            layout['fParams'].padding = padding_before(after_char, self.meta.tex_offset)
+        else:
+            layout['fParams'].padding = padding_kept(after_char, self.meta.tex_offset)
+        after_tex = layout.append('tex', self.tex.size()).end
+        if recalculate:
+            layout['tex'].padding = padding_to(after_tex)
+        else:
+            layout['tex'].padding = padding_kept(after_tex, self.meta.s_motion_offset)
+        if not self.end_by_tex:
+            layout.append('motions', sum(len(motion) for motion in self.motions))
+        return layout
+
+    def recalculate_meta(self) -> JmbLayout:
         assert(self.ready_to_write())
-        dummy_fp = io.BytesIO()
+        layout = self.plan_layout()
 
         # NOTE: sentence_offset 前面是Metadata, offset应该不会改变
-        self.meta.write(dummy_fp)
-        after_meta = dummy_fp.tell()
-        assert(after_meta == self.meta.sentence_offset)
+        assert(layout['meta'].size == self.meta.sentence_offset)
 
         # NOTE: 只要句子个数不变，对char_offset应该不存在修改
         assert(len(self.sentences) == self.meta.sentence_num)
-        for sent in self.sentences:
-            sent.write(dummy_fp)
-        after_sent = dummy_fp.tell()
         if True:
-            touch = after_sent
+            touch = layout['fParams'].offset
             not_touched : bool = (self.meta.char_offset == touch)
             print(f"meta: char_offset {self.meta.char_offset} -> {'[SAME]' if not_touched else touch}")
-            self.meta.char_offset = after_sent
+            self.meta.char_offset = touch
 
         # NOTE: ENABLED: 对fParams的修改
         if True:
@@ -303,74 +666,44 @@ class gDat_JA(BaseGdat):
             print(f"meta: char_num {self.meta.char_num} -> {'[SAME]' if not_touched else touch}")
             self.meta.char_num = len(self.fParams)
 
-        assert(len(self.fParams) == self.meta.char_num)
-        for fparam in self.fParams:
-            fparam.write(dummy_fp)
-        after_char = dummy_fp.tell()
-        # padding
-        if after_char != self.meta.tex_offset:
-            padding_size = 32 - (after_char % 32)
-            dummy_fp.write(b'\x00' * padding_size)
-            after_char = dummy_fp.tell()
         if True:
-            touch = after_char
+            touch = layout['tex'].offset
             not_touched : bool = (self.meta.tex_offset == touch)
             print(f"meta: tex_offset {self.meta.tex_offset} -> {'[SAME]' if not_touched else touch}")
-            self.meta.tex_offset = after_char
-
-        assert(dummy_fp.tell() == self.meta.tex_offset)
-        self.tex.write(dummy_fp)
+            self.meta.tex_offset = touch
 
         # NOTE: ENABLED: 对s_motion_offset的修改
-        after_tex = dummy_fp.tell()
-        if after_tex % 32 != 0:
-            padding_size = 32 - (after_tex % 32)
-            dummy_fp.write(b'\x00' * padding_size)
-            after_tex = dummy_fp.tell()
         if True:
-            touch = after_tex
+            touch = layout['tex'].end
             not_touched : bool = (self.meta.s_motion_offset == touch)
             print(f"meta: s_motion_offset {self.meta.s_motion_offset} -> {'[SAME]' if not_touched else touch}")
-            self.meta.s_motion_offset = after_tex
+            self.meta.s_motion_offset = touch
 
-        del dummy_fp
+        return layout
 
     def write(self, fp, validation = True):
         assert(self.ready_to_write())
         if validation:
-            self.recalculate_meta()
+            layout = self.recalculate_meta()
             print("MetaData Recalculated...")
+        else:
+            layout = self.plan_layout(recalculate=False)
 
-        self.meta.write(fp)
-        after_meta = fp.tell()
-        assert( after_meta == self.meta.sentence_offset)
-
-        for sent in self.sentences:
-            sent.write(fp)
-
-        after_sent = fp.tell()
-        assert( after_sent == self.meta.char_offset)
-
-        for fparam in self.fParams:
-            fparam.write(fp)
-
-        after_char = fp.tell()
-        if after_char != self.meta.tex_offset:
-            # 补全 0，直到与32 byte alignment
-            padding_size = 32 - (after_char % 32)
-            fp.write(b'\x00' * padding_size)
-        assert(fp.tell() == self.meta.tex_offset)
-
-        self.tex.write(fp)
-        after_tex = fp.tell()
-        if after_tex != self.meta.s_motion_offset:
-            padding_size = 32 - (after_tex % 32)
-            fp.write(b'\x00' * padding_size)
-        assert(fp.tell() == self.meta.s_motion_offset)
+        self._check_layout(layout)
+        assert(layout['tex'].end == self.meta.s_motion_offset)
 
+        # 表格部分一次写入，纹理单独流式写入，最后是padding与motion
+        start = fp.tell() if validation_level() >= ValidationLevel.PARANOID else 0
+        fp.write(self._pack_tables(layout))
+        write_payload(fp, self.tex.dds)
+        self._check_end(fp, 'tex', start + layout['tex'].offset + layout['tex'].size)
+        tail = bytearray(layout['tex'].padding)
         if not self.end_by_tex:
             for motion in self.motions:
-                fp.write(motion)
+                tail += motion
+        if tail:
+            fp.write(tail)
+        self._check_end(fp, 'file', start + layout.file_size)
 
     def update_sentence_ctl(self, translation: list[list[str]], char2ctl_lookup: dict[str, int], validation_mode = False):
         assert self.meta.sentence_num == len(translation), f"{self.meta.sentence_num=} != {len(translation)}"
@@ -387,7 +720,7 @@ class gDat_JA(BaseGdat):
                     if cur_char == '@':
                         assert k + 2 < len(local_jmk)
                         assert local_jmk[k+1].isalnum() and local_jmk[k+2].isalnum()
-                        local_ctls.append(S16_BE(f"ff{local_jmk[k+1]}{local_jmk[k+2]}").to_int())
+                        local_ctls.append(int(CtlCode.button(local_jmk[k+1:k+3])))
                         k += 3
                         continue
                     # Normal character processing
@@ -395,9 +728,9 @@ class gDat_JA(BaseGdat):
                     k += 1
 
                 assert len(local_ctls) < jmbConst.JIMAKU_CHAR_MAX
-                local_ctls.append(-2)
+                local_ctls.append(CtlCode.RET)
                 while len(local_ctls) < jmbConst.JIMAKU_CHAR_MAX:
-                    local_ctls.append(-1)
+                    local_ctls.append(CtlCode.PAD)
                 assert len(local_ctls) == len(self.sentences[i].jimaku_list[j].char_data)
 
                 if validation_mode:
@@ -407,4 +740,78 @@ class gDat_JA(BaseGdat):
                 else:
                     self.sentences[i].jimaku_list[j].overwrite_ctl(local_ctls)
 
+SENTENCE_CHUNK = 64     # records per read in iter_sentences / iter_lines
+
+class JimakuLine(NamedTuple):
+    sentence: int
+    line: int                   # jimaku_list index (0 for US)
+    wait: int
+    disp_time: int
+    char_data: tuple[int, ...]  # control codes before RET
+
+def _iter_sentence_chunks(source, kind: JmkKind | None, bigEndian: bool):
+    """
+    (record_cls, bigEndian, first, chunk, count): the sentence table read SENTENCE_CHUNK records at a time
+    into one reused buffer; the meta is the only other part of the file read
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            yield from _iter_sentence_chunks(fp, kind, bigEndian)
+        return
+    if kind is None:
+        file_kind, bigEndian = sniff(source)
+        assert file_kind in (FileKind.JMB_JA, FileKind.JMB_US), f"not a JMB file: {file_kind.name}"
+        kind = JmkKind.JA if file_kind == FileKind.JMB_JA else JmkKind.US
+    source.seek(0)
+    if kind == JmkKind.JA:
+        meta, record_cls = MetaData_JA(source, bigEndian), stOneSentence
+    else:
+        # NOTE: 与gDat_US一致，US只按小端读取
+        meta, record_cls, bigEndian = MetaData_US(source), stJimaku_US, False
+    record_size = record_codec(record_cls.FORMAT, bigEndian).size
+    source.seek(meta.sentence_offset)
+    buf = bytearray(record_size * min(SENTENCE_CHUNK, max(meta.sentence_num, 0)))
+    remaining = meta.sentence_num
+    while remaining > 0:
+        count = min(remaining, SENTENCE_CHUNK)
+        with memoryview(buf)[:record_size * count] as chunk:
+            assert source.readinto(chunk) == len(chunk), "sentence table truncated"
+            yield record_cls, bigEndian, meta.sentence_num - remaining, chunk, count
+        remaining -= count
+
+def iter_sentences(source, kind: JmkKind | None = None, bigEndian = False) -> Iterator[stOneSentence | stJimaku_US]:
+    """
+    Decode the sentences of a JMB file one at a time, with constant memory:
+    only the meta and the sentence table are read (no fParams, no texture).
+
+    source: filepath (str) | seekable fp
+    kind: JmkKind (JA | US), None to detect kind and endianness from the header
+    """
+    for record_cls, bigEndian, _, chunk, count in _iter_sentence_chunks(source, kind, bigEndian):
+        yield from unpack_records(chunk, 0, record_cls, count, bigEndian)
+
+def iter_lines(source, kind: JmkKind | None = None, bigEndian = False) -> Iterator[JimakuLine]:
+    """
+    Valid lines (char_data[0] != -1) of a JMB file as JimakuLine tuples, without building record objects.
+    Same reading pattern as iter_sentences().
+    """
+    for record_cls, bigEndian, first, chunk, count in _iter_sentence_chunks(source, kind, bigEndian):
+        codec = record_codec(record_cls.FORMAT, bigEndian)
+        if record_cls is stOneSentence:
+            bases = [stInfo.FIELD_NUM + j * stJimaku_JA.FIELD_NUM for j in range(jmbConst.JIMAKU_LINE_MAX)]
+            char_max = jmbConst.JIMAKU_CHAR_MAX
+        else:
+            bases = [0]
+            char_max = jmbConst.US_JIMAKU_CHAR_MAX
+        for i, values in enumerate(codec.iter_unpack(chunk), first):
+            for j, pos in enumerate(bases):
+                char_data = values[pos + 2:pos + 2 + char_max]
+                if char_data[0] == CtlCode.PAD:
+                    continue
+                try:
+                    valid_len = char_data.index(CtlCode.RET)
+                except ValueError:
+                    valid_len = 0
+                yield JimakuLine(i, j, values[pos], values[pos + 1], char_data[:valid_len])
+
 gDat = Union[gDat_JA, gDat_US]
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Minimal DDS header decoding, enough to splice rows of blocks between two textures of the same format
+(block-compressed rows are independent, so a texture can be patched without recompressing it whole).
+"""
+import struct
+
+DDS_HEADER_SIZE = 128               # 'DDS ' + DDS_HEADER
+DX10_HEADER_SIZE = 20
+DDSD_LINEARSIZE = 0x80000
+DDPF_FOURCC = 0x4
+
+# bytes per 4x4 block
+_FOURCC_BLOCK_BYTES = {
+    b'DXT1': 8, b'ATI1': 8, b'BC4U': 8, b'BC4S': 8,
+    b'DXT2': 16, b'DXT3': 16, b'DXT4': 16, b'DXT5': 16, b'ATI2': 16, b'BC5U': 16, b'BC5S': 16,
+}
+# DXGI_FORMAT -> (block size in pixels, bytes per block)
+_DXGI_BLOCKS = {
+    **{fmt: (4, 8) for fmt in (70, 71, 72, 79, 80, 81)},                                # BC1, BC4
+    **{fmt: (4, 16) for fmt in (73, 74, 75, 76, 77, 78, 82, 83, 84, 94, 95, 96, 97, 98, 99)},   # BC2/3/5/6H/7
+    **{fmt: (1, 4) for fmt in (27, 28, 29, 30, 31, 32, 87, 88, 89, 90, 91, 92, 93)},    # RGBA8 / BGRA8
+}
+
+class DdsLayout:
+    def __init__(self, dds):
+        head = bytes(dds[:DDS_HEADER_SIZE + DX10_HEADER_SIZE])
+        assert head[:4] == b'DDS ', f"Readed magic number:{head[:4]}, expect: 'DDS '; Please check if it is a DDS texture."
+        self.flags, self.height, self.width = struct.unpack_from('<III', head, 8)
+        mip_count, = struct.unpack_from('<I', head, 28)
+        pf_flags, fourcc, rgb_bits = struct.unpack_from('<I4sI', head, 80)
+        assert mip_count <= 1, f"mipmapped DDS is not supported ({mip_count} levels)"
+
+        self.data_offset = DDS_HEADER_SIZE
+        if pf_flags & DDPF_FOURCC and fourcc == b'DX10':
+            self.data_offset += DX10_HEADER_SIZE
+            dxgi_format, = struct.unpack_from('<I', head, DDS_HEADER_SIZE)
+            assert dxgi_format in _DXGI_BLOCKS, f"unsupported DXGI format: {dxgi_format}"
+            self.block, self.block_bytes = _DXGI_BLOCKS[dxgi_format]
+        elif pf_flags & DDPF_FOURCC:
+            assert fourcc in _FOURCC_BLOCK_BYTES, f"unsupported FourCC: {fourcc}"
+            self.block, self.block_bytes = 4, _FOURCC_BLOCK_BYTES[fourcc]
+        else:
+            self.block, self.block_bytes = 1, rgb_bits // 8
+        self.format = head[76:108] + head[DDS_HEADER_SIZE:self.data_offset]     # DDS_PIXELFORMAT (+ DX10 header)
+        self.header = head[:self.data_offset]
+
+    @property
+    def row_bytes(self) -> int:
+        """
+        bytes of one row of blocks
+        """
+        return -(-self.width // self.block) * self.block_bytes
+
+    def rows_size(self, height: int) -> int:
+        return -(-height // self.block) * self.row_bytes
+
+def splice_dds_rows(base, band, top: int) -> bytes:
+    """
+    `base` with its rows from `top` (pixels) down replaced by the texture `band`.
+
+    Both must have the same width and pixel format and a single mip level; `top` must be on a block
+    boundary. The result is `top + band height` pixels tall, so `band` may grow or shrink the texture.
+    """
+    base_layout, band_layout = DdsLayout(base), DdsLayout(band)
+    assert base_layout.format == band_layout.format, "DDS pixel formats differ"
+    assert base_layout.width == band_layout.width, f"DDS widths differ: {base_layout.width} != {band_layout.width}"
+    assert top % base_layout.block == 0, f"row {top} is not on a {base_layout.block}-pixel block boundary"
+    assert top <= base_layout.height, f"row {top} is below the texture ({base_layout.height} rows)"
+
+    height = top + band_layout.height
+    kept = base_layout.rows_size(top)
+    band_data = band[band_layout.data_offset:band_layout.data_offset + band_layout.rows_size(band_layout.height)]
+    header = bytearray(base_layout.header)
+    struct.pack_into('<I', header, 12, height)
+    if base_layout.flags & DDSD_LINEARSIZE:
+        struct.pack_into('<I', header, 20, base_layout.rows_size(height))
+    return b''.join((bytes(header),
+                     bytes(base[base_layout.data_offset:base_layout.data_offset + kept]),
+                     bytes(band_data)))
@@ -0,0 +1,179 @@
+"""
+SQLite index of the sentences, timings, control codes and font params of a JMB corpus,
+for queries that would otherwise need every file to be loaded.
+"""
+import os
+import sqlite3
+
+from . import jmbConst
+from .jmbConst import FileKind
+from .jmbCorpus import CorpusFile, discover, run_corpus
+from .jmbNumeric import CtlCode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id          INTEGER PRIMARY KEY,
+    path        TEXT UNIQUE NOT NULL,
+    kind        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sentence_num INTEGER NOT NULL,
+    char_num    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lines (
+    file_id     INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    sentence    INTEGER NOT NULL,
+    line        INTEGER NOT NULL,       -- jimaku_list index (0 for US)
+    valid_len   INTEGER NOT NULL,
+    wait        INTEGER NOT NULL,       -- 1/JIMAKU_TIME_UNIT s
+    disp_time   INTEGER NOT NULL,
+    PRIMARY KEY (file_id, sentence, line)
+);
+CREATE TABLE IF NOT EXISTS codes (
+    file_id     INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    sentence    INTEGER NOT NULL,
+    line        INTEGER NOT NULL,
+    position    INTEGER NOT NULL,
+    code        INTEGER NOT NULL,       -- signed char_data value
+    glyph       INTEGER                 -- fParams index, NULL for spaces/buttons
+);
+CREATE TABLE IF NOT EXISTS glyphs (
+    file_id     INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    glyph       INTEGER NOT NULL,
+    u INTEGER NOT NULL, v INTEGER NOT NULL, w INTEGER NOT NULL, h INTEGER NOT NULL,
+    PRIMARY KEY (file_id, glyph)
+);
+CREATE INDEX IF NOT EXISTS codes_by_code ON codes(code, file_id);
+CREATE INDEX IF NOT EXISTS codes_by_glyph ON codes(file_id, glyph);
+CREATE INDEX IF NOT EXISTS lines_by_wait ON lines(file_id, wait);
+"""
+
+JMB_KINDS = (FileKind.JMB_JA, FileKind.JMB_US)
+
+def _extract_rows(file: CorpusFile) -> tuple[tuple, list, list, list]:
+    """
+    (files row, lines rows, codes rows, glyphs rows) of one JMB file, without file_id
+    """
+    st = os.stat(file.path)
+    lines, codes = [], []
+    with file.open(lazy=True) as gdat:
+        if file.kind == FileKind.JMB_JA:
+            jimaku_iter = ((i, j, jmk) for i, sent in enumerate(gdat.sentences)
+                           for j, jmk in enumerate(sent.jimaku_list))
+        else:
+            jimaku_iter = ((i, 0, jmk) for i, jmk in enumerate(gdat.sentences))
+        for i, j, jmk in jimaku_iter:
+            if not jmk.valid():
+                continue
+            valid_len = jmk.valid_len()
+            lines.append((i, j, valid_len, jmk.wait, jmk.disp_time))
+            for k in range(valid_len):
+                code = CtlCode(jmk.char_data[k])
+                glyph = code.glyph_index
+                codes.append((i, j, k, int(code), glyph if glyph >= 0 else None))
+        glyphs = [(idx, p.u, p.v, p.w, p.h) for idx, p in enumerate(gdat.fParams)]
+        header = (file.kind.name, st.st_size, st.st_mtime_ns, gdat.meta.sentence_num, gdat.meta.char_num)
+    return header, lines, codes, glyphs
+
+class CorpusIndex:
+    """
+    Index stored in the SQLite database `db_path`; update() only re-reads files whose size/mtime changed.
+    The tables (files, lines, codes, glyphs) can also be queried directly through query().
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self.errors : list = []             # CorpusResult of the files the last update() failed to read
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self, root: str, workers: int = 1) -> tuple[int, int]:
+        """
+        Index new/changed JMB files under `root` (decoded by `workers` processes, see jmbCorpus.run_corpus)
+        and drop files that no longer exist there. Returns (indexed, removed) file counts;
+        files that failed to decode are left out and kept in self.errors.
+        """
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self.conn.execute("SELECT path, size, mtime_ns FROM files")}
+        root = os.path.abspath(root)
+        seen = set()
+        changed = []
+        for file in discover(root, kinds=JMB_KINDS):
+            seen.add(file.path)
+            st = os.stat(file.path)
+            if known.get(file.path) != (st.st_size, st.st_mtime_ns):
+                changed.append(file)
+
+        self.errors = []
+        indexed = 0
+        for result in run_corpus(_extract_rows, changed, workers):
+            if not result.ok:
+                self.errors.append(result)
+                continue
+            self._insert(result.file.path, *result.value)
+            indexed += 1
+
+        removed = [path for path in known
+                   if path not in seen and os.path.commonpath([root, path]) == root]
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        return indexed, len(removed)
+
+    def _insert(self, path: str, header: tuple, lines: list, codes: list, glyphs: list):
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            file_id = self.conn.execute(
+                "INSERT INTO files (path, kind, size, mtime_ns, sentence_num, char_num) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, *header)).lastrowid
+            self.conn.executemany("INSERT INTO lines VALUES (?, ?, ?, ?, ?, ?)",
+                                  [(file_id, *row) for row in lines])
+            self.conn.executemany("INSERT INTO codes VALUES (?, ?, ?, ?, ?, ?)",
+                                  [(file_id, *row) for row in codes])
+            self.conn.executemany("INSERT INTO glyphs VALUES (?, ?, ?, ?, ?, ?)",
+                                  [(file_id, *row) for row in glyphs])
+
+    def query(self, sql: str, params = ()) -> list[tuple]:
+        return self.conn.execute(sql, params).fetchall()
+
+    def files_using_code(self, code: int) -> list[str]:
+        return [path for path, in self.query(
+            "SELECT DISTINCT f.path FROM codes c JOIN files f ON f.id = c.file_id WHERE c.code = ? ORDER BY f.path",
+            (int(CtlCode(code)),))]
+
+    def lines_with_glyph(self, path: str, glyph: int) -> list[tuple[int, int, int]]:
+        """
+        (sentence, line, position) of every use of fParams[glyph] in `path`
+        """
+        return self.query(
+            "SELECT c.sentence, c.line, c.position FROM codes c JOIN files f ON f.id = c.file_id "
+            "WHERE f.path = ? AND c.glyph = ? ORDER BY c.sentence, c.line, c.position",
+            (os.path.abspath(path), glyph))
+
+    def lines_near_wait(self, path: str, seconds: float, tolerance: float = 1.0) -> list[tuple[int, int, int, int]]:
+        """
+        (sentence, line, wait, disp_time) of the lines of `path` whose wait is within `tolerance` seconds of `seconds`
+        """
+        lo = round((seconds - tolerance) * jmbConst.JIMAKU_TIME_UNIT)
+        hi = round((seconds + tolerance) * jmbConst.JIMAKU_TIME_UNIT)
+        return self.query(
+            "SELECT l.sentence, l.line, l.wait, l.disp_time FROM lines l JOIN files f ON f.id = l.file_id "
+            "WHERE f.path = ? AND l.wait BETWEEN ? AND ? ORDER BY l.sentence, l.line",
+            (os.path.abspath(path), lo, hi))
+
+    def glyph_size(self, path: str, glyph: int) -> tuple[int, int, int, int] | None:
+        """
+        (u, v, w, h) of fParams[glyph] in `path`
+        """
+        rows = self.query(
+            "SELECT g.u, g.v, g.w, g.h FROM glyphs g JOIN files f ON f.id = g.file_id WHERE f.path = ? AND g.glyph = ?",
+            (os.path.abspath(path), glyph))
+        return rows[0] if rows else None
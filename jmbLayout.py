@@ -0,0 +1,74 @@
+ALIGNMENT = 32
+
+def padding_to(pos: int, alignment: int = ALIGNMENT) -> int:
+    """
+    Number of zero bytes needed to bring `pos` up to the next multiple of `alignment` (0 if already aligned).
+    """
+    return (-pos) % alignment
+
+def padding_before(pos: int, expected_offset: int, alignment: int = ALIGNMENT) -> int:
+    """
+    Padding written between the font params and the texture.
+
+    NOTE: 与write的行为保持一致: 只有当位置与现有offset不同时才补齐，
+          并且即使已经对齐也会补满一个alignment (32 byte)
+    """
+    if pos == expected_offset:
+        return 0
+    return alignment - (pos % alignment)
+
+def padding_kept(pos: int, offset: int, alignment: int = ALIGNMENT) -> int:
+    """
+    Padding that keeps the next section at its current `offset` (layouts planned without
+    recalculating the meta); falls back to padding_before() when `pos` is already past it.
+    """
+    if pos <= offset:
+        return offset - pos
+    return padding_before(pos, offset, alignment)
+
+class Section:
+    def __init__(self, name: str, offset: int, size: int, padding: int = 0):
+        self.name = name
+        self.offset = offset        # start of the section in the file
+        self.size = size            # payload bytes
+        self.padding = padding      # zero bytes written after the payload
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size + self.padding
+
+    def __repr__(self):
+        return (f"Section({self.name}, offset={self.offset}, size={self.size}, padding={self.padding})")
+
+class JmbLayout:
+    """
+    Ordered section map (meta, sentences, fParams, tex, [motions]) of a JMB file,
+    computed from record sizes only, without serializing anything.
+    """
+    def __init__(self):
+        self.sections : list[Section] = []
+
+    def append(self, name: str, size: int, padding: int = 0) -> Section:
+        section = Section(name, self.file_size, size, padding)
+        self.sections.append(section)
+        return section
+
+    @property
+    def file_size(self) -> int:
+        return self.sections[-1].end if self.sections else 0
+
+    def __getitem__(self, name: str) -> Section:
+        for section in self.sections:
+            if section.name == name:
+                return section
+        raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return any(section.name == name for section in self.sections)
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __repr__(self):
+        lines = ',\n  '.join(repr(section) for section in self.sections)
+        return f"JmbLayout(file_size={self.file_size},\n  {lines}\n)"
@@ -1,4 +1,5 @@
 import struct
+from enum import IntEnum
 
 class S16_BE:
     def __init__(self, value):
@@ -34,3 +35,108 @@ class S16_BE:
 
     def __repr__(self):
         return f'S16_BigEndian("{self.value.hex(" ")}")'
+
+class CtlKind(IntEnum):
+    GLYPH   = 0     # plain glyph index into fParams
+    SATSU   = 1     # 殺 glyph (SATSU_FLAG | index)
+    SHI     = 2     # 死 glyph (SHI_FLAG | index)
+    SPACE_H = 3     # half-width space
+    SPACE_Z = 4     # full-width space
+    BUTTON  = 5     # controller related buttons (ffXX)
+    RET     = 6     # end of line
+    PAD     = 7     # unused slot after RET
+
+class CtlCode(int):
+    """
+    Control code of char_data: a signed 16-bit value kept as a plain int.
+
+    Accepts an int (signed, or unsigned up to 0xffff), a hex string ("8000") or big-endian bytes,
+    same as S16_BE, but `|`/`&`/`==` are integer operations.
+    """
+    SATSU_FLAG  = 0x8000
+    SHI_FLAG    = 0x7000
+    GLYPH_MASK  = 0x0fff
+    BUTTON_MASK = 0xff00
+    SPACE_H     = -3        # fffd
+    SPACE_Z     = -4        # fffc
+    RET         = -2        # fffe
+    PAD         = -1        # ffff
+
+    def __new__(cls, value = 0):
+        if isinstance(value, str):
+            value = int(value, 16)
+        elif isinstance(value, (bytes, bytearray)):
+            value = int.from_bytes(value, 'big')
+        elif isinstance(value, S16_BE):
+            value = value.to_int()
+        assert -0x8000 <= value <= 0xffff, f"{value} out of s16 range"
+        return super().__new__(cls, value - 0x10000 if value >= 0x8000 else value)
+
+    @classmethod
+    def glyph(cls, index: int, kind: CtlKind = CtlKind.GLYPH) -> 'CtlCode':
+        """
+        Code of the `index`-th glyph of the atlas; kind is GLYPH, SATSU or SHI.
+        """
+        assert 0 <= index <= cls.GLYPH_MASK, f"glyph index {index} out of range"
+        if kind == CtlKind.SATSU:
+            return cls(index | cls.SATSU_FLAG)
+        if kind == CtlKind.SHI:
+            return cls(index | cls.SHI_FLAG)
+        assert kind == CtlKind.GLYPH, f"{kind} is not a glyph kind"
+        return cls(index)
+
+    @classmethod
+    def button(cls, code: str) -> 'CtlCode':
+        """
+        `@XX` sequence of the translation -> ffXX
+        """
+        assert len(code) == 2, f"button code should be 2 hex digits: {code}"
+        return cls(cls.BUTTON_MASK | int(code, 16))
+
+    @property
+    def unsigned(self) -> int:
+        return int(self) & 0xffff
+
+    @property
+    def kind(self) -> CtlKind:
+        unsigned = int(self) & 0xffff
+        if unsigned & self.BUTTON_MASK == self.BUTTON_MASK:
+            if self == self.PAD:
+                return CtlKind.PAD
+            if self == self.RET:
+                return CtlKind.RET
+            if self == self.SPACE_H:
+                return CtlKind.SPACE_H
+            if self == self.SPACE_Z:
+                return CtlKind.SPACE_Z
+            return CtlKind.BUTTON
+        if unsigned & self.SATSU_FLAG:
+            return CtlKind.SATSU
+        if unsigned & self.SHI_FLAG:
+            return CtlKind.SHI
+        return CtlKind.GLYPH
+
+    @property
+    def glyph_index(self) -> int:
+        """
+        index into fParams, -1 for codes without a glyph (spaces, buttons, RET, padding)
+        """
+        return self.classify()[0]
+
+    def classify(self) -> tuple[int, CtlKind]:
+        kind = self.kind
+        if kind <= CtlKind.SHI:
+            return int(self) & self.GLYPH_MASK, kind
+        return -1, kind
+
+    def to_int(self) -> int:
+        return int(self)
+
+    def __or__(self, other) -> 'CtlCode':
+        return CtlCode((int(self) & 0xffff) | (int(other) & 0xffff))
+
+    def __and__(self, other) -> 'CtlCode':
+        return CtlCode(int(self) & int(other) & 0xffff)
+
+    def __repr__(self):
+        return f'CtlCode("{int(self) & 0xffff:04x}")'
@@ -0,0 +1,359 @@
+"""
+Compact sentence storage: all records of a table live in one bytearray, and the
+Packed* classes are __slots__ flyweights that read/write their fields in place
+with the same attribute API as the jmbStruct records.
+"""
+from collections.abc import Sequence
+
+from . import jmbConst
+from .jmbStruct import (
+    record_codec, read_c_string, write_c_string,
+    stRubiDat, stInfo, stJimaku_JA, stJimaku_US, stOneSentence,
+)
+
+class _Scalar:
+    __slots__ = ('offset', 'codecs')
+    def __init__(self, fmt: str, offset: int):
+        self.offset = offset
+        self.codecs = (record_codec(fmt, False), record_codec(fmt, True))
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return self.codecs[obj._big].unpack_from(obj._buf, obj._off + self.offset)[0]
+
+    def __set__(self, obj, value):
+        self.codecs[obj._big].pack_into(obj._buf, obj._off + self.offset, value)
+
+class _Bytes:
+    __slots__ = ('offset', 'length')
+    def __init__(self, offset: int, length: int):
+        self.offset = offset
+        self.length = length
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        start = obj._off + self.offset
+        return bytes(obj._buf[start:start + self.length])
+
+    def __set__(self, obj, value: bytes):
+        assert len(value) == self.length, f"expecting {self.length} bytes, got {len(value)}"
+        start = obj._off + self.offset
+        obj._buf[start:start + self.length] = value
+
+class _CString(_Bytes):
+    __slots__ = ()
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return read_c_string(super().__get__(obj, objtype))
+
+    def __set__(self, obj, value: str):
+        super().__set__(obj, write_c_string(value, self.length))
+
+class PackedArray:
+    """
+    Fixed-length numeric array inside a packed record (char_data, char_id).
+    Behaves like the list it replaces; item assignment writes through.
+    """
+    __slots__ = ('_buf', '_off', '_count', '_fmt', '_big')
+    def __init__(self, buf, offset: int, count: int, fmt: str, bigEndian = False):
+        self._buf = buf
+        self._off = offset
+        self._count = count
+        self._fmt = fmt
+        self._big = bigEndian
+
+    def tolist(self) -> list[int]:
+        return list(record_codec(f'{self._count}{self._fmt}', self._big).unpack_from(self._buf, self._off))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"array index out of range: {index}")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        codec = record_codec(self._fmt, self._big)
+        return codec.unpack_from(self._buf, self._off + self._index(index) * codec.size)[0]
+
+    def __setitem__(self, index: int, value: int):
+        codec = record_codec(self._fmt, self._big)
+        codec.pack_into(self._buf, self._off + self._index(index) * codec.size, value)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __contains__(self, value) -> bool:
+        return value in self.tolist()
+
+    def index(self, value) -> int:
+        return self.tolist().index(value)
+
+    def count(self, value) -> int:
+        return self.tolist().count(value)
+
+    def __eq__(self, other):
+        if isinstance(other, (PackedArray, list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+class _Array:
+    __slots__ = ('offset', 'count', 'fmt')
+    def __init__(self, fmt: str, offset: int, count: int):
+        self.fmt = fmt
+        self.offset = offset
+        self.count = count
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return PackedArray(obj._buf, obj._off + self.offset, self.count, self.fmt, obj._big)
+
+    def __set__(self, obj, values):
+        values = list(values)
+        assert len(values) == self.count, f"expecting {self.count} values, got {len(values)}"
+        record_codec(f'{self.count}{self.fmt}', obj._big).pack_into(obj._buf, obj._off + self.offset, *values)
+
+class PackedRecordStore(Sequence):
+    """
+    `count` fixed-size records stored back to back in `buf` from `offset`, exposed as flyweights.
+    Assigning an index copies any record (jmbStruct or Packed*) into the buffer.
+    """
+    def __init__(self, buf, flyweight_cls, count: int, bigEndian = False, offset: int = 0):
+        self._buf = buf
+        self._flyweight_cls = flyweight_cls
+        self._count = count
+        self._big_endian = bigEndian
+        self._offset = offset
+        assert offset + count * flyweight_cls.STRUCT_SIZE <= len(buf), (
+            f"{flyweight_cls.__name__} table out of range"
+        )
+
+    @classmethod
+    def read(cls, fp, flyweight_cls, count: int, bigEndian = False) -> 'PackedRecordStore':
+        buf = bytearray(count * flyweight_cls.STRUCT_SIZE)
+        assert fp.readinto(buf) == len(buf), f"Size mismatch in PackedRecordStore.read({flyweight_cls.__name__})"
+        return cls(buf, flyweight_cls, count, bigEndian)
+
+    @classmethod
+    def from_records(cls, records, flyweight_cls, bigEndian = False) -> 'PackedRecordStore':
+        buf = bytearray(len(records) * flyweight_cls.STRUCT_SIZE)
+        store = cls(buf, flyweight_cls, len(records), bigEndian)
+        for i, record in enumerate(records):
+            store[i] = record
+        return store
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"record index out of range: {index}")
+        return index
+
+    def record_offset(self, index: int) -> int:
+        return self._offset + self._index(index) * self._flyweight_cls.STRUCT_SIZE
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        return self._flyweight_cls(self._buf, self.record_offset(index), self._big_endian)
+
+    def __setitem__(self, index: int, record):
+        record.pack_into(self._buf, self.record_offset(index))
+
+    def __repr__(self):
+        return f"PackedRecordStore({self._flyweight_cls.__name__}, {self._count} records, {len(self._buf)} bytes)"
+
+class _PackedRecord:
+    __slots__ = ('_buf', '_off', '_big')
+    FORMAT : str
+    STRUCT_SIZE : int
+
+    def __init__(self, buf, offset: int = 0, bigEndian = False):
+        self._buf = buf
+        self._off = offset
+        self._big = bigEndian
+
+    def _codec(self):
+        return record_codec(self.FORMAT, self._big)
+
+    def pack(self) -> bytes:
+        return bytes(self._buf[self._off:self._off + self.STRUCT_SIZE])
+
+    def pack_into(self, buf, offset=0):
+        memoryview(buf)[offset:offset + self.STRUCT_SIZE] = memoryview(self._buf)[self._off:self._off + self.STRUCT_SIZE]
+
+    def unpack_from(self, buf, offset=0):
+        memoryview(self._buf)[self._off:self._off + self.STRUCT_SIZE] = memoryview(buf)[offset:offset + self.STRUCT_SIZE]
+
+    def write(self, fp):
+        fp.write(memoryview(self._buf)[self._off:self._off + self.STRUCT_SIZE])
+
+def _padded_ctls(new_ctls: list[int], max_len: int) -> list[int]:
+    assert len(new_ctls) > 0, "new control codes should not be empty"
+    needs_padding : bool = not (-2 in new_ctls)
+    if needs_padding:
+        assert len(new_ctls) < max_len, f"length of control codes should not exceed the maximum length ({max_len})"
+        return list(new_ctls) + [-2] + [-1] * (max_len - len(new_ctls) - 1)
+    assert len(new_ctls) == max_len, f"length of control codes should be the same as the maximum length ({max_len})"
+    return list(new_ctls)
+
+class PackedRubiDat(_PackedRecord):
+    __slots__ = ()
+    FORMAT = stRubiDat.FORMAT
+    STRUCT_SIZE = 22
+    from_num = _Scalar('b', 0)                                          # s8
+    to_num = _Scalar('b', 1)                                            # s8
+    char_id = _Array('h', 2, jmbConst.JIMAKU_RUBI_MAX)                  # s16[jmbConst.JIMAKU_RUBI_MAX]
+
+    def clear(self):
+        self.from_num = -1
+        self.to_num = -1
+        self.char_id = [-1] * jmbConst.JIMAKU_RUBI_MAX
+
+    def __repr__(self):
+        if self.from_num != -1 and self.to_num != -1:
+            valid_rubis = [num for num in self.char_id if num != -1]
+            return f"stRubiDat({self.from_num}->{self.to_num}, {valid_rubis})"
+        else:
+            return ""
+
+class PackedJimaku_US(_PackedRecord):
+    __slots__ = ()
+    FORMAT = stJimaku_US.FORMAT
+    STRUCT_SIZE = 264
+    wait = _Scalar('i', 0)                                              # s32
+    disp_time = _Scalar('i', 4)                                         # s32
+    char_data = _Array('h', 8, jmbConst.US_JIMAKU_CHAR_MAX)             # s16[jmbConst.US_JIMAKU_CHAR_MAX]
+
+    def valid(self) -> bool:
+        return self.char_data[0] != -1
+
+    def valid_len(self) -> int:
+        if not self.valid():
+            return 0
+        try:
+            return self.char_data.index(-2)
+        except ValueError:
+            return 0
+
+    def overwrite_ctl(self, new_ctls: list[int]):
+        self.char_data = _padded_ctls(new_ctls, jmbConst.US_JIMAKU_CHAR_MAX)
+
+    def __repr__(self):
+        char_str = ''.join([chr(c) if c > 0 else f'[{c}]' for c in self.char_data[:8]])
+        return (f"stJimaku_US(wait={self.wait}, disp_time={self.disp_time}, "
+                f"char_data='{char_str}...')")
+
+class PackedJimaku_JA(_PackedRecord):
+    __slots__ = ()
+    FORMAT = stJimaku_JA.FORMAT
+    STRUCT_SIZE = 424
+    wait = _Scalar('i', 0)                                              # s32
+    disp_time = _Scalar('i', 4)                                         # s32
+    char_data = _Array('h', 8, jmbConst.JIMAKU_CHAR_MAX)                # s16[jmbConst.JIMAKU_CHAR_MAX]
+
+    @property
+    def rubi_data(self) -> PackedRecordStore:                           # stRubiDat[jmbConst.JIMAKU_RUBI_DAT_MAX]
+        return PackedRecordStore(self._buf, PackedRubiDat, jmbConst.JIMAKU_RUBI_DAT_MAX, self._big, self._off + 72)
+
+    @rubi_data.setter
+    def rubi_data(self, records):
+        store = self.rubi_data
+        assert len(records) == len(store), f"expecting {len(store)} rubi records, got {len(records)}"
+        for i, record in enumerate(records):
+            store[i] = record
+
+    def valid(self) -> bool:
+        return self.char_data[0] != -1
+
+    def valid_len(self) -> int:
+        if not self.valid():
+            return 0
+        try:
+            return self.char_data.index(-2)
+        except ValueError:
+            return 0
+
+    def overwrite_ctl(self, new_ctls: list[int]):
+        self.char_data = _padded_ctls(new_ctls, jmbConst.JIMAKU_CHAR_MAX)
+        for rubi in self.rubi_data:
+            rubi.clear()
+
+    def __repr__(self):
+        char_str = ''.join([chr(c) if c > 0 else f'[{c}]' for c in self.char_data[:8]])
+        return (f"stJimaku(wait={self.wait}, disp_time={self.disp_time}, "
+                f"char_data='{char_str}...', rubi_data={jmbConst.JIMAKU_RUBI_DAT_MAX} items)")
+
+class PackedInfo(_PackedRecord):
+    __slots__ = ()
+    FORMAT = stInfo.FORMAT
+    STRUCT_SIZE = 76
+    wait = _Scalar('i', 0)                                              # s32
+    hps_file = _CString(4, jmbConst.FILE_LENGTH)
+    mth_file = _CString(4 + jmbConst.FILE_LENGTH, jmbConst.FILE_LENGTH)
+    back_locate = _Scalar('h', 68)                                      # s16
+    countinue = _Scalar('h', 70)                                        # s16
+    key = _Scalar('h', 72)                                              # s16
+    padding = _Bytes(74, 2)
+
+    def __repr__(self):
+        return (f"stInfo(wait={self.wait}, hps_file='{self.hps_file}', "
+                f"mth_file='{self.mth_file}', "
+                f"back_locate={self.back_locate}, countinue={self.countinue}, key={self.key}, padding={self.padding})")
+
+class PackedOneSentence(_PackedRecord):
+    __slots__ = ()
+    FORMAT = stOneSentence.FORMAT
+    STRUCT_SIZE = 6860
+
+    @property
+    def info(self) -> PackedInfo:
+        return PackedInfo(self._buf, self._off, self._big)
+
+    @info.setter
+    def info(self, record):
+        record.pack_into(self._buf, self._off)
+
+    @property
+    def jimaku_list(self) -> PackedRecordStore:
+        return PackedRecordStore(self._buf, PackedJimaku_JA, jmbConst.JIMAKU_LINE_MAX, self._big,
+                                 self._off + PackedInfo.STRUCT_SIZE)
+
+    @jimaku_list.setter
+    def jimaku_list(self, records):
+        store = self.jimaku_list
+        assert len(records) == len(store), f"expecting {len(store)} jimaku records, got {len(records)}"
+        for i, record in enumerate(records):
+            store[i] = record
+
+    def valid_jmk_num(self) -> int:
+        ret = 0
+        for jmk in self.jimaku_list:
+            if not jmk.valid():
+                return ret
+            ret += 1
+        return ret
+
+    def __repr__(self):
+        return (f"stOneSentence(\n  info={self.info},\n  "
+                f"jimaku_list=[{jmbConst.JIMAKU_LINE_MAX} items])")
+
+PACKED_RECORDS = {
+    stOneSentence: PackedOneSentence,
+    stJimaku_US: PackedJimaku_US,
+}
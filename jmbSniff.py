@@ -0,0 +1,95 @@
+"""
+Header-only file type detection: reads a few hundred bytes (plus the texMeta a JMB points to),
+never the sentence tables.
+"""
+import os
+
+from .jmbConst import FileKind
+from .jmbStruct import MetaData_JA, MetaData_US, record_codec, stJimaku_US, stOneSentence, stFontParam
+
+SNIFF_SIZE = 256
+TEX_META_SIZE = 72
+
+def _is_tex_meta(head: bytes) -> bool | None:
+    """
+    True/False: bare texMeta (GCT0/0000 ... K7TX) in little/big endian; None: not a texMeta
+    """
+    if len(head) < TEX_META_SIZE or head[:4] not in (b'GCT0', b'\x00'*4):
+        return None
+    if head[64:68] == b'K7TX':
+        return False
+    if head[64:68] == b'XT7K':
+        return True
+    return None
+
+def _plausible_jmb(head: bytes, kind: FileKind, bigEndian: bool, file_size: int | None) -> bool:
+    """
+    offset arithmetic of MetaData_US / MetaData_JA:
+    sentences right after the meta, fParams right after the sentences, texture after the fParams
+    """
+    if kind == FileKind.JMB_US:
+        meta_cls, record_cls = MetaData_US, stJimaku_US
+    else:
+        meta_cls, record_cls = MetaData_JA, stOneSentence
+    codec = record_codec(meta_cls.FORMAT, bigEndian)
+    if len(head) < codec.size:
+        return False
+    sentence_num, char_num, sentence_offset, char_offset, tex_offset, *rest = codec.unpack_from(head)
+    if sentence_num < 0 or char_num < 0:
+        return False
+    meta_size = codec.size if kind == FileKind.JMB_US else codec.size + 4 * sentence_num
+    sentence_size = record_codec(record_cls.FORMAT, bigEndian).size
+    if sentence_offset != meta_size or char_offset != sentence_offset + sentence_num * sentence_size:
+        return False
+    if tex_offset < char_offset + char_num * stFontParam.STRUCT_SIZE:
+        return False
+    end = tex_offset + TEX_META_SIZE
+    if kind == FileKind.JMB_JA:
+        s_motion_offset, = rest
+        if s_motion_offset < end:
+            return False
+        end = s_motion_offset
+    return file_size is None or end <= file_size
+
+def sniff_head(head: bytes, file_size: int | None = None) -> tuple[FileKind, bool]:
+    """
+    Classify a file from its first bytes; returns (kind, bigEndian).
+    """
+    if head[:8] == b'STRIMAGE':
+        return FileKind.STRIMAGE, False
+    tex_big = _is_tex_meta(head)
+    if tex_big is not None:
+        return FileKind.TEX_BIN, tex_big
+    # NOTE: gDat_US只支持小端
+    if _plausible_jmb(head, FileKind.JMB_US, False, file_size):
+        return FileKind.JMB_US, False
+    for bigEndian in (False, True):
+        if _plausible_jmb(head, FileKind.JMB_JA, bigEndian, file_size):
+            return FileKind.JMB_JA, bigEndian
+    return FileKind.UNKNOWN, False
+
+def sniff(source) -> tuple[FileKind, bool]:
+    """
+    source: filepath (str) | seekable fp (position is restored)
+
+    For a JMB candidate the texMeta at tex_offset is also checked, so a file is only reported
+    as JMB_JA / JMB_US if its texture header is where the meta says.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as fp:
+            return sniff(fp)
+    pos = source.tell()
+    try:
+        file_size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+        head = source.read(SNIFF_SIZE)
+        kind, bigEndian = sniff_head(head, file_size)
+        if kind in (FileKind.JMB_US, FileKind.JMB_JA):
+            meta_cls = MetaData_US if kind == FileKind.JMB_US else MetaData_JA
+            tex_offset = record_codec(meta_cls.FORMAT, bigEndian).unpack_from(head)[4]
+            source.seek(tex_offset)
+            if _is_tex_meta(source.read(TEX_META_SIZE)) != bigEndian:
+                return FileKind.UNKNOWN, False
+        return kind, bigEndian
+    finally:
+        source.seek(pos)
@@ -0,0 +1,117 @@
+"""
+Indexed view over a texStrImage: character code -> SIChr, SIStrPack -> SIStr -> glyph runs,
+and a renderer drawing the strings from the STRIMAGE texture.
+"""
+from typing import NamedTuple
+
+from .jmbStruct import SIChr, texStrImage
+
+class GlyphPlacement(NamedTuple):
+    chr_index: int      # index into texStrImage.chb
+    left: int           # position in the rendered string (texture units)
+    top: int
+    x: int              # rectangle in the atlas (texture units)
+    y: int
+    w: int
+    h: int
+
+def _indices(table: list[int]) -> list[int]:
+    # NOTE: 索引表以第一个负数结尾，后面是填充
+    for i, index in enumerate(table):
+        if index < 0:
+            return table[:i]
+    return list(table)
+
+class StrImageIndex:
+    """
+    Built once per texStrImage; every lookup afterwards is a dict/list access.
+    """
+    def __init__(self, strimage: texStrImage):
+        self.strimage = strimage
+        self.by_code : dict[int, int] = {}          # SIChr.code -> index into chb (first one wins)
+        for i, chb in enumerate(strimage.chb):
+            self.by_code.setdefault(chb.code, i)
+
+    def chr_of(self, code: int | str) -> SIChr | None:
+        if isinstance(code, str):
+            code = ord(code)
+        index = self.by_code.get(code)
+        return None if index is None else self.strimage.chb[index]
+
+    def pack_strings(self, pack_index: int) -> list[int]:
+        """
+        indices into texStrImage.str of the strings of a SIStrPack
+        """
+        return _indices(self.strimage.strpack[pack_index].strIndex)
+
+    def string_chars(self, str_index: int) -> list[int]:
+        """
+        indices into texStrImage.chb of the characters of a SIStr
+        """
+        return _indices(self.strimage.str[str_index].strIndex)
+
+    def text(self, str_index: int) -> str:
+        return ''.join(chr(self.strimage.chb[i].code) for i in self.string_chars(str_index))
+
+    def encode(self, text: str) -> list[int]:
+        """
+        chb indices spelling `text`; KeyError for characters missing from the STRIMAGE
+        """
+        return [self.by_code[ord(ch)] for ch in text]
+
+    def layout(self, str_index: int) -> tuple[list[GlyphPlacement], int]:
+        """
+        Glyph run of a SIStr and its total width: each glyph is drawn at pen + dx / dy,
+        then the pen advances by addx + header.tume.
+        """
+        tume = self.strimage.header.tume
+        placements = []
+        pen = 0
+        width = 0
+        for i in self.string_chars(str_index):
+            chb = self.strimage.chb[i]
+            left = pen + chb.dx
+            placements.append(GlyphPlacement(i, left, chb.dy, chb.x, chb.y, chb.w, chb.h))
+            width = max(width, left + chb.w, pen + chb.addx)
+            pen += chb.addx + tume
+        return placements, width
+
+def render_strings(strimage: texStrImage, atlas = None, scale_factor: int = 4, str_indices = None) -> dict:
+    """
+    Draw every SIStr (or those in `str_indices`) from the STRIMAGE texture; returns {str_index: wand Image}.
+
+    atlas: wand Image of the decoded texture (defaults to reading tex.dds, which needs a DDS codec
+           ImageMagick supports); SIChr rectangles are multiplied by `scale_factor`.
+    Each glyph is cut from the atlas once and reused by every string containing it.
+    """
+    # NOTE: 只有渲染需要wand，索引部分不依赖它
+    from wand.image import Image
+    from wand.color import Color
+
+    index = StrImageIndex(strimage)
+    own_atlas = atlas is None
+    if own_atlas:
+        atlas = Image(blob=bytes(strimage.tex.dds))
+    height = strimage.header.height * scale_factor
+    glyph_cache = {}
+    rendered = {}
+    try:
+        for str_index in (range(len(strimage.str)) if str_indices is None else str_indices):
+            placements, width = index.layout(str_index)
+            origin = -min([0] + [p.left for p in placements])     # negative dx of the first glyph
+            canvas = Image(width=max((width + origin) * scale_factor, 1), height=max(height, 1),
+                           background=Color('transparent'))
+            for p in placements:
+                glyph = glyph_cache.get(p.chr_index)
+                if glyph is None:
+                    x, y = p.x * scale_factor, p.y * scale_factor
+                    glyph = atlas[x:x + p.w * scale_factor, y:y + p.h * scale_factor]
+                    glyph_cache[p.chr_index] = glyph
+                canvas.composite(glyph, left=(p.left + origin) * scale_factor, top=p.top * scale_factor, operator='over')
+            rendered[str_index] = canvas
+    finally:
+        for glyph in glyph_cache.values():
+            glyph.close()
+        if own_atlas:
+            atlas.close()
+    return rendered
@@ -1,14 +1,27 @@
 import functools
+import io
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from typing import Union
 from . import jmbConst
 from . import jmbUtils
+from .jmbDds import DdsLayout, splice_dds_rows
 
 import struct
 
+_validation_level = jmbConst.ValidationLevel.STRUCTURAL
+
+def _paranoid() -> bool:
+    return _validation_level >= jmbConst.ValidationLevel.PARANOID
+
 def checkSize(_func=None, *, struct_size_attr="STRUCT_SIZE"):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(self, fp, *args, **kwargs):
+            # NOTE: 等级在调用时判断，未到 PARANOID 只多一次比较
+            if not _paranoid():
+                return func(self, fp, *args, **kwargs)
             before = fp.tell()
             result = func(self, fp, *args, **kwargs)
             after = fp.tell()
@@ -18,12 +31,53 @@ def checkSize(_func=None, *, struct_size_attr="STRUCT_SIZE"):
                 f"expected {struct_size}, got {after - before}"
             )
             return result
+        wrapper._size_checked = True
         return wrapper
     if _func is None:
         return decorator
     else:
         return decorator(_func)
 
+def validation_level() -> jmbConst.ValidationLevel:
+    return _validation_level
+
+def set_validation_level(level: jmbConst.ValidationLevel):
+    """
+    OFF:        no size checks at all
+    STRUCTURAL: (default) record formats are checked against STRUCT_SIZE once per class,
+                gDat section bounds once per file read
+    PARANOID:   also fp.tell() asserts around every checkSize read/write, and record size /
+                offset asserts in the bulk table paths (read_records, pack_records_into, gDat IO)
+    """
+    global _validation_level
+    _validation_level = jmbConst.ValidationLevel(level)
+    if _validation_level >= jmbConst.ValidationLevel.STRUCTURAL:
+        check_struct_sizes()
+
+@functools.lru_cache(maxsize=None)
+def _check_struct_size(record_cls):
+    codec_size = record_codec(record_cls.FORMAT).size
+    struct_size = getattr(record_cls, 'STRUCT_SIZE', None)
+    if struct_size is None:
+        struct_size = record_cls().STRUCT_SIZE
+    assert codec_size == struct_size, (
+        f"Size mismatch in {record_cls.__name__}: "
+        f"FORMAT is {codec_size} bytes, STRUCT_SIZE is {struct_size}"
+    )
+
+def _size_checked_classes():
+    for obj in list(globals().values()):
+        if isinstance(obj, type) and hasattr(obj, 'FORMAT') and any(
+                getattr(attr, '_size_checked', False) for attr in vars(obj).values()):
+            yield obj
+
+def check_struct_sizes(classes=None):
+    """
+    Static size check: the FORMAT of every size-checked record class must match its STRUCT_SIZE (once per class).
+    """
+    for record_cls in (_size_checked_classes() if classes is None else classes):
+        _check_struct_size(record_cls)
+
 def read_c_string(b):
     # 找到第一个 \x00 的位置，截断后面的内容
     null_pos = b.find(b'\x00')
@@ -41,6 +95,316 @@ def write_c_string(s, length):
         padding = bytes([0xCD] * (length - len(encoded) - 1))
         return encoded + b'\x00' + padding
 
+@functools.lru_cache(maxsize=None)
+def record_codec(fmt: str, big_endian: bool = False) -> struct.Struct:
+    """
+    Cached whole-record codec: one precompiled struct.Struct per (format, endianness).
+    """
+    return struct.Struct(('>' if big_endian else '<') + fmt)
+
+class _CodecRecord(ABC):
+    """
+    Mixin for fixed-size records decoded/encoded through a single cached struct.Struct.
+
+    Subclasses provide FORMAT, _codec(), and _decode()/_encode() over a flat value tuple,
+    so nested records can share one unpack_from of their parent.
+    """
+    FORMAT : str
+    FIELD_NUM : int
+
+    @abstractmethod
+    def _codec(self) -> struct.Struct:
+        pass
+
+    @abstractmethod
+    def _decode(self, values, pos: int = 0) -> int:
+        pass
+
+    @abstractmethod
+    def _encode(self, values: list):
+        pass
+
+    def unpack_from(self, buf, offset=0):
+        self._decode(self._codec().unpack_from(buf, offset), 0)
+
+    def pack(self) -> bytes:
+        values = []
+        self._encode(values)
+        return self._codec().pack(*values)
+
+    def pack_into(self, buf, offset=0):
+        values = []
+        self._encode(values)
+        self._codec().pack_into(buf, offset, *values)
+
+def read_records(fp, record_cls, count: int, bigEndian = False) -> list:
+    """
+    Read `count` consecutive fixed-size records with one bulk read,
+    then decode each record with a single unpack_from on the shared buffer.
+    """
+    codec = record_codec(record_cls.FORMAT, bigEndian)
+    buf = fp.read(codec.size * count)
+    assert len(buf) == codec.size * count, (
+        f"Size mismatch in read_records({record_cls.__name__}): "
+        f"expected {codec.size * count}, got {len(buf)}"
+    )
+    return unpack_records(buf, 0, record_cls, count, bigEndian)
+
+def unpack_records(buf, offset: int, record_cls, count: int, bigEndian = False) -> list:
+    codec = record_codec(record_cls.FORMAT, bigEndian)
+    paranoid = _paranoid()
+    if paranoid:
+        assert 0 <= offset and offset + codec.size * count <= len(buf), (
+            f"Out of bounds in unpack_records({record_cls.__name__}): "
+            f"{count} x {codec.size} bytes at {offset}, buffer is {len(buf)}"
+        )
+    records = []
+    for i in range(count):
+        record = record_cls(bigEndian=bigEndian)
+        record.unpack_from(buf, offset + i * codec.size)
+        if paranoid:
+            assert record.STRUCT_SIZE == codec.size, (
+                f"Size mismatch in unpack_records({record_cls.__name__}): "
+                f"expected {record.STRUCT_SIZE}, got {codec.size}"
+            )
+        records.append(record)
+    return records
+
+def pack_records_into(buf, offset: int, records) -> int:
+    """
+    Pack consecutive fixed-size records into `buf` starting at `offset`; returns the end offset.
+    """
+    paranoid = _paranoid()
+    for record in records:
+        codec = record._codec()
+        if paranoid:
+            assert record.STRUCT_SIZE == codec.size and offset + codec.size <= len(buf), (
+                f"Size mismatch in pack_records_into({type(record).__name__}): "
+                f"{codec.size} bytes (STRUCT_SIZE {record.STRUCT_SIZE}) at {offset}, buffer is {len(buf)}"
+            )
+        record.pack_into(buf, offset)
+        offset += codec.size
+    return offset
+
+class LazyRecordList(Sequence):
+    """
+    Table of `count` fixed-size records stored back to back in `buf` starting at `offset`.
+
+    A record is decoded on first access (from offset + i * record size) and cached;
+    assigning an index replaces the cached record. `buf` can be any buffer,
+    typically an mmap of the whole file.
+    """
+    def __init__(self, buf, offset: int, record_cls, count: int, bigEndian = False):
+        self._buf = buf
+        self._offset = offset
+        self._record_cls = record_cls
+        self._count = count
+        self._big_endian = bigEndian
+        self._record_size = record_codec(record_cls.FORMAT, bigEndian).size
+        self._records : list = [None] * count
+        self._changed : set[int] | None = set()     # rows rewritten in `buf` since it was read (None: all)
+        assert offset + count * self._record_size <= len(buf), (
+            f"{record_cls.__name__} table out of range: "
+            f"{offset} + {count} * {self._record_size} > {len(buf)}"
+        )
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"record index out of range: {index}")
+        return index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        index = self._index(index)
+        record = self._records[index]
+        if record is None:
+            record = self._record_cls(bigEndian=self._big_endian)
+            record.unpack_from(self._buf, self.record_offset(index))
+            self._records[index] = record
+        return record
+
+    def __setitem__(self, index: int, record):
+        self._records[self._index(index)] = record
+
+    def record_offset(self, index: int) -> int:
+        return self._offset + self._index(index) * self._record_size
+
+    def is_loaded(self, index: int) -> bool:
+        return self._records[self._index(index)] is not None
+
+    def loaded_indices(self) -> list[int]:
+        return [i for i, record in enumerate(self._records) if record is not None]
+
+    def dirty_indices(self) -> list[int]:
+        """
+        Records that may differ from the table that was read: the decoded ones
+        (they can have been edited) and the rows rewritten through rebase().
+        """
+        if self._changed is None:
+            return list(range(self._count))
+        return sorted(self._changed.union(self.loaded_indices()))
+
+    def table_bytes(self) -> bytearray:
+        """
+        The whole table packed: one copy of the backing bytes, with only the decoded
+        (possibly edited) records re-encoded over it.
+        """
+        buf = bytearray(self._buf[self._offset:self._offset + self._count * self._record_size])
+        for i in self.loaded_indices():
+            self._records[i].pack_into(buf, i * self._record_size)
+        return buf
+
+    def rebase(self, buf, offset: int = 0, changed = None):
+        """
+        Read the records not decoded yet from `buf` (same table layout, from `offset`) from now on;
+        the decoded records are kept as they are.
+        changed: indices of the rows that differ from the current table, None if unknown
+        """
+        assert offset + self._count * self._record_size <= len(buf), "rebased table out of range"
+        self._buf = buf
+        self._offset = offset
+        self.mark_changed(changed)
+
+    def mark_changed(self, indices = None):
+        """
+        Flag rows of the backing buffer as different from the table that was read (None: all rows).
+        """
+        if indices is None:
+            self._changed = None
+        elif self._changed is not None:
+            self._changed.update(indices)
+
+    def raw(self, index: int) -> bytes:
+        start = self.record_offset(index)
+        return bytes(self._buf[start:start + self._record_size])
+
+    def __repr__(self):
+        loaded = sum(record is not None for record in self._records)
+        return f"LazyRecordList({self._record_cls.__name__}, {loaded}/{self._count} loaded)"
+
+class RecordList(list):
+    """
+    List of decoded records that remembers which of them may have been edited since it was built:
+    the ones handed out (indexing, iteration, copies) or assigned. A record that never left
+    the list still holds the data that was read, so patch_file() does not need to encode it.
+    """
+    def __init__(self, records = ()):
+        super().__init__(records)
+        self._touched : set[int] | None = set()     # None: every record
+
+    def _touch(self, index):
+        if self._touched is None:
+            return
+        if isinstance(index, slice):
+            self._touched.update(range(*index.indices(len(self))))
+        elif isinstance(index, int):
+            self._touched.add(index + len(self) if index < 0 else index)
+
+    def _touch_all(self):
+        self._touched = None
+
+    def dirty_indices(self) -> list[int]:
+        if self._touched is None:
+            return list(range(len(self)))
+        return sorted(i for i in self._touched if 0 <= i < len(self))
+
+    def peek(self, index: int):
+        """
+        The record at `index`, for read-only use, without marking it.
+        """
+        return super().__getitem__(index)
+
+    def untracked(self):
+        """
+        Iterator over the records for read-only use (serialization), without marking them.
+        """
+        return super().__iter__()
+
+    def __getitem__(self, index):
+        self._touch(index)
+        return super().__getitem__(index)
+
+    def __setitem__(self, index, value):
+        self._touch(index)
+        super().__setitem__(index, value)
+
+    def __iter__(self):
+        self._touch_all()
+        return super().__iter__()
+
+    def __reversed__(self):
+        self._touch_all()
+        return super().__reversed__()
+
+    def copy(self):
+        self._touch_all()
+        return super().copy()
+
+    # NOTE: 以下操作会移动记录，所有下标都视为已修改
+    def __delitem__(self, index):
+        self._touch_all()
+        super().__delitem__(index)
+
+    def insert(self, index, value):
+        self._touch_all()
+        super().insert(index, value)
+
+    def pop(self, index = -1):
+        self._touch_all()
+        return super().pop(index)
+
+    def remove(self, value):
+        self._touch_all()
+        super().remove(value)
+
+    def sort(self, *args, **kwargs):
+        self._touch_all()
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self._touch_all()
+        super().reverse()
+
+    def clear(self):
+        self._touch_all()
+        super().clear()
+
+    def __imul__(self, n):
+        self._touch_all()
+        return super().__imul__(n)
+
+    def append(self, value):
+        self._touch(len(self))
+        super().append(value)
+
+    def extend(self, values):
+        start = len(self)
+        super().extend(values)
+        self._touch(slice(start, len(self)))
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __reduce_ex__(self, protocol):
+        # NOTE: 拷贝(copy/pickle)会共享记录对象
+        self._touch_all()
+        return (RecordList, (list(self.untracked()),))
+
+def untracked(records):
+    """
+    Read-only iteration over a record table (RecordList or any sequence) that does not mark anything as edited.
+    """
+    if isinstance(records, RecordList):
+        return records.untracked()
+    return iter(records)
+
 class EndianHandler:
     def __init__(self, big_endian=False):
         self.endian_char = '>' if big_endian else '<'
@@ -55,6 +419,8 @@ class EndianHandler:
         return struct.pack(f'{self.endian_char}{count}{fmt}', *values)
 
 class MetaData_US:
+    FORMAT = 'hhIII'
+
     def __init__(self, fp = None, bigEndian = False):
         self.sentence_num : int = 0                 # s16
         self.char_num : int = 0                     # s16
@@ -67,20 +433,26 @@ class MetaData_US:
             self.read(fp)
 
     def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.sentence_num = handler.unpack('h', fp.read(2))[0]      # s16
-        self.char_num = handler.unpack('h', fp.read(2))[0]          # s16
-        self.sentence_offset = handler.unpack('I', fp.read(4))[0]   # u32
-        self.char_offset = handler.unpack('I', fp.read(4))[0]       # u32
-        self.tex_offset = handler.unpack('I', fp.read(4))[0]        # u32
+        codec = record_codec(self.FORMAT, self.__big_endian)
+        self.unpack_from(fp.read(codec.size))
+
+    def unpack_from(self, buf, offset=0):
+        codec = record_codec(self.FORMAT, self.__big_endian)
+        (self.sentence_num,                 # s16
+         self.char_num,                     # s16
+         self.sentence_offset,              # u32
+         self.char_offset,                  # u32
+         self.tex_offset,                   # u32
+        ) = codec.unpack_from(buf, offset)
+
+    def pack(self) -> bytes:
+        return record_codec(self.FORMAT, self.__big_endian).pack(
+            self.sentence_num, self.char_num,
+            self.sentence_offset, self.char_offset, self.tex_offset
+        )
 
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('h', self.sentence_num))
-        fp.write(handler.pack('h', self.char_num))
-        fp.write(handler.pack('I', self.sentence_offset))
-        fp.write(handler.pack('I', self.char_offset))
-        fp.write(handler.pack('I', self.tex_offset))
+        fp.write(self.pack())
 
     def dump(self, filename):
         with open(filename, 'wb') as f:
@@ -96,6 +468,8 @@ class MetaData_US:
         )
 
 class MetaData_JA:
+    FORMAT = 'hhIIII'
+
     def __init__(self, fp = None, bigEndian = False):
         self.sentence_num : int = 0                 # s16
         self.char_num : int = 0                     # s16
@@ -109,27 +483,34 @@ class MetaData_JA:
             self.read(fp)
 
     def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.sentence_num = handler.unpack('h', fp.read(2))[0]      # s16
-        self.char_num = handler.unpack('h', fp.read(2))[0]          # s16
-        self.sentence_offset = handler.unpack('I', fp.read(4))[0]   # u32
-        self.char_offset = handler.unpack('I', fp.read(4))[0]       # u32
-        self.tex_offset = handler.unpack('I', fp.read(4))[0]        # u32
-        self.s_motion_offset = handler.unpack('I', fp.read(4))[0]   # u32
-        self.s_motion_size_tbl = list(handler.unpack_array(         # u32[]
-            'I', self.sentence_num, fp.read(4 * self.sentence_num)
-        ))
+        codec = record_codec(self.FORMAT, self.__big_endian)
+        buf = fp.read(codec.size)
+        (sentence_num, *_) = codec.unpack_from(buf)
+        self.unpack_from(buf + fp.read(4 * max(sentence_num, 0)))
+
+    def unpack_from(self, buf, offset=0):
+        codec = record_codec(self.FORMAT, self.__big_endian)
+        (self.sentence_num,                 # s16
+         self.char_num,                     # s16
+         self.sentence_offset,              # u32
+         self.char_offset,                  # u32
+         self.tex_offset,                   # u32
+         self.s_motion_offset,              # u32
+        ) = codec.unpack_from(buf, offset)
+        tbl_codec = record_codec(f'{max(self.sentence_num, 0)}I', self.__big_endian)
+        self.s_motion_size_tbl = list(tbl_codec.unpack_from(buf, offset + codec.size))  # u32[]
+
+    def pack(self) -> bytes:
+        head = record_codec(self.FORMAT, self.__big_endian).pack(
+            self.sentence_num, self.char_num,
+            self.sentence_offset, self.char_offset, self.tex_offset, self.s_motion_offset
+        )
+        if self.sentence_num > 0:
+            return head + record_codec(f'{len(self.s_motion_size_tbl)}I', self.__big_endian).pack(*self.s_motion_size_tbl)
+        return head
 
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('h', self.sentence_num))
-        fp.write(handler.pack('h', self.char_num))
-        fp.write(handler.pack('I', self.sentence_offset))
-        fp.write(handler.pack('I', self.char_offset))
-        fp.write(handler.pack('I', self.tex_offset))
-        fp.write(handler.pack('I', self.s_motion_offset))
-        if self.sentence_num > 0:
-            fp.write(handler.pack_array('I', self.s_motion_size_tbl))
+        fp.write(self.pack())
 
     def dump(self, filename):
         with open(filename, 'wb') as f:
@@ -146,7 +527,10 @@ class MetaData_JA:
             f"s_motion_size_tbl={self.s_motion_size_tbl})"
         )
 
-class stInfo:
+class stInfo(_CodecRecord):
+    FORMAT = f'i{jmbConst.FILE_LENGTH}s{jmbConst.FILE_LENGTH}shhh2s'
+    FIELD_NUM = 7
+
     def __init__(self, fp = None, bigEndian = False):
         self.STRUCT_SIZE = 76
         self.wait = 0            # s32
@@ -160,27 +544,40 @@ class stInfo:
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        (self.wait,                         # s32
+         hps_file,
+         mth_file,
+         self.back_locate,                  # s16
+         self.countinue,                    # s16
+         self.key,                          # s16
+         self.padding,                      # NOTE: 4-byte alignment padding for struct
+        ) = values[pos:pos + self.FIELD_NUM]
+        self.hps_file = read_c_string(hps_file)
+        self.mth_file = read_c_string(mth_file)
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        values += (
+            self.wait,
+            write_c_string(self.hps_file, jmbConst.FILE_LENGTH),
+            write_c_string(self.mth_file, jmbConst.FILE_LENGTH),
+            self.back_locate,
+            self.countinue,
+            self.key,
+            self.padding,
+        )
+
     @checkSize
     def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.wait = handler.unpack('i', fp.read(4))[0]         # s32
-        self.hps_file = read_c_string(fp.read(jmbConst.FILE_LENGTH))
-        self.mth_file = read_c_string(fp.read(jmbConst.FILE_LENGTH))
-        self.back_locate = handler.unpack('h', fp.read(2))[0]  # s16
-        self.countinue = handler.unpack('h', fp.read(2))[0]    # s16
-        self.key = handler.unpack('h', fp.read(2))[0]          # s16
-        self.padding = fp.read(2) # NOTE: 4-byte alignment padding for struct
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('i', self.wait))             # s32
-        fp.write(write_c_string(self.hps_file, jmbConst.FILE_LENGTH))
-        fp.write(write_c_string(self.mth_file, jmbConst.FILE_LENGTH))
-        fp.write(handler.pack('h', self.back_locate))      # s16
-        fp.write(handler.pack('h', self.countinue))        # s16
-        fp.write(handler.pack('h', self.key))              # s16
-        fp.write(self.padding) # NOTE: alignment padding for struct
+        fp.write(self.pack())
 
     def dump(self, filename):
         with open(filename, 'wb') as f:
@@ -191,7 +588,10 @@ class stInfo:
                 f"mth_file='{self.mth_file}', "
                 f"back_locate={self.back_locate}, countinue={self.countinue}, key={self.key}, padding={self.padding})")
 
-class stRubiDat:
+class stRubiDat(_CodecRecord):
+    FORMAT = f'bb{jmbConst.JIMAKU_RUBI_MAX}h'
+    FIELD_NUM = 2 + jmbConst.JIMAKU_RUBI_MAX
+
     def __init__(self, fp=None, bigEndian = False):
         self.STRUCT_SIZE = 22
         self.from_num : int = -1                # s8
@@ -201,21 +601,27 @@ class stRubiDat:
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.from_num = values[pos]                                 # s8
+        self.to_num = values[pos + 1]                               # s8
+        self.char_id = list(values[pos + 2:pos + self.FIELD_NUM])   # s16[]
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        values.append(self.from_num)
+        values.append(self.to_num)
+        values += self.char_id
+
     @checkSize
     def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.from_num = handler.unpack('b', fp.read(1))[0]       # s8
-        self.to_num = handler.unpack('b', fp.read(1))[0]         # s8
-        self.char_id = list(handler.unpack_array(
-            'h', jmbConst.JIMAKU_RUBI_MAX, fp.read(2 * jmbConst.JIMAKU_RUBI_MAX)
-        ))
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('b', self.from_num))   # s8
-        fp.write(handler.pack('b', self.to_num))     # s8
-        fp.write(handler.pack_array('h', self.char_id))
+        fp.write(self.pack())
 
     def dump(self, fp):
         raise NotImplementedError
@@ -232,7 +638,10 @@ class stRubiDat:
         else:
             return f""
 
-class stJimaku_US:
+class stJimaku_US(_CodecRecord):
+    FORMAT = f'ii{jmbConst.US_JIMAKU_CHAR_MAX}h'
+    FIELD_NUM = 2 + jmbConst.US_JIMAKU_CHAR_MAX
+
     def __init__(self, fp = None, bigEndian = False):
         self.STRUCT_SIZE = 264
         self.wait = 0                               # s32
@@ -267,28 +676,37 @@ class stJimaku_US:
             assert len(new_ctls) == jmbConst.US_JIMAKU_CHAR_MAX, "length of control codes should be the same as the maximum length (128)"
             self.char_data = new_ctls
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.wait = values[pos]                                     # s32
+        self.disp_time = values[pos + 1]                            # s32
+        self.char_data = list(values[pos + 2:pos + self.FIELD_NUM]) # s16[]
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        values.append(self.wait)
+        values.append(self.disp_time)
+        values += self.char_data
+
     @checkSize
     def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.wait = handler.unpack('i', fp.read(4))[0]          # s32
-        self.disp_time = handler.unpack('i', fp.read(4))[0]     # s32
-        self.char_data = list(handler.unpack_array(
-            'h', jmbConst.US_JIMAKU_CHAR_MAX, fp.read(2 * jmbConst.US_JIMAKU_CHAR_MAX)
-        ))
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('i', self.wait))             # s32
-        fp.write(handler.pack('i', self.disp_time))        # s32
-        fp.write(handler.pack_array('h', self.char_data))
+        fp.write(self.pack())
 
     def __repr__(self):
         char_str = ''.join([chr(c) if c > 0 else f'[{c}]' for c in self.char_data[:8]])
         return (f"stJimaku_US(wait={self.wait}, disp_time={self.disp_time}, "
                 f"char_data='{char_str}...')")
 
-class stJimaku_JA:
+class stJimaku_JA(_CodecRecord):
+    FORMAT = f'ii{jmbConst.JIMAKU_CHAR_MAX}h' + stRubiDat.FORMAT * jmbConst.JIMAKU_RUBI_DAT_MAX
+    FIELD_NUM = 2 + jmbConst.JIMAKU_CHAR_MAX + stRubiDat.FIELD_NUM * jmbConst.JIMAKU_RUBI_DAT_MAX
+
     def __init__(self, fp = None, bigEndian = False):
         self.STRUCT_SIZE = 424
         self.wait = 0             # s32
@@ -325,37 +743,48 @@ class stJimaku_JA:
         for i in range(jmbConst.JIMAKU_RUBI_DAT_MAX):
             self.rubi_data[i].clear()
 
-    @checkSize
-    def read(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        self.wait = handler.unpack('i', fp.read(4))[0]          # s32
-        self.disp_time = handler.unpack('i', fp.read(4))[0]     # s32
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.wait = values[pos]                                     # s32
+        self.disp_time = values[pos + 1]                            # s32
+        pos += 2
         # 读取字符数据
-        self.char_data = list(handler.unpack_array(
-            'h', jmbConst.JIMAKU_CHAR_MAX, fp.read(2 * jmbConst.JIMAKU_CHAR_MAX)
-        ))
+        self.char_data = list(values[pos:pos + jmbConst.JIMAKU_CHAR_MAX])
+        pos += jmbConst.JIMAKU_CHAR_MAX
         # 读取注音数据
         self.rubi_data = []
         for _ in range(jmbConst.JIMAKU_RUBI_DAT_MAX):
-            self.rubi_data.append(stRubiDat(fp, self.__big_endian))
+            rubi = stRubiDat(bigEndian=self.__big_endian)
+            pos = rubi._decode(values, pos)
+            self.rubi_data.append(rubi)
+        return pos
+
+    def _encode(self, values: list):
+        values.append(self.wait)
+        values.append(self.disp_time)
+        values += self.char_data
+        for rubi in self.rubi_data:
+            rubi._encode(values)
 
     @checkSize
-    def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(handler.pack('i', self.wait))             # s32
-        fp.write(handler.pack('i', self.disp_time))        # s32
-
-        fp.write(handler.pack_array('h', self.char_data))
+    def read(self, fp):
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
-        for rubi in self.rubi_data:
-            rubi.write(fp)
+    @checkSize
+    def write(self, fp):
+        fp.write(self.pack())
 
     def __repr__(self):
         char_str = ''.join([chr(c) if c > 0 else f'[{c}]' for c in self.char_data[:8]])
         return (f"stJimaku(wait={self.wait}, disp_time={self.disp_time}, "
                 f"char_data='{char_str}...', rubi_data={len(self.rubi_data)} items)")
 
-class stOneSentence:
+class stOneSentence(_CodecRecord):
+    FORMAT = stInfo.FORMAT + stJimaku_JA.FORMAT * jmbConst.JIMAKU_LINE_MAX
+    FIELD_NUM = stInfo.FIELD_NUM + stJimaku_JA.FIELD_NUM * jmbConst.JIMAKU_LINE_MAX
+
     def __init__(self, fp = None, bigEndian = False):
         self.STRUCT_SIZE = 6860
         self.info : stInfo = stInfo()                  # stInfo对象 (76)
@@ -373,28 +802,44 @@ class stOneSentence:
             ret += 1
         return ret
 
-    @checkSize
-    def read(self, fp):
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
         # 读取stInfo
-        self.info.read(fp)
+        self.info = stInfo(bigEndian=self.__big_endian)
+        pos = self.info._decode(values, pos)
         # 读取stJimaku列表
         self.jimaku_list = []
         for _ in range(jmbConst.JIMAKU_LINE_MAX):
-            jimaku = stJimaku_JA(fp, self.__big_endian)
+            jimaku = stJimaku_JA(bigEndian=self.__big_endian)
+            pos = jimaku._decode(values, pos)
             self.jimaku_list.append(jimaku)
         assert len(self.jimaku_list) == jmbConst.JIMAKU_LINE_MAX, "stJimaku list size error"
+        return pos
+
+    def _encode(self, values: list):
+        self.info._encode(values)
+        for jimaku in self.jimaku_list:
+            jimaku._encode(values)
+
+    @checkSize
+    def read(self, fp):
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        self.info.write(fp)
-        for jimaku in self.jimaku_list:
-            jimaku.write(fp)
+        fp.write(self.pack())
 
     def __repr__(self):
         return (f"stOneSentence(\n  info={self.info},\n  "
                 f"jimaku_list=[{len(self.jimaku_list)} items])")
 
-class stFontParam:
+class stFontParam(_CodecRecord):
+    FORMAT = '4H'
+    FIELD_NUM = 4
+    STRUCT_SIZE = 8
+
     def __init__(self, fp=None, bigEndian=False, *, u=0, v=0, w=0, h=0):
         self.u: int = u             # u16
         self.v: int = v             # u16
@@ -404,13 +849,23 @@ class stFontParam:
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.u, self.v, self.w, self.h = values[pos:pos + self.FIELD_NUM]
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        values += (self.u, self.v, self.w, self.h)
+
+    @checkSize
     def read(self, fp):
-        endian = '>' if self.__big_endian else '<'
-        self.u, self.v, self.w, self.h = struct.unpack(f'{endian}4H', fp.read(8))
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
+    @checkSize
     def write(self, fp):
-        endian = '>' if self.__big_endian else '<'
-        fp.write(struct.pack(f'{endian}4H', self.u, self.v, self.w, self.h))
+        fp.write(self.pack())
 
     def __repr__(self):
         return (f"stFontParam(u={self.u}, v={self.v}, w={self.w}, h={self.h})")
@@ -426,6 +881,8 @@ class stFontParam:
         )
 
 class texStrImageHeader:
+    FORMAT = '8s4s5i'
+
     def __init__(self, fp=None):
         self.STRUCT_SIZE = 32
         self.magic = b'\x00'*8
@@ -440,27 +897,23 @@ class texStrImageHeader:
 
     @checkSize
     def read(self, fp):
-        self.magic = fp.read(8)
+        (self.magic,
+         self.magic_padding,
+         self.height,
+         self.strPackNum,
+         self.strNum,
+         self.chrNum,
+         self.tume,
+        ) = record_codec(self.FORMAT).unpack(fp.read(self.STRUCT_SIZE))
         assert self.magic == b"STRIMAGE"
-
-        self.magic_padding = fp.read(4)
         assert self.magic_padding == b"\x00"*4
 
-        self.height     = struct.unpack('<i', fp.read(4))[0]
-        self.strPackNum = struct.unpack('<i', fp.read(4))[0]
-        self.strNum     = struct.unpack('<i', fp.read(4))[0]
-        self.chrNum     = struct.unpack('<i', fp.read(4))[0]
-        self.tume       = struct.unpack('<i', fp.read(4))[0]
-
     @checkSize
     def write(self, fp):
-        fp.write(self.magic)
-        fp.write(self.magic_padding)
-        fp.write(struct.pack('<i', self.height))
-        fp.write(struct.pack('<i', self.strPackNum))
-        fp.write(struct.pack('<i', self.strNum))
-        fp.write(struct.pack('<i', self.chrNum))
-        fp.write(struct.pack('<i', self.tume))
+        fp.write(record_codec(self.FORMAT).pack(
+            self.magic, self.magic_padding,
+            self.height, self.strPackNum, self.strNum, self.chrNum, self.tume
+        ))
 
     def __repr__(self):
         return (
@@ -475,54 +928,77 @@ class texStrImageHeader:
             f")"
         )
 
-class SIStrPack:
-    def __init__(self, fp=None):
+class SIStrPack(_CodecRecord):
+    FORMAT = f'{jmbConst.STRIMAGE_SIMAXSTRNUM}h'
+    FIELD_NUM = jmbConst.STRIMAGE_SIMAXSTRNUM
+
+    def __init__(self, fp=None, bigEndian = False):
         self.STRUCT_SIZE = 62
         self.strIndex:list[int] = []
+        self.__big_endian = bigEndian       # NOTE: STRIMAGE目前只见过小端
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.strIndex = list(values[pos:pos + self.FIELD_NUM])
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        assert len(self.strIndex) == jmbConst.STRIMAGE_SIMAXSTRNUM
+        values += self.strIndex
+
     @checkSize
     def read(self, fp):
-        self.strIndex = []
-        for _ in range(jmbConst.STRIMAGE_SIMAXSTRNUM):
-            index = struct.unpack('<h', fp.read(2))[0]
-            self.strIndex.append(index)
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        assert len(self.strIndex) == jmbConst.STRIMAGE_SIMAXSTRNUM
-        for index in self.strIndex:
-            fp.write(struct.pack('<h', index))
+        fp.write(self.pack())
 
     def __repr__(self):
         return f"SIStrPack(strIndex[{len(self.strIndex)}]={self.strIndex})"
 
-class SIStr:
-    def __init__(self, fp=None):
+class SIStr(_CodecRecord):
+    FORMAT = f'{jmbConst.STRIMAGE_SIMAXSTRCHRNUM}h'
+    FIELD_NUM = jmbConst.STRIMAGE_SIMAXSTRCHRNUM
+
+    def __init__(self, fp=None, bigEndian = False):
         self.STRUCT_SIZE = 258
         self.strIndex:list[int] = []
+        self.__big_endian = bigEndian
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        self.strIndex = list(values[pos:pos + self.FIELD_NUM])
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        assert len(self.strIndex) == jmbConst.STRIMAGE_SIMAXSTRCHRNUM
+        values += self.strIndex
+
     @checkSize
     def read(self, fp):
-        self.strIndex = []
-        for _ in range(jmbConst.STRIMAGE_SIMAXSTRCHRNUM):
-            chr = struct.unpack('<h', fp.read(2))[0]
-            self.strIndex.append(chr)
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        assert len(self.strIndex) == jmbConst.STRIMAGE_SIMAXSTRCHRNUM
-        for chr in self.strIndex:
-            fp.write(struct.pack('<h', chr))
+        fp.write(self.pack())
 
     def __repr__(self):
         return f"SIStr(strIndex[{len(self.strIndex)}]={self.strIndex})"
 
-class SIChr:
-    def __init__(self, fp=None):
+class SIChr(_CodecRecord):
+    FORMAT = 'I4H2hHcxI'
+    FIELD_NUM = 10
+
+    def __init__(self, fp=None, bigEndian = False):
         self.STRUCT_SIZE = 24
         self.code   = 0         # I
         self.x      = 0         # H
@@ -534,36 +1010,40 @@ class SIChr:
         self.addx   = 0         # H
         self.addw   = b'\x00'   # char
         self.code2  = 0         # I
+        self.__big_endian = bigEndian
         if fp is not None:
             self.read(fp)
 
+    def _codec(self) -> struct.Struct:
+        return record_codec(self.FORMAT, self.__big_endian)
+
+    def _decode(self, values, pos: int = 0) -> int:
+        (self.code,
+         self.x, self.y, self.w, self.h,
+         self.dx, self.dy,
+         self.addx,
+         self.addw,
+         self.code2,                        # NOTE: 1 byte padding before code2
+        ) = values[pos:pos + self.FIELD_NUM]
+        return pos + self.FIELD_NUM
+
+    def _encode(self, values: list):
+        values += (
+            self.code,
+            self.x, self.y, self.w, self.h,
+            self.dx, self.dy,
+            self.addx,
+            self.addw,
+            self.code2,
+        )
+
     @checkSize
     def read(self, fp):
-        self.code   = struct.unpack('<I', fp.read(4))[0]
-        self.x      = struct.unpack('<H', fp.read(2))[0]
-        self.y      = struct.unpack('<H', fp.read(2))[0]
-        self.w      = struct.unpack('<H', fp.read(2))[0]
-        self.h      = struct.unpack('<H', fp.read(2))[0]
-        self.dx     = struct.unpack('<h', fp.read(2))[0]
-        self.dy     = struct.unpack('<h', fp.read(2))[0]
-        self.addx   = struct.unpack('<H', fp.read(2))[0]
-        self.addw   = fp.read(1)
-        _ = fp.read(1)
-        self.code2  = struct.unpack('<I', fp.read(4))[0]
+        self.unpack_from(fp.read(self.STRUCT_SIZE))
 
     @checkSize
     def write(self, fp):
-        fp.write(struct.pack('<I', self.code))
-        fp.write(struct.pack('<H', self.x))
-        fp.write(struct.pack('<H', self.y))
-        fp.write(struct.pack('<H', self.w))
-        fp.write(struct.pack('<H', self.h))
-        fp.write(struct.pack('<h', self.dx))
-        fp.write(struct.pack('<h', self.dy))
-        fp.write(struct.pack('<H', self.addx))
-        fp.write(self.addw)
-        fp.write(b'\x00')  # padding
-        fp.write(struct.pack('<I', self.code2))
+        fp.write(self.pack())
 
     def __repr__(self):
         return (f"SIChr(code={chr(self.code)!r} (0x{self.code:04X}), x={self.x}, y={self.y}, "
@@ -583,19 +1063,10 @@ class texStrImage:
 
     def read(self, fp):
         self.header = texStrImageHeader(fp)
-
-        self.strpack = []
-        for i in range(self.header.strPackNum):
-            self.strpack.append(SIStrPack(fp))
-
-        self.str = []
-        for i in range(self.header.strNum):
-            self.str.append(SIStr(fp))
-
-        self.chb = []
-        for i in range(self.header.chrNum):
-            self.chb.append(SIChr(fp))
-
+        # 每张表一次读取
+        self.strpack = read_records(fp, SIStrPack, self.header.strPackNum)
+        self.str = read_records(fp, SIStr, self.header.strNum)
+        self.chb = read_records(fp, SIChr, self.header.chrNum)
         self.tex = stTex(fp)
 
     def write(self, fp):
@@ -603,15 +1074,21 @@ class texStrImage:
         assert self.header.strNum == len(self.str)
         assert self.header.chrNum == len(self.chb)
         self.header.write(fp)
-        for i in range(self.header.strPackNum):
-            self.strpack[i].write(fp)
-        for i in range(self.header.strNum):
-            self.str[i].write(fp)
-        for i in range(self.header.chrNum):
-            self.chb[i].write(fp)
+        buf = bytearray(
+            record_codec(SIStrPack.FORMAT).size * len(self.strpack) +
+            record_codec(SIStr.FORMAT).size * len(self.str) +
+            record_codec(SIChr.FORMAT).size * len(self.chb)
+        )
+        pos = pack_records_into(buf, 0, self.strpack)
+        pos = pack_records_into(buf, pos, self.str)
+        pos = pack_records_into(buf, pos, self.chb)
+        assert pos == len(buf)
+        fp.write(buf)
         self.tex.write(fp)
 
 class texMeta:
+    FORMAT = '4s4sHH4s4s44s4sI'
+
     def __init__(self, fp=None, bigEndian = False):
         self.STRUCT_SIZE = 72
         self.magic = b'\x00'*4
@@ -639,42 +1116,213 @@ class texMeta:
         assert fp.read(4)   == (b'XT7K' if self.__big_endian else b'K7TX')
         self.dds_size = handler.unpack('I', fp.read(4))[0]
 
+    def _values(self) -> tuple:
+        return (
+            self.magic,
+            self.encoding,
+            self.w,
+            self.h,
+            b'\x00'*4,
+            b'\x00\x00\x00@' if self.__big_endian else b'@\x00\x00\x00',
+            b'\x00'*44,
+            b'XT7K' if self.__big_endian else b'K7TX',
+            self.dds_size,
+        )
+
+    def pack(self) -> bytes:
+        return record_codec(self.FORMAT, self.__big_endian).pack(*self._values())
+
+    def pack_into(self, buf, offset=0):
+        record_codec(self.FORMAT, self.__big_endian).pack_into(buf, offset, *self._values())
+
     @checkSize
     def write(self, fp):
-        handler = EndianHandler(self.__big_endian)
-        fp.write(self.magic)
-        fp.write(self.encoding)
-        fp.write(handler.pack('H', self.w))
-        fp.write(handler.pack('H', self.h))
-        fp.write(b'\x00'*4)
-        fp.write(b'\x00\x00\x00@' if self.__big_endian else b'@\x00\x00\x00')
-        fp.write(b'\x00'*44)
-        fp.write(b'XT7K' if self.__big_endian else b'K7TX')
-        fp.write(handler.pack('I', self.dds_size))
+        fp.write(self.pack())
 
     def __repr__(self):
         return (f"texMeta(magic={self.magic}, encoding={self.encoding}, w={self.w}, h={self.h}, dds_size={self.dds_size})")
 
+class FilePayload:
+    """
+    DDS payload that stays on disk: `size` bytes of `path` starting at `offset`.
+
+    Supports len() and slicing (small reads, e.g. magic checks), and is streamed
+    to the output by write_payload() without ever being loaded as a whole.
+    The source file must stay unchanged until the payload has been written.
+    """
+    COPY_CHUNK = 1 << 20
+
+    def __init__(self, path: str, offset: int = 0, size: int | None = None):
+        self.path = os.path.abspath(path)
+        self.offset = offset
+        self.size = os.path.getsize(self.path) - offset if size is None else size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def read_at(self, pos: int, length: int) -> bytes:
+        length = max(0, min(length, self.size - pos))
+        with open(self.path, 'rb') as fp:
+            fp.seek(self.offset + pos)
+            return fp.read(length)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            assert step == 1, "FilePayload only supports contiguous slices"
+            return self.read_at(start, stop - start)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f"payload index out of range: {index}")
+        return self.read_at(index, 1)[0]
+
+    def __bytes__(self) -> bytes:
+        return self.read_at(0, self.size)
+
+    def __eq__(self, other):
+        if isinstance(other, FilePayload):
+            return (self.path, self.offset, self.size) == (other.path, other.offset, other.size)
+        return bytes(self) == other
+
+    def copy_to(self, fp):
+        with open(self.path, 'rb') as src:
+            if self._sendfile(src, fp):
+                return
+            src.seek(self.offset)
+            buf = bytearray(min(self.COPY_CHUNK, self.size))
+            view = memoryview(buf)
+            remaining = self.size
+            while remaining > 0:
+                n = src.readinto(view[:min(remaining, len(buf))])
+                assert n, f"unexpected EOF in {self.path}"
+                fp.write(view[:n])
+                remaining -= n
+
+    def _sendfile(self, src, fp) -> bool:
+        """
+        kernel-side copy between two real files; False if `fp` cannot take it (BytesIO, sockets, ...)
+        """
+        if not hasattr(os, 'sendfile'):
+            return False
+        try:
+            out_fd = fp.fileno()
+            fp.flush()
+            start = fp.tell()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return False
+        sent = 0
+        try:
+            while sent < self.size:
+                n = os.sendfile(out_fd, src.fileno(), self.offset + sent, self.size - sent)
+                if n == 0:
+                    break
+                sent += n
+        except OSError:
+            if sent:
+                raise
+            return False
+        assert sent == self.size, f"unexpected EOF in {self.path}"
+        fp.seek(start + sent)
+        return True
+
+    def __repr__(self):
+        return f"FilePayload(path={self.path!r}, offset={self.offset}, size={self.size})"
+
+def write_payload(fp, payload):
+    """
+    bytes / bytearray / memoryview are written directly, FilePayload is streamed
+    """
+    if isinstance(payload, FilePayload):
+        payload.copy_to(fp)
+    else:
+        fp.write(payload)
+
 class stTex:
     def __init__(self, fp=None, bigEndian = False):
         self.header : texMeta
-        self.dds : bytes
+        self.dds : bytes | memoryview | FilePayload
         self.__big_endian = bigEndian
         if fp is not None:
             self.read(fp)
 
+    def size(self) -> int:
+        return self.header.STRUCT_SIZE + self.header.dds_size
+
     def read(self, fp):
         self.header = texMeta(fp, self.__big_endian)
         self.dds = fp.read(self.header.dds_size)
         assert self.dds[:4] == b'DDS ', f"Readed magic number:{self.dds[:4]}, expect: 'DDS '; Please check if it is a DDS texture."
 
+    @classmethod
+    def from_buffer(cls, buf, offset=0, bigEndian = False) -> 'stTex':
+        """
+        Decode the texMeta header at `offset` and keep the DDS payload as a memoryview slice of `buf`.
+        """
+        tex = cls(bigEndian=bigEndian)
+        view = memoryview(buf)
+        header_size = record_codec(texMeta.FORMAT).size
+        tex.header = texMeta(io.BytesIO(view[offset:offset + header_size]), bigEndian)
+        start = offset + tex.header.STRUCT_SIZE
+        tex.dds = view[start:start + tex.header.dds_size]
+        assert len(tex.dds) == tex.header.dds_size, f"DDS payload truncated: {len(tex.dds)} < {tex.header.dds_size}"
+        assert tex.dds[:4] == b'DDS ', f"Readed magic number:{bytes(tex.dds[:4])}, expect: 'DDS '; Please check if it is a DDS texture."
+        return tex
+
+    @classmethod
+    def from_file(cls, path: str, offset=0, bigEndian = False) -> 'stTex':
+        """
+        Read the texMeta header at `offset` of `path`; the DDS payload stays on disk as a FilePayload.
+        """
+        tex = cls(bigEndian=bigEndian)
+        with open(path, 'rb') as fp:
+            fp.seek(offset)
+            tex.header = texMeta(fp, bigEndian)
+        tex.dds = FilePayload(path, offset + tex.header.STRUCT_SIZE, tex.header.dds_size)
+        assert tex.dds[:4] == b'DDS ', f"Readed magic number:{tex.dds[:4]}, expect: 'DDS '; Please check if it is a DDS texture."
+        return tex
+
+    def replace_dds(self, filename: str, scale_factor: int = 4):
+        """
+        Point the payload at a DDS file on disk and update texMeta from its DDS header,
+        without loading the texture into memory.
+        """
+        payload = FilePayload(filename)
+        assert payload[:4] == b'DDS ', "not a valid DDS file"
+        height, width = struct.unpack('<II', payload.read_at(12, 8))    # DDS_HEADER.dwHeight / dwWidth
+        assert width % scale_factor == 0 and height % scale_factor == 0, \
+            f"DDS width/height must be multiples of {scale_factor}"
+        self.dds = payload
+        self.header.w = width // scale_factor
+        self.header.h = height // scale_factor
+        self.header.dds_size = len(payload)
+        return width, height
+
+    def splice_dds(self, filename: str, top: int, scale_factor: int = 4):
+        """
+        Replace the rows from `top` (DDS pixels) down with the DDS file `filename`, which must have the
+        same width and format (e.g. the rows re-encoded by atlasGeneration.update_atlas_US);
+        the rows above are kept as they are, without recompressing them.
+        """
+        with open(filename, 'rb') as fp:
+            band = fp.read()
+        dds = splice_dds_rows(self.dds, band, top)
+        layout = DdsLayout(dds)
+        assert layout.width % scale_factor == 0 and layout.height % scale_factor == 0, \
+            f"DDS width/height must be multiples of {scale_factor}"
+        self.dds = dds
+        self.header.w = layout.width // scale_factor
+        self.header.h = layout.height // scale_factor
+        self.header.dds_size = len(dds)
+        return layout.width, layout.height
+
     def write(self, fp):
         self.header.write(fp)
-        fp.write(self.dds)
+        write_payload(fp, self.dds)
 
     def dump(self, filename):
         with open(filename, 'wb') as wfp:
-            wfp.write(self.dds)
+            write_payload(wfp, self.dds)
 
     @classmethod
     def load(cls, fp):
@@ -723,4 +1371,8 @@ class oldGCTex:
 
 
 stJimaku = Union[stJimaku_JA, stJimaku_US]
-MetaData = Union[MetaData_JA, MetaData_US]
\ No newline at end of file
+MetaData = Union[MetaData_JA, MetaData_US]
+
+# NOTE: 默认(STRUCTURAL)在导入时做一次静态检查，之后不再逐条记录tell()
+if _validation_level >= jmbConst.ValidationLevel.STRUCTURAL:
+    check_struct_sizes()
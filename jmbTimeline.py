@@ -0,0 +1,149 @@
+"""
+Vectorized timing edits (wait / disp_time, in 1/4800 s) over whole gDat files or batches of them.
+
+Every operation takes one gDat or an iterable of them, and only touches valid lines
+(char_data[0] != -1); stInfo.wait of JA sentences is left untouched. Requires NumPy.
+
+Only packed and lazy files are edited as one table; decoded (eager) sentences are
+gathered and scattered line by line in Python, with just the timing math vectorized.
+"""
+from collections.abc import Iterable
+
+import numpy as np
+
+from . import jmbConst
+from .jmbArray import sentence_array, sentence_dtype
+from .jmbPacked import PackedRecordStore
+from .jmbStruct import LazyRecordList, stOneSentence, untracked
+
+S32_MIN, S32_MAX = -(1 << 31), (1 << 31) - 1
+
+def seconds_to_ticks(seconds: float) -> int:
+    return round(seconds * jmbConst.JIMAKU_TIME_UNIT)
+
+def ticks_to_seconds(ticks: int) -> float:
+    return ticks / jmbConst.JIMAKU_TIME_UNIT
+
+def _batch(gdats) -> list:
+    if isinstance(gdats, Iterable):
+        return list(gdats)
+    return [gdats]
+
+def _line_view(arr: np.ndarray) -> np.ndarray:
+    # JA: (sentence_num, JIMAKU_LINE_MAX) lines; US: (sentence_num,)
+    if 'jimaku_list' in arr.dtype.names:
+        return arr['jimaku_list']
+    return arr
+
+def _record_lines(record) -> list:
+    return record.jimaku_list if isinstance(record, stOneSentence) else [record]
+
+def _timing(func, wait: np.ndarray, disp_time: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    wait = wait.astype(np.int64)
+    disp_time = disp_time.astype(np.int64)
+    new_wait, new_disp_time = func(wait, disp_time, valid)
+    results = []
+    for name, old, values in (('wait', wait, new_wait), ('disp_time', disp_time, new_disp_time)):
+        values = np.where(valid, values, old)
+        assert values.min(initial=0) >= S32_MIN and values.max(initial=0) <= S32_MAX, \
+            f"{name} out of s32 range after timing edit"
+        results.append(values)
+    return results[0], results[1]
+
+def _apply_table(gdat, func):
+    """
+    Packed / lazy sentences: one vectorized pass over the raw table, no record decoded.
+    """
+    sentences = gdat.sentences
+    if isinstance(sentences, PackedRecordStore):
+        buf = None
+        arr = sentence_array(gdat)          # view of the store, edited in place
+    else:
+        # NOTE: mmap只读，复制一次整表（已解码的句子覆盖其上），之后由该副本提供未解码的句子
+        buf = sentences.table_bytes()
+        arr = np.frombuffer(buf, dtype=sentence_dtype(gdat))
+    lines = _line_view(arr)
+    valid = lines['char_data'][..., 0] != -1
+    wait, disp_time = _timing(func, lines['wait'], lines['disp_time'], valid)
+    changed = (wait != lines['wait']) | (disp_time != lines['disp_time'])
+    lines['wait'] = wait
+    lines['disp_time'] = disp_time
+    if buf is None:
+        return
+
+    # decoded sentences stay the same objects, only their timings are updated
+    wait = wait.reshape(len(arr), -1)
+    disp_time = disp_time.reshape(len(arr), -1)
+    for i in sentences.loaded_indices():
+        for j, line in enumerate(_record_lines(sentences[i])):
+            line.wait, line.disp_time = int(wait[i, j]), int(disp_time[i, j])
+    sentences.rebase(buf, changed=np.flatnonzero(changed.reshape(len(arr), -1).any(axis=1)).tolist())
+
+def _apply_records(sentences, func):
+    """
+    Decoded sentences: timings gathered from and scattered back into the records, nothing re-encoded.
+    Only the records whose timings change are fetched again (and marked as edited, see RecordList).
+
+    NOTE: not vectorized, the gather/scatter is a Python loop over every line; read the file
+          with packed=True or lazy=True for table-speed edits.
+    """
+    lines = [(i, j, line) for i, record in enumerate(untracked(sentences))
+             for j, line in enumerate(_record_lines(record))]
+    valid = np.fromiter((line.char_data[0] != -1 for _, _, line in lines), dtype=bool, count=len(lines))
+    old_wait = np.fromiter((line.wait for _, _, line in lines), dtype=np.int64, count=len(lines))
+    old_disp_time = np.fromiter((line.disp_time for _, _, line in lines), dtype=np.int64, count=len(lines))
+    wait, disp_time = _timing(func, old_wait, old_disp_time, valid)
+    for k in np.flatnonzero((wait != old_wait) | (disp_time != old_disp_time)).tolist():
+        i, j, _ = lines[k]
+        line = _record_lines(sentences[i])[j]
+        line.wait, line.disp_time = int(wait[k]), int(disp_time[k])
+
+def _apply(gdats, func):
+    """
+    func(wait, disp_time, valid) -> (new_wait, new_disp_time), int64 arrays of the line shape
+
+    Edits are made in place: gdat.sentences stays the same container and sentence objects
+    obtained before the call see the new timings.
+    """
+    for gdat in _batch(gdats):
+        if isinstance(gdat.sentences, (PackedRecordStore, LazyRecordList)):
+            _apply_table(gdat, func)
+        else:
+            _apply_records(gdat.sentences, func)
+
+def shift(gdats, delta: int):
+    """
+    wait += delta
+    """
+    _apply(gdats, lambda wait, disp_time, valid: (wait + delta, disp_time))
+
+def scale(gdats, factor: float, origin: int = 0):
+    """
+    Linear rescale around `origin`: wait = origin + (wait - origin) * factor, disp_time *= factor
+    (e.g. factor = 25 / (30000 / 1001) for an NTSC -> PAL fix).
+    """
+    _apply(gdats, lambda wait, disp_time, valid: (
+        origin + np.rint((wait - origin) * factor).astype(np.int64),
+        np.rint(disp_time * factor).astype(np.int64),
+    ))
+
+def clamp(gdats, lo: int = 0, hi: int | None = None, min_disp_time: int = 0):
+    """
+    Clip wait into [lo, hi] and disp_time to at least `min_disp_time`.
+    """
+    _apply(gdats, lambda wait, disp_time, valid: (
+        np.clip(wait, lo, hi),
+        np.maximum(disp_time, min_disp_time),
+    ))
+
+def retime(gdats, start: int, end: int, delta: int = 0, factor: float = 1.0):
+    """
+    Lines with start <= wait < end are remapped to start + delta + (wait - start) * factor,
+    their disp_time scaled by `factor`; other lines are kept as is.
+    """
+    def func(wait, disp_time, valid):
+        in_range = (wait >= start) & (wait < end)
+        new_wait = start + delta + np.rint((wait - start) * factor).astype(np.int64)
+        new_disp_time = np.rint(disp_time * factor).astype(np.int64)
+        return np.where(in_range, new_wait, wait), np.where(in_range, new_disp_time, disp_time)
+    _apply(gdats, func)
@@ -0,0 +1,141 @@
+"""
+Shared fixtures: synthetic JMB files (US, JA with/without motions, big-endian JA).
+
+The repository root is the `jmbTool` package itself; it is registered under that name
+when it is not installed, so the tests can use the package's relative imports.
+"""
+import contextlib
+import importlib.util
+import io
+import pathlib
+import random
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+if importlib.util.find_spec('jmbTool') is None:
+    spec = importlib.util.spec_from_file_location('jmbTool', ROOT / '__init__.py',
+                                                  submodule_search_locations=[str(ROOT)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['jmbTool'] = module
+    spec.loader.exec_module(module)
+
+from jmbTool.jmbData import gDat_JA, gDat_US
+from jmbTool.jmbStruct import (MetaData_JA, MetaData_US, stFontParam, stInfo, stJimaku_JA, stJimaku_US,
+                               stOneSentence, stRubiDat, stTex, texMeta)
+
+def _tex(rng, bigEndian):
+    tex = stTex(bigEndian=bigEndian)
+    tex.header = texMeta(bigEndian=bigEndian)
+    tex.header.magic = b'GCT0'
+    tex.header.encoding = b'\x00\x00\x00\x0e'
+    tex.header.w, tex.header.h = 64, 32
+    tex.dds = b'DDS ' + bytes(rng.randrange(256) for _ in range(1000 + rng.randrange(50)))
+    tex.header.dds_size = len(tex.dds)
+    return tex
+
+def _char_data(rng, length: int, glyph_num: int):
+    codes = [rng.randrange(glyph_num) for _ in range(rng.randrange(1, length // 2))] + [-2]
+    return codes + [-1] * (length - len(codes))
+
+def _quiet_recalculate(gdat):
+    with contextlib.redirect_stdout(io.StringIO()):
+        gdat.recalculate_meta()
+
+def make_us(sentence_num: int = 14, bigEndian = False, seed: int = 7) -> gDat_US:
+    rng = random.Random(seed)
+    gdat = gDat_US(bigEndian=bigEndian)
+    gdat.meta = MetaData_US(bigEndian=bigEndian)
+    gdat.meta.sentence_num = sentence_num
+    gdat.meta.sentence_offset = 16
+    gdat.sentences = []
+    for i in range(sentence_num):
+        jmk = stJimaku_US(bigEndian=bigEndian)
+        jmk.wait, jmk.disp_time = i * 4800, 2000 + i
+        jmk.char_data = _char_data(rng, 128, 40)
+        gdat.sentences.append(jmk)
+    gdat.fParams = [stFontParam(u=i, v=i * 2, w=10, h=24, bigEndian=bigEndian) for i in range(40)]
+    gdat.tex = _tex(rng, bigEndian)
+    _quiet_recalculate(gdat)
+    return gdat
+
+def make_ja(sentence_num: int = 5, bigEndian = False, motions = True, seed: int = 7) -> gDat_JA:
+    rng = random.Random(seed)
+    gdat = gDat_JA(bigEndian=bigEndian)
+    gdat.meta = MetaData_JA(bigEndian=bigEndian)
+    gdat.meta.sentence_num = sentence_num
+    gdat.meta.sentence_offset = 20 + 4 * sentence_num
+    gdat.sentences = []
+    for i in range(sentence_num):
+        sent = stOneSentence(bigEndian=bigEndian)
+        sent.info = stInfo(bigEndian=bigEndian)
+        sent.info.wait, sent.info.hps_file, sent.info.mth_file, sent.info.key = i, f'hps{i}', 'm', 3
+        sent.info.padding = b'\x00\x00'
+        sent.jimaku_list = []
+        for j in range(16):
+            jmk = stJimaku_JA(bigEndian=bigEndian)
+            jmk.wait, jmk.disp_time = i * 4800 + j * 100, 1000 + j
+            jmk.char_data = _char_data(rng, 32, 41) if j < 3 else [-1] * 32
+            jmk.rubi_data = []
+            for r in range(16):
+                rubi = stRubiDat(bigEndian=bigEndian)
+                rubi.clear()
+                if r == 0 and j == 0:
+                    rubi.from_num, rubi.to_num, rubi.char_id = 0, 2, [5, 6] + [-1] * 8
+                jmk.rubi_data.append(rubi)
+            sent.jimaku_list.append(jmk)
+        gdat.sentences.append(sent)
+    gdat.fParams = [stFontParam(u=i, v=i * 2, w=10, h=24, bigEndian=bigEndian) for i in range(41)]
+    gdat.tex = _tex(rng, bigEndian)
+    if motions:
+        gdat.motions = [bytes(rng.randrange(256) for _ in range(17 + i)) for i in range(sentence_num)]
+        gdat.meta.s_motion_size_tbl = [len(motion) for motion in gdat.motions]
+    else:
+        gdat.end_by_tex = True
+        gdat.meta.s_motion_size_tbl = [0] * sentence_num
+    _quiet_recalculate(gdat)
+    if motions:
+        # like the game files: the motion data starts one alignment past the padded texture
+        gdat.meta.s_motion_offset += 32
+    return gdat
+
+def write_quiet(gdat, path, validation = True):
+    with contextlib.redirect_stdout(io.StringIO()):
+        gdat.write_to_file(str(path), validation)
+
+def full_write(gdat, validation = True) -> bytes:
+    """
+    validation=False keeps the current meta offsets (what an in-place patch must produce)
+    """
+    buf = io.BytesIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        gdat.write(buf, validation)
+    return buf.getvalue()
+
+# name -> (builder, gDat class, bigEndian)
+JMB_SAMPLES = {
+    'us.jmb':       (lambda: make_us(), gDat_US, False),
+    'ja.jmb':       (lambda: make_ja(), gDat_JA, False),
+    'ja_nomot.jmb': (lambda: make_ja(3, motions=False), gDat_JA, False),
+    'ja_be.jmb':    (lambda: make_ja(4, bigEndian=True, motions=False), gDat_JA, True),
+}
+
+@pytest.fixture(scope='session')
+def sample_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('samples')
+    for name, (build, _, _) in JMB_SAMPLES.items():
+        write_quiet(build(), directory / name, validation=False)
+    return directory
+
+@pytest.fixture
+def sample_copy(sample_dir, tmp_path):
+    """
+    copy(name) -> path of a private copy of a sample file
+    """
+    def copy(name: str) -> pathlib.Path:
+        path = tmp_path / name
+        path.write_bytes((sample_dir / name).read_bytes())
+        return path
+    return copy
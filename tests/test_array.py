@@ -0,0 +1,48 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from jmbTool.jmbArray import sentence_array, set_sentence_array
+from jmbTool.jmbData import BaseGdat
+
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb', 'ja_be.jmb'])
+def test_lazy_array_copies_without_decoding(sample_dir, name):
+    path = str(sample_dir / name)
+    eager = BaseGdat.create(path)
+    with BaseGdat.create(path, lazy=True) as gdat:
+        view = sentence_array(gdat, writable=False)
+        assert not view.flags.writeable
+        del view                    # the view pins the mapping until released
+        arr = sentence_array(gdat)
+        assert arr.flags.writeable
+        assert gdat.sentences.loaded_indices() == []
+        assert arr.tobytes() == b''.join(s.pack() for s in eager.sentences)
+
+def test_lazy_array_overlays_decoded_records(sample_dir):
+    with BaseGdat.create(str(sample_dir / 'us.jmb'), lazy=True) as gdat:
+        gdat.sentences[3].wait = 12345
+        gdat.sentences[5].char_data[0] = 7
+        arr = sentence_array(gdat)
+        assert gdat.sentences.loaded_indices() == [3, 5]
+        assert arr['wait'][3] == 12345 and arr['char_data'][5][0] == 7
+        # a read-only view over the mapping would miss the edits
+        assert sentence_array(gdat, writable=False)['wait'][3] == 12345
+        del arr
+
+@pytest.mark.parametrize('mode', ['eager', 'lazy', 'packed'])
+def test_read_only_array_after_rebase(sample_dir, mode):
+    gdat = BaseGdat.create(str(sample_dir / 'us.jmb'), lazy=mode == 'lazy', packed=mode == 'packed')
+    set_sentence_array(gdat, sentence_array(gdat))        # the table is now a bytearray
+    view = sentence_array(gdat, writable=False)
+    assert not view.flags.writeable
+    with pytest.raises(ValueError):
+        view['wait'][0] = 1
+    assert sentence_array(gdat).flags.writeable
+
+@pytest.mark.parametrize('mode', ['eager', 'lazy', 'packed'])
+def test_array_edits_round_trip(sample_dir, mode):
+    gdat = BaseGdat.create(str(sample_dir / 'ja_nomot.jmb'), lazy=mode == 'lazy', packed=mode == 'packed')
+    arr = sentence_array(gdat)
+    arr['jimaku_list']['disp_time'] += 10
+    set_sentence_array(gdat, arr)
+    assert [j.disp_time for j in gdat.sentences[1].jimaku_list] == [1000 + j + 10 for j in range(16)]
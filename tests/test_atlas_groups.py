@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('wand.image')
+
+from jmbTool.atlasGeneration import _group_files, strimage_unique_chars
+from jmbTool.atlasPacking import ShelfPacker
+
+SCALE = 4
+
+def _sizes(chars: str) -> dict[str, tuple[int, int]]:
+    return {ch: ((8 + ord(ch) % 5) * SCALE, 16 * SCALE) for ch in chars}
+
+def _height(chars, sizes, max_width) -> int:
+    return ShelfPacker().pack([sizes[ch] for ch in dict.fromkeys(chars)], max_width * SCALE, SCALE).height
+
+def test_groups_are_consecutive_maximal_and_fit():
+    file_chars = {f'f{i}': ''.join(chr(0x4e00 + i * 7 + k) for k in range(9 + i % 4)) for i in range(12)}
+    sizes = _sizes(''.join(file_chars.values()))
+    max_width, max_height = 64, 48
+    groups = _group_files(file_chars, sizes, SCALE, max_width, max_height, ShelfPacker())
+    assert [name for group in groups for name in group] == list(file_chars)
+    assert len(groups) > 1
+    for group, following in zip(groups, groups[1:] + [None]):
+        chars = ''.join(file_chars[name] for name in group)
+        assert len(group) == 1 or _height(chars, sizes, max_width) <= max_height * SCALE
+        if following is not None:
+            # next-fit: the first file of the next group did not fit into this one
+            assert _height(chars + file_chars[following[0]], sizes, max_width) > max_height * SCALE
+
+def test_shared_glyphs_keep_files_together():
+    file_chars = {'a': 'abcdef', 'b': 'fedcba', 'c': 'abc'}
+    groups = _group_files(file_chars, _sizes('abcdef'), SCALE, 64, 16, ShelfPacker())
+    assert groups == [['a', 'b', 'c']]
+
+def test_oversized_file_gets_its_own_group():
+    file_chars = {'small': 'ab', 'huge': ''.join(chr(0x3000 + k) for k in range(200)), 'tail': 'cd'}
+    sizes = _sizes(''.join(file_chars.values()))
+    assert _group_files(file_chars, sizes, SCALE, 64, 32, ShelfPacker()) == [['small'], ['huge'], ['tail']]
+
+def test_group_glyph_count_limit():
+    file_chars = {'a': ''.join(chr(0x4e00 + k) for k in range(2100)),
+                  'b': ''.join(chr(0x6000 + k) for k in range(2100))}
+    sizes = {ch: (SCALE, SCALE) for chars in file_chars.values() for ch in chars}
+    groups = _group_files(file_chars, sizes, SCALE, 4096, 4096, ShelfPacker())
+    assert groups == [['a'], ['b']]          # 4200 glyphs exceed the 12-bit glyph index
+
+def test_strimage_unique_chars_first_appearance():
+    assert strimage_unique_chars([['abc', 'cba'], [], ['', 'dab', 'e']]) == 'abcde'
+    assert strimage_unique_chars([]) == ''
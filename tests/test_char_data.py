@@ -0,0 +1,66 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from conftest import JMB_SAMPLES
+from jmbTool.jmbArray import validate_char_data
+from jmbTool.jmbConst import CharDataProblem
+from jmbTool.jmbData import BaseGdat
+
+def _lines(gdat):
+    for i, sentence in enumerate(gdat.sentences):
+        lines = sentence.jimaku_list if hasattr(sentence, 'jimaku_list') else [sentence]
+        for j, line in enumerate(lines):
+            yield i, j, line
+
+def _reference(gdat, name) -> list[tuple]:
+    """
+    the checks of validate_char_data, one code at a time
+    """
+    issues = []
+    for i, j, line in _lines(gdat):
+        codes = list(line.char_data)
+        if codes[0] == -1:
+            continue
+        if -2 not in codes:
+            issues.append((name, i, j, len(codes), CharDataProblem.NO_RET, -1))
+            ret = len(codes)
+        else:
+            ret = codes.index(-2)
+        for k, code in enumerate(codes[:ret]):
+            unsigned = code & 0xffff
+            if unsigned & 0xff00 != 0xff00 and unsigned & 0x0fff >= len(gdat.fParams):
+                issues.append((name, i, j, k, CharDataProblem.GLYPH_OUT_OF_RANGE, code))
+        after = [k for k in range(ret + 1, len(codes)) if codes[k] != -1]
+        if after:
+            issues.append((name, i, j, after[0], CharDataProblem.CODE_AFTER_RET, codes[after[0]]))
+    return issues
+
+def _issues(report) -> list[tuple]:
+    return [(x.file, x.sentence, x.line, x.position, x.problem, x.code) for x in report]
+
+@pytest.mark.parametrize('mode', ['eager', 'lazy', 'packed'])
+def test_samples_are_valid(sample_dir, mode):
+    gdats = [BaseGdat.create(str(sample_dir / name), lazy=mode == 'lazy', packed=mode == 'packed')
+             for name in JMB_SAMPLES]
+    report = validate_char_data(gdats, names=list(JMB_SAMPLES))
+    assert report.ok and len(report) == 0
+    assert report.checked_lines == sum(1 for gdat in gdats for _, _, line in _lines(gdat) if line.char_data[0] != -1)
+    for gdat in gdats:
+        gdat.close()
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_reports_every_problem(sample_dir, name):
+    gdat = BaseGdat.create(str(sample_dir / name))
+    lines = [line for _, _, line in _lines(gdat) if line.char_data[0] != -1]
+    width = len(lines[0].char_data)
+    lines[0].char_data = [3] * width                                    # no RET
+    lines[1].char_data = [1, len(gdat.fParams), -2] + [-1] * (width - 3)   # glyph past fParams
+    lines[2].char_data = [1, -2, -1, 0x7000 | 900] + [-1] * (width - 4)   # code after RET
+    lines[2].char_data[1 + width // 2] = 5
+    report = validate_char_data(gdat, names=[name])
+    assert sorted(_issues(report), key=repr) == sorted(_reference(gdat, name), key=repr)
+    assert len(report.by_problem(CharDataProblem.NO_RET)) == 1
+    assert len(report.by_problem(CharDataProblem.CODE_AFTER_RET)) == 1
+    assert [x.position for x in report.by_problem(CharDataProblem.GLYPH_OUT_OF_RANGE)] == [1]
+    assert not report.ok
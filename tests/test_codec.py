@@ -0,0 +1,55 @@
+import io
+
+import pytest
+
+from conftest import JMB_SAMPLES, full_write
+from jmbTool.jmbStruct import (_CodecRecord, LazyRecordList, SIChr, SIStr, SIStrPack, read_records,
+                               stFontParam, stJimaku_US)
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+@pytest.mark.parametrize('mode', ['eager', 'lazy', 'packed'])
+def test_read_write_is_byte_identical(sample_dir, name, mode):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = str(sample_dir / name)
+    with gdat_cls(path, bigEndian, lazy=(mode == 'lazy'), packed=(mode == 'packed')) as gdat:
+        assert full_write(gdat, validation=False) == (sample_dir / name).read_bytes()
+        # recalculate_meta() puts the motions right after the padded texture, closing the gap of ja.jmb
+        if name != 'ja.jmb':
+            assert full_write(gdat) == (sample_dir / name).read_bytes()
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_lazy_records_match_eager(sample_dir, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = str(sample_dir / name)
+    eager = gdat_cls(path, bigEndian)
+    with gdat_cls(path, bigEndian, lazy=True) as lazy:
+        assert isinstance(lazy.sentences, LazyRecordList)
+        assert [s.pack() for s in lazy.sentences] == [s.pack() for s in eager.sentences]
+        assert [p.pack() for p in lazy.fParams] == [p.pack() for p in eager.fParams]
+
+# NOTE: stOneSentence holds C strings (decoded lossily), it is covered by the file round trips
+@pytest.mark.parametrize('record_cls', [stJimaku_US, stFontParam, SIStrPack, SIStr, SIChr])
+@pytest.mark.parametrize('bigEndian', [False, True])
+def test_record_pack_unpack_round_trip(record_cls, bigEndian):
+    size = record_cls(bigEndian=bigEndian)._codec().size
+    raw = bytes((i * 37 + 11) & 0xff for i in range(size * 3))
+    if record_cls is SIChr:
+        # the pad byte after `h` is always written as 0
+        raw = bytearray(raw)
+        for i in range(3):
+            raw[i * size + 19] = 0
+        raw = bytes(raw)
+    records = read_records(io.BytesIO(raw), record_cls, 3, bigEndian)
+    assert b''.join(record.pack() for record in records) == raw
+    buf = bytearray(size * 3)
+    for i, record in enumerate(records):
+        record.pack_into(buf, i * size)
+    assert bytes(buf) == raw
+
+def test_codec_record_hooks_are_abstract():
+    class Incomplete(_CodecRecord):
+        FORMAT = 'h'
+        def _codec(self):
+            pass
+    with pytest.raises(TypeError):
+        Incomplete()
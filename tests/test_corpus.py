@@ -0,0 +1,65 @@
+import shutil
+
+import pytest
+
+from conftest import JMB_SAMPLES
+from jmbTool.jmbConst import FileKind
+from jmbTool.jmbCorpus import CorpusFile, discover, run_corpus
+
+@pytest.fixture
+def corpus(sample_dir, tmp_path):
+    """
+    samples spread over nested directories, plus files that are not recognised
+    """
+    root = tmp_path / 'corpus'
+    for i, name in enumerate(JMB_SAMPLES):
+        directory = root / ('b' if i % 2 else 'a') / str(i)
+        directory.mkdir(parents=True)
+        shutil.copy(sample_dir / name, directory / name.replace('.jmb', '.bin'))
+    (root / 'a' / 'notes.txt').write_text('not a jmb')
+    (root / 'empty.jmb').write_bytes(b'')
+    return root
+
+def sentence_num(file: CorpusFile) -> int:
+    with file.open(lazy=True) as gdat:
+        return gdat.meta.sentence_num
+
+def fail_on_us(file: CorpusFile) -> int:
+    assert file.kind != FileKind.JMB_US, "US file"
+    return sentence_num(file)
+
+def unpicklable_result(file: CorpusFile):
+    return lambda: file
+
+def test_discover_sorted_and_filtered(corpus):
+    files = list(discover(str(corpus)))
+    paths = [file.path for file in files]
+    assert paths == sorted(paths) and len(files) == len(JMB_SAMPLES)
+    assert {file.kind for file in files} == {FileKind.JMB_US, FileKind.JMB_JA}
+    assert [file.bigEndian for file in files if 'ja_be' in file.path] == [True]
+    assert [f.kind for f in discover(str(corpus), kinds=[FileKind.JMB_US])] == [FileKind.JMB_US]
+
+def test_in_process_keeps_order_and_errors(corpus):
+    files = list(discover(str(corpus)))
+    results = list(run_corpus(fail_on_us, files, workers=1))
+    assert [result.file for result in results] == files
+    for result in results:
+        if result.file.kind == FileKind.JMB_US:
+            assert not result.ok and result.value is None
+            assert 'AssertionError: US file' in result.error
+        else:
+            assert result.ok and result.value == sentence_num(result.file)
+
+@pytest.mark.parametrize('max_pending', [None, 1])
+def test_pool_yields_every_file_once(corpus, max_pending):
+    files = list(discover(str(corpus)))
+    results = list(run_corpus(fail_on_us, str(corpus), workers=2, max_pending=max_pending))
+    assert sorted(result.file.path for result in results) == [file.path for file in files]
+    errors = [result for result in results if not result.ok]
+    assert [result.file.kind for result in errors] == [FileKind.JMB_US]
+    assert all(result.value == sentence_num(result.file) for result in results if result.ok)
+
+def test_pool_records_unpicklable_results(corpus):
+    results = list(run_corpus(unpicklable_result, str(corpus), workers=2))
+    assert len(results) == len(JMB_SAMPLES)
+    assert all(not result.ok and result.value is None for result in results)
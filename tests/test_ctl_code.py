@@ -0,0 +1,58 @@
+import pytest
+
+from jmbTool.jmbNumeric import CtlCode, CtlKind, S16_BE
+
+@pytest.mark.parametrize('value', [-32768, -2, 0, 0x7000, 0x8000, 0xfffe, 'fffe', b'\xff\xfe', S16_BE('fffe')])
+def test_construction_keeps_signed_16_bits(value):
+    code = CtlCode(value)
+    assert -0x8000 <= code <= 0x7fff
+    assert code.unsigned == (value if isinstance(value, int) else 0xfffe) & 0xffff
+
+def test_out_of_range():
+    with pytest.raises(AssertionError):
+        CtlCode(0x10000)
+    with pytest.raises(AssertionError):
+        CtlCode(-0x8001)
+
+@pytest.mark.parametrize('code, kind, index', [
+    (CtlCode.glyph(5), CtlKind.GLYPH, 5),
+    (CtlCode.glyph(5, CtlKind.SATSU), CtlKind.SATSU, 5),
+    (CtlCode.glyph(0xfff, CtlKind.SHI), CtlKind.SHI, 0xfff),
+    (CtlCode.button('1a'), CtlKind.BUTTON, -1),
+    (CtlCode(CtlCode.SPACE_H), CtlKind.SPACE_H, -1),
+    (CtlCode(CtlCode.SPACE_Z), CtlKind.SPACE_Z, -1),
+    (CtlCode(CtlCode.RET), CtlKind.RET, -1),
+    (CtlCode(CtlCode.PAD), CtlKind.PAD, -1),
+])
+def test_kind_and_glyph_index(code, kind, index):
+    assert code.kind == kind
+    assert code.glyph_index == index
+    assert code.classify() == (index, kind)
+
+def test_constructors_match_the_raw_flags():
+    assert CtlCode.glyph(5, CtlKind.SATSU) == CtlCode('8005') == -0x7ffb
+    assert CtlCode.glyph(5, CtlKind.SHI) == 0x7005
+    assert CtlCode.button('1A') == CtlCode('ff1a')
+    with pytest.raises(AssertionError):
+        CtlCode.glyph(0x1000)
+    with pytest.raises(AssertionError):
+        CtlCode.glyph(1, CtlKind.RET)
+
+def test_operators_are_integer_ops():
+    code = CtlCode(5) | CtlCode.SATSU_FLAG
+    assert isinstance(code, CtlCode) and code == CtlCode('8005')
+    assert code & CtlCode.GLYPH_MASK == 5
+    assert {CtlCode(-2): 'ret'}[-2] == 'ret'            # hashes like the plain int
+    assert CtlCode(-2) == S16_BE('fffe').to_int()
+    assert repr(CtlCode(-2)) == 'CtlCode("fffe")'
+
+def test_classify_char_data_matches_ctl_code():
+    np = pytest.importorskip('numpy')
+    from jmbTool.jmbArray import classify_char_data
+    codes = np.arange(-0x8000, 0x8000, dtype=np.int16)
+    glyph_index, kind, valid = classify_char_data(codes, glyph_num=100)
+    for value in list(range(-0x8000, -0x7f00)) + list(range(-300, 300)) + list(range(0x6f00, 0x8000)):
+        code = CtlCode(value)
+        assert (glyph_index[value + 0x8000], kind[value + 0x8000]) == code.classify()
+        assert valid[value + 0x8000] == (code.glyph_index < 100)
+    assert classify_char_data(codes.reshape(256, 256))[0].shape == (256, 256)
@@ -0,0 +1,44 @@
+import struct
+
+import pytest
+
+from jmbTool.jmbDds import DDSD_LINEARSIZE, DDPF_FOURCC, DdsLayout, splice_dds_rows
+
+def _dds(width: int, height: int, rows: list[int], fourcc = b'DXT1') -> bytes:
+    """
+    single-level DXT1 texture whose block row k is filled with the byte rows[k]
+    """
+    header = bytearray(128)
+    header[:4] = b'DDS '
+    row_bytes = -(-width // 4) * 8
+    struct.pack_into('<IIIII', header, 4, 124, 0x1007 | DDSD_LINEARSIZE, height, width, row_bytes * len(rows))
+    struct.pack_into('<I', header, 28, 1)
+    struct.pack_into('<II4s', header, 76, 32, DDPF_FOURCC, fourcc)
+    return bytes(header) + b''.join(bytes([row]) * row_bytes for row in rows)
+
+def _rows(dds: bytes) -> list[int]:
+    layout = DdsLayout(dds)
+    data = dds[layout.data_offset:]
+    assert len(data) == layout.rows_size(layout.height)
+    return [data[k * layout.row_bytes] for k in range(len(data) // layout.row_bytes)]
+
+@pytest.mark.parametrize('top, band_rows', [(8, [7, 8]), (4, [7]), (16, [7, 8, 9]), (0, [7])])
+def test_splice_keeps_rows_above_top(top, band_rows):
+    base = _dds(16, 16, [1, 2, 3, 4])
+    dds = splice_dds_rows(base, _dds(16, 4 * len(band_rows), band_rows), top)
+    layout = DdsLayout(dds)
+    assert layout.width == 16 and layout.height == top + 4 * len(band_rows)
+    assert _rows(dds) == [1, 2, 3, 4][:top // 4] + band_rows
+    linear_size, = struct.unpack_from('<I', dds, 20)
+    assert linear_size == layout.rows_size(layout.height)
+
+def test_splice_rejects_mismatched_textures():
+    base = _dds(16, 16, [1, 2, 3, 4])
+    with pytest.raises(AssertionError, match='block boundary'):
+        splice_dds_rows(base, _dds(16, 4, [7]), 6)
+    with pytest.raises(AssertionError, match='widths differ'):
+        splice_dds_rows(base, _dds(8, 4, [7]), 8)
+    with pytest.raises(AssertionError, match='formats differ'):
+        splice_dds_rows(base, _dds(16, 4, [7], b'DXT5'), 8)
+    with pytest.raises(AssertionError, match='below the texture'):
+        splice_dds_rows(base, _dds(16, 4, [7]), 20)
@@ -0,0 +1,46 @@
+import os
+
+from jmbTool.jmbCache import DiskCache
+
+def _put(cache, key, size):
+    path = cache._key_path(key)
+    cache._write_bytes(path, bytes(size))
+    return path
+
+def test_eviction_is_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=300, suffix='.bin')
+    paths = [_put(cache, f'k{i}', 100) for i in range(3)]
+    for i, path in enumerate(paths):
+        os.utime(path, (1000 + i, 1000 + i))
+    assert cache._read_bytes(paths[0]) == bytes(100)      # k0 becomes the most recent
+    _put(cache, 'k3', 60)                                 # 360 > 300: evicted down to 270
+    assert not os.path.exists(paths[1])
+    assert all(os.path.exists(path) for path in (paths[0], paths[2]))
+    assert cache.total_size() <= 300
+
+def test_writes_are_atomic(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20, suffix='.bin')
+    path = _put(cache, 'key', 10)
+    cache._write_bytes(path, b'new content')
+    assert cache._read_bytes(path) == b'new content'
+    assert os.listdir(tmp_path) == ['key.bin']            # no temporary file left behind
+    assert cache._read_bytes(cache._key_path('missing')) is None
+
+def test_clear(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1 << 20, suffix='.bin')
+    _put(cache, 'a', 10)
+    cache.clear()
+    assert cache.total_size() == 0
+
+def test_directory_scanned_only_when_over_the_limit(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=1000, suffix='.bin')
+    _put(cache, 'seed', 100)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, '_entries', lambda: scans.append(1) or entries())
+    for i in range(8):
+        _put(cache, f'k{i}', 100)
+    _put(cache, 'k0', 50)                                 # rewriting an entry replaces its size
+    assert scans == [] and cache._total == 850
+    _put(cache, 'k8', 200)                                # 1050: one scan, down to <= 900
+    assert scans == [1] and cache._total == cache.total_size() <= 900
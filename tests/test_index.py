@@ -0,0 +1,57 @@
+import os
+import shutil
+
+from jmbTool.jmbData import BaseGdat
+from jmbTool.jmbIndex import CorpusIndex
+
+def _corpus(sample_dir, root):
+    os.makedirs(root / 'a')
+    for name in ('us.jmb', 'ja_nomot.jmb', 'ja_be.jmb'):
+        shutil.copy(sample_dir / name, root / 'a' / name)
+    return root
+
+def test_update_is_incremental(sample_dir, tmp_path):
+    root = _corpus(sample_dir, tmp_path / 'corpus')
+    with CorpusIndex(str(tmp_path / 'index.db')) as index:
+        assert index.update(str(root)) == (3, 0)
+        assert index.errors == []
+        assert index.update(str(root)) == (0, 0)
+
+        changed = root / 'a' / 'us.jmb'
+        st = os.stat(changed)
+        os.utime(changed, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert index.update(str(root)) == (1, 0)
+        assert index.query("SELECT count(*) FROM files") == [(3,)]
+
+def test_deleted_files_are_removed(sample_dir, tmp_path):
+    root = _corpus(sample_dir, tmp_path / 'corpus')
+    with CorpusIndex(str(tmp_path / 'index.db')) as index:
+        index.update(str(root))
+        codes = index.query("SELECT count(*) FROM codes")[0][0]
+        us_codes = index.query("SELECT count(*) FROM codes c JOIN files f ON f.id = c.file_id "
+                               "WHERE f.path LIKE '%us.jmb'")[0][0]
+        os.remove(root / 'a' / 'us.jmb')
+        assert index.update(str(root)) == (0, 1)
+        assert index.query("SELECT count(*) FROM files") == [(2,)]
+        assert index.query("SELECT count(*) FROM codes")[0][0] == codes - us_codes
+
+def test_queries_match_file(sample_dir, tmp_path):
+    root = _corpus(sample_dir, tmp_path / 'corpus')
+    path = str(root / 'a' / 'us.jmb')
+    gdat = BaseGdat.create(path)
+    with CorpusIndex(str(tmp_path / 'index.db')) as index:
+        index.update(str(root))
+        code = gdat.sentences[0].char_data[0]
+        assert path in index.files_using_code(code)
+        p = gdat.fParams[3]
+        assert index.glyph_size(path, 3) == (p.u, p.v, p.w, p.h)
+        wait = gdat.sentences[2].wait / 4800
+        assert (2, 0, gdat.sentences[2].wait, gdat.sentences[2].disp_time) in index.lines_near_wait(path, wait, 0.1)
+
+def test_unreadable_file_is_reported(sample_dir, tmp_path):
+    root = _corpus(sample_dir, tmp_path / 'corpus')
+    data = (root / 'a' / 'us.jmb').read_bytes()
+    (root / 'a' / 'broken.jmb').write_bytes(data[:len(data) - 600])
+    with CorpusIndex(str(tmp_path / 'index.db')) as index:
+        assert index.update(str(root)) == (3, 0)
+        assert [os.path.basename(result.file.path) for result in index.errors] == ['broken.jmb']
@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import JMB_SAMPLES
+from jmbTool import jmbData
+from jmbTool.jmbConst import JmkKind
+from jmbTool.jmbData import iter_lines, iter_sentences
+
+def _eager(sample_dir, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    with gdat_cls(str(sample_dir / name), bigEndian) as gdat:
+        return gdat.meta.char_offset, [sentence.pack() for sentence in gdat.sentences], list(gdat.sentences)
+
+def _kind(name):
+    return (JmkKind.JA if name.startswith('ja') else JmkKind.US), JMB_SAMPLES[name][2]
+
+def _expected_lines(sentences):
+    for i, sentence in enumerate(sentences):
+        for j, line in enumerate(getattr(sentence, 'jimaku_list', [sentence])):
+            codes = list(line.char_data)
+            if codes[0] == -1:
+                continue
+            valid_len = codes.index(-2) if -2 in codes else 0
+            yield (i, j, line.wait, line.disp_time, tuple(codes[:valid_len]))
+
+@pytest.mark.parametrize('chunk', [64, 3])
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_iter_sentences_matches_full_read(sample_dir, monkeypatch, name, chunk):
+    monkeypatch.setattr(jmbData, 'SENTENCE_CHUNK', chunk)
+    _, packed, _ = _eager(sample_dir, name)
+    assert [sentence.pack() for sentence in iter_sentences(str(sample_dir / name))] == packed
+    kind, bigEndian = _kind(name)
+    with open(sample_dir / name, 'rb') as fp:
+        assert [sentence.pack() for sentence in iter_sentences(fp, kind, bigEndian)] == packed
+
+@pytest.mark.parametrize('chunk', [64, 3])
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_iter_lines_matches_records(sample_dir, monkeypatch, name, chunk):
+    monkeypatch.setattr(jmbData, 'SENTENCE_CHUNK', chunk)
+    _, _, sentences = _eager(sample_dir, name)
+    lines = list(iter_lines(str(sample_dir / name)))
+    assert [tuple(line) for line in lines] == list(_expected_lines(sentences))
+    assert lines and all(isinstance(line, jmbData.JimakuLine) for line in lines)
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_reads_only_meta_and_sentences(sample_dir, tmp_path, name):
+    char_offset, packed, _ = _eager(sample_dir, name)
+    kind, bigEndian = _kind(name)
+    head = tmp_path / name
+    # sniff() checks the offsets against the file size, so the kind is given explicitly
+    head.write_bytes((sample_dir / name).read_bytes()[:char_offset])    # no fParams, no texture
+    assert [sentence.pack() for sentence in iter_sentences(str(head), kind, bigEndian)] == packed
+    head.write_bytes((sample_dir / name).read_bytes()[:char_offset - 1])
+    with pytest.raises(AssertionError, match='truncated'):
+        list(iter_lines(str(head), kind, bigEndian))
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from jmbTool.atlasPacking import AtlasPacker, PACKERS, ShelfPacker, get_packer
+
+def _random_sizes(rng, count, max_width, align):
+    return [(min(rng.randint(1, 60) + rng.randint(0, align - 1), max_width), rng.randint(1, 40) * align)
+            for _ in range(count)]
+
+def _align_up(x, align):
+    return (x + align - 1) // align * align
+
+def _check(result, sizes, max_width, align, occupied=()):
+    rects = [(x, y, _align_up(w, align), _align_up(h, align))
+             for (x, y), (w, h) in zip(result.positions, sizes)]
+    for x, y, w, h in rects:
+        assert x % align == 0 and y % align == 0
+        assert x + w <= max_width
+    for i, (x1, y1, w1, h1) in enumerate(rects):
+        for x2, y2, w2, h2 in rects[:i] + list(occupied):
+            assert x1 + w1 <= x2 or x2 + w2 <= x1 or y1 + h1 <= y2 or y2 + h2 <= y1
+    # the canvas is exactly the bounding box of everything placed
+    boxes = rects + list(occupied)
+    assert result.width == (_align_up(max(x + w for x, y, w, h in boxes), align) if boxes else 0)
+    assert result.height == (max(y + h for x, y, w, h in boxes) if boxes else 0)
+    assert result.width <= max_width and result.height % align == 0
+
+@pytest.mark.parametrize('name', list(PACKERS))
+@pytest.mark.parametrize('seed', range(30))
+def test_no_overlap_and_exact_canvas(name, seed):
+    rng = random.Random(seed)
+    align = rng.choice([1, 2, 4])
+    max_width = rng.choice([64, 128, 256]) * align
+    sizes = _random_sizes(rng, rng.randint(0, 120), max_width, align)
+    result = get_packer(name).pack(sizes, max_width, align)
+    _check(result, sizes, max_width, align)
+    assert get_packer(name).pack(sizes, max_width, align).positions == result.positions
+    if sizes:
+        assert 0 < result.occupancy <= 1
+
+@pytest.mark.parametrize('name', list(PACKERS))
+def test_occupied_rectangles_are_avoided(name):
+    rng = random.Random(1)
+    occupied = [(0, 0, 200, 40), (200, 0, 40, 80), (0, 40, 48, 16)]
+    sizes = _random_sizes(rng, 50, 256, 4)
+    result = get_packer(name).pack(sizes, 256, 4, occupied)
+    _check(result, sizes, 256, 4, occupied)
+
+def test_shelf_keeps_original_row_layout():
+    # equal heights: rows of PHY_HEIGHT, x advanced by the padded width, wrap when touching the edge
+    sizes = [(30, 68)] * 5
+    result = ShelfPacker().pack(sizes, 128, 4)
+    assert result.positions == [(0, 0), (32, 0), (64, 0), (96, 0), (0, 68)]
+    assert (result.width, result.height) == (128, 136)
+
+def test_skyline_is_tighter_with_mixed_heights():
+    rng = random.Random(3)
+    sizes = [(rng.randint(10, 80), rng.choice([40, 80, 120])) for _ in range(300)]
+    shelf = get_packer('shelf').pack(sizes, 1024, 4)
+    skyline = get_packer('skyline').pack(sizes, 1024, 4)
+    assert skyline.height < shelf.height
+
+def test_packer_validation():
+    with pytest.raises(TypeError):
+        AtlasPacker()
+    with pytest.raises(AssertionError):
+        get_packer('maxrects')
+    with pytest.raises(AssertionError):
+        ShelfPacker().pack([(300, 10)], 256, 4)
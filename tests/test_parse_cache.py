@@ -0,0 +1,27 @@
+import pytest
+
+from jmbTool.jmbCache import ParseCache
+
+@pytest.mark.parametrize('key', ['stat', 'content'])
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb', 'ja_be.jmb'])
+def test_parse_cache_hit_matches_file(sample_dir, tmp_path, key, name):
+    from jmbTool.jmbData import BaseGdat
+    cache = ParseCache(str(tmp_path / 'cache'), key=key)
+    path = str(sample_dir / name)
+    first = cache.load(path)
+    assert len(cache._entries()) == 1
+    second = cache.load(path)
+    eager = BaseGdat.create(path)
+    for gdat in (first, second):
+        assert [s.pack() for s in gdat.sentences] == [s.pack() for s in eager.sentences]
+        assert [p.pack() for p in gdat.fParams] == [p.pack() for p in eager.fParams]
+        assert bytes(gdat.tex.dds) == bytes(eager.tex.dds)
+
+def test_parse_cache_drops_corrupt_entry(sample_dir, tmp_path):
+    cache = ParseCache(str(tmp_path / 'cache'))
+    path = str(sample_dir / 'us.jmb')
+    cache.load(path)
+    entry_path = cache._entry_path(path)
+    with open(entry_path, 'wb') as fp:
+        fp.write(b'not a pickle')
+    assert len(cache.load(path).sentences) == 14
@@ -0,0 +1,181 @@
+import contextlib
+import copy
+import io
+
+import pytest
+
+from conftest import JMB_SAMPLES, full_write, write_quiet
+from jmbTool.jmbCache import ParseCache
+from jmbTool.jmbData import gDat_JA, gDat_US
+from jmbTool.jmbStruct import FilePayload, RecordList, stFontParam
+
+def _patch(gdat) -> bool:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return gdat.patch_file()
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+@pytest.mark.parametrize('lazy', [False, True])
+def test_patch_file_matches_full_write(sample_copy, name, lazy):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = sample_copy(name)
+    with gdat_cls(str(path), bigEndian, lazy=lazy) as gdat:
+        sent = gdat.sentences[1]
+        if name.startswith('ja'):
+            sent.jimaku_list[0].wait += 4800
+            sent.info.wait += 1
+        else:
+            sent.wait += 4800
+        gdat.fParams[3].u += 1
+        assert _patch(gdat)
+        assert path.read_bytes() == full_write(gdat, validation=False)
+
+        # same-size texture
+        gdat.tex.dds = bytes(gdat.tex.dds[:4]) + b'\x11' * (len(gdat.tex.dds) - 4)
+        assert _patch(gdat)
+        assert path.read_bytes() == full_write(gdat, validation=False)
+
+        # layout change: full rewrite with the meta recalculated
+        gdat.fParams.append(stFontParam(u=9, bigEndian=bigEndian))
+        assert not _patch(gdat)
+        assert path.read_bytes() == full_write(gdat)
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_patch_file_keeps_motion_offset(sample_copy, lazy):
+    path = sample_copy('ja.jmb')
+    original = path.read_bytes()
+    with gDat_JA(str(path), lazy=lazy) as gdat:
+        motion_offset = gdat.meta.s_motion_offset
+        assert not gdat.end_by_tex and motion_offset == gdat.plan_layout()['tex'].end + 32
+        gdat.motions[2] = bytes(len(gdat.motions[2]))
+        ranges = gdat.dirty_ranges()
+        assert ranges == [(motion_offset + len(gdat.motions[0]) + len(gdat.motions[1]), len(gdat.motions[2]))]
+        assert _patch(gdat)
+        assert gdat.meta.s_motion_offset == motion_offset
+        data = path.read_bytes()
+        assert len(data) == len(original) and data == full_write(gdat, validation=False)
+
+        # a motion that changes size no longer matches s_motion_size_tbl
+        gdat.motions[2] = b'\1' * (len(gdat.motions[2]) + 5)
+        gdat.meta.s_motion_size_tbl[2] += 5
+        assert not _patch(gdat)
+        assert path.read_bytes() == full_write(gdat)
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_patch_file_writes_only_dirty_ranges(sample_copy, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = sample_copy(name)
+    with gdat_cls(str(path), bigEndian, lazy=True) as gdat:
+        assert gdat.dirty_ranges() == []
+        gdat.fParams[2].v += 1
+        ranges = gdat.dirty_ranges()
+        assert len(ranges) == 1 and ranges[0][1] <= stFontParam.STRUCT_SIZE
+        assert _patch(gdat)
+        assert path.read_bytes() == full_write(gdat, validation=False)
+
+def test_patch_file_rewrites_changed_file(sample_copy):
+    _, gdat_cls, bigEndian = JMB_SAMPLES['us.jmb']
+    path = sample_copy('us.jmb')
+    gdat = gdat_cls(str(path), bigEndian)
+    path.write_bytes(path.read_bytes() + b'\0')      # not the file that was read anymore
+    gdat.fParams[0].u += 1
+    assert not _patch(gdat)
+    assert path.read_bytes() == full_write(gdat)
+
+def _count_encodes(monkeypatch, record_cls) -> list:
+    calls = []
+    original = record_cls._encode
+    monkeypatch.setattr(record_cls, '_encode', lambda self, values: (calls.append(self), original(self, values))[1])
+    return calls
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_patch_file_encodes_only_edited_records(sample_copy, monkeypatch, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = sample_copy(name)
+    gdat = gdat_cls(str(path), bigEndian)
+    record_cls = type(gdat.sentences.peek(0))
+    held = gdat.sentences[2]
+    assert gdat.sentences.dirty_indices() == [2] and gdat.fParams.dirty_indices() == []
+
+    sentence_encodes = _count_encodes(monkeypatch, record_cls)
+    fparam_encodes = _count_encodes(monkeypatch, stFontParam)
+    line = held.jimaku_list[0] if name.startswith('ja') else held
+    line.wait += 1
+    assert _patch(gdat)
+    assert sentence_encodes == [held] and fparam_encodes == []
+    assert path.read_bytes() == full_write(gdat, validation=False)
+
+    # a record handed out before a patch is still compared by the next one
+    line.disp_time += 1
+    assert _patch(gdat)
+    assert path.read_bytes() == full_write(gdat, validation=False)
+
+def test_record_list_tracks_handed_out_records():
+    records = RecordList(stFontParam(u=i) for i in range(6))
+    assert records.dirty_indices() == []
+    records[-1].u = 9
+    records[1:3]
+    records.peek(4)
+    assert records.dirty_indices() == [1, 2, 5]
+    records.append(stFontParam())
+    records[0] = stFontParam()
+    assert records.dirty_indices() == [0, 1, 2, 5, 6]
+    assert [record.u for record in records.untracked()][5] == 9
+    assert records.dirty_indices() == [0, 1, 2, 5, 6]
+
+    for record in records:
+        pass
+    assert records.dirty_indices() == list(range(7))
+    copied = copy.copy(RecordList(records.untracked()))
+    assert isinstance(copied, RecordList) and copied.dirty_indices() == []
+
+def test_patch_after_lazy_retime_compares_changed_rows(sample_copy):
+    jmbTimeline = pytest.importorskip('jmbTool.jmbTimeline')
+    path = sample_copy('us.jmb')
+    with gDat_US(str(path), lazy=True) as gdat:
+        jmbTimeline.retime(gdat, 0, 4800 * 3, delta=10)
+        assert gdat.sentences.dirty_indices() == [0, 1, 2]
+        assert len(gdat.dirty_ranges()) == 3
+        assert _patch(gdat)
+        expected = full_write(gdat, validation=False)
+    assert path.read_bytes() == expected
+
+def test_patch_after_set_sentence_array(sample_copy):
+    jmbArray = pytest.importorskip('jmbTool.jmbArray')
+    path = sample_copy('us.jmb')
+    gdat = gDat_US(str(path))
+    arr = jmbArray.sentence_array(gdat)
+    arr['wait'][[3, 7]] += 1
+    jmbArray.set_sentence_array(gdat, arr)
+    assert [offset for offset, size in gdat.dirty_ranges()] == [gdat.meta.sentence_offset + i * 264 for i in (3, 7)]
+    assert _patch(gdat)
+    assert path.read_bytes() == full_write(gdat, validation=False)
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_rewrite_repoints_texture_payload(sample_copy, tmp_path, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    path = sample_copy(name)
+    dds = bytes(gdat_cls(str(path), bigEndian).tex.dds)
+    gdat = ParseCache(str(tmp_path / 'cache')).load(str(path))
+    assert isinstance(gdat.tex.dds, FilePayload)
+
+    # the texture moves by one font param: the payload must follow it into the new file
+    gdat.fParams.append(stFontParam(u=9, bigEndian=bigEndian))
+    assert not _patch(gdat)
+    assert bytes(gdat.tex.dds) == dds
+    assert path.read_bytes() == full_write(gdat, validation=False)
+    gdat.fParams[0].u += 1
+    assert _patch(gdat)
+    assert bytes(gdat_cls(str(path), bigEndian).tex.dds) == dds
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_write_to_file_over_its_source(sample_copy, lazy):
+    _, gdat_cls, bigEndian = JMB_SAMPLES['ja_be.jmb']
+    path = sample_copy('ja_be.jmb')
+    original = path.read_bytes()
+    with gdat_cls(str(path), bigEndian, lazy=lazy) as gdat:
+        gdat.tex.dds = FilePayload(str(path), gdat.meta.tex_offset + gdat.tex.header.STRUCT_SIZE, len(gdat.tex.dds))
+        gdat.fParams.append(stFontParam(u=9, bigEndian=bigEndian))
+        write_quiet(gdat, path)
+        assert path.read_bytes() == full_write(gdat)
+        assert bytes(gdat.tex.dds) == bytes(gdat_cls(str(path), bigEndian).tex.dds)
+    assert path.read_bytes() != original
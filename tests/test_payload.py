@@ -0,0 +1,85 @@
+import io
+import os
+import struct
+
+import pytest
+
+from conftest import JMB_SAMPLES, full_write
+from jmbTool.jmbStruct import FilePayload, stTex, write_payload
+
+@pytest.fixture
+def payload_file(tmp_path):
+    data = bytes(range(256)) * 40
+    path = tmp_path / 'payload.bin'
+    path.write_bytes(b'head' + data + b'tail')
+    return path, data
+
+def test_file_payload_reads_its_range(payload_file):
+    path, data = payload_file
+    payload = FilePayload(str(path), 4, len(data))
+    assert len(payload) == len(data)
+    assert payload[:4] == data[:4] and payload[-1] == data[-1] and payload[10:20] == data[10:20]
+    assert bytes(payload) == data and payload == data
+    with pytest.raises(IndexError):
+        payload[len(data)]
+    assert len(FilePayload(str(path), 4)) == len(data) + 4
+
+@pytest.mark.parametrize('chunk', [FilePayload.COPY_CHUNK, 1000])
+def test_copy_to_without_sendfile(payload_file, monkeypatch, chunk):
+    path, data = payload_file
+    monkeypatch.setattr(FilePayload, 'COPY_CHUNK', chunk)
+    out = io.BytesIO(b'xx')
+    out.seek(2)
+    write_payload(out, FilePayload(str(path), 4, len(data)))
+    assert out.getvalue() == b'xx' + data
+
+def test_copy_to_real_file(payload_file, tmp_path, monkeypatch):
+    path, data = payload_file
+    sent = []
+    if hasattr(os, 'sendfile'):
+        sendfile = os.sendfile
+        monkeypatch.setattr(os, 'sendfile', lambda *args: sent.append(args[3]) or sendfile(*args))
+    with open(tmp_path / 'out.bin', 'wb') as out:
+        out.write(b'prefix')
+        FilePayload(str(path), 4, len(data)).copy_to(out)
+        assert out.tell() == 6 + len(data)
+        out.write(b'!')
+    assert (tmp_path / 'out.bin').read_bytes() == b'prefix' + data + b'!'
+    assert sent[:1] == ([len(data)] if hasattr(os, 'sendfile') else [])
+
+def test_sendfile_refuses_in_memory_output(payload_file):
+    path, data = payload_file
+    with open(path, 'rb') as src:
+        assert not FilePayload(str(path), 4, len(data))._sendfile(src, io.BytesIO())
+
+def _dds(width: int, height: int, extra: int) -> bytes:
+    header = bytearray(128)
+    header[:4] = b'DDS '
+    struct.pack_into('<IIII', header, 4, 124, 0x1007, height, width)
+    return bytes(header) + bytes(range(extra))
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_replace_dds_streams_the_new_texture(sample_dir, tmp_path, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    dds = _dds(256, 64, 200)
+    (tmp_path / 'new.dds').write_bytes(dds)
+    with gdat_cls(str(sample_dir / name), bigEndian) as gdat:
+        assert gdat.tex.replace_dds(str(tmp_path / 'new.dds')) == (256, 64)
+        assert isinstance(gdat.tex.dds, FilePayload)
+        assert (gdat.tex.header.w, gdat.tex.header.h, gdat.tex.header.dds_size) == (64, 16, len(dds))
+        data = full_write(gdat)
+    offset = gdat.meta.tex_offset
+    tex = stTex.from_buffer(data, offset, bigEndian)
+    assert bytes(tex.dds) == dds and (tex.header.w, tex.header.h) == (64, 16)
+    assert stTex(io.BytesIO(data[offset:]), bigEndian).dds == dds
+
+def test_replace_dds_rejects_bad_files(sample_dir, tmp_path):
+    path = str(sample_dir / 'us.jmb')
+    with JMB_SAMPLES['us.jmb'][1](path) as gdat:
+        tex = stTex.from_file(path, gdat.meta.tex_offset)
+    (tmp_path / 'odd.dds').write_bytes(_dds(250, 64, 10))
+    (tmp_path / 'png.dds').write_bytes(b'\x89PNG' + bytes(200))
+    with pytest.raises(AssertionError, match='multiples of 4'):
+        tex.replace_dds(str(tmp_path / 'odd.dds'))
+    with pytest.raises(AssertionError, match='not a valid DDS'):
+        tex.replace_dds(str(tmp_path / 'png.dds'))
@@ -0,0 +1,42 @@
+import io
+
+import pytest
+
+from conftest import JMB_SAMPLES
+from jmbTool.jmbConst import FileKind
+from jmbTool.jmbData import BaseGdat, gDat_JA, gDat_US
+from jmbTool.jmbSniff import sniff
+
+EXPECTED = {
+    'us.jmb':       (FileKind.JMB_US, False),
+    'ja.jmb':       (FileKind.JMB_JA, False),
+    'ja_nomot.jmb': (FileKind.JMB_JA, False),
+    'ja_be.jmb':    (FileKind.JMB_JA, True),
+}
+
+@pytest.mark.parametrize('name', list(EXPECTED))
+def test_sniff_kind_and_endianness(sample_dir, name):
+    assert sniff(str(sample_dir / name)) == EXPECTED[name]
+
+@pytest.mark.parametrize('name', list(EXPECTED))
+def test_create_without_kind(sample_dir, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    gdat = BaseGdat.create(str(sample_dir / name))
+    assert type(gdat) is gdat_cls and gdat.bigEndian == bigEndian
+
+def test_create_from_file_object_keeps_position(sample_dir):
+    with open(sample_dir / 'ja.jmb', 'rb') as fp:
+        fp.seek(5)
+        assert isinstance(BaseGdat.create(fp, lazy=True), gDat_JA)
+
+def test_sniff_rejects_junk(tmp_path):
+    junk = tmp_path / 'junk.bin'
+    junk.write_bytes(b'\x01\x02' * 300)
+    assert sniff(str(junk))[0] == FileKind.UNKNOWN
+    with pytest.raises(AssertionError):
+        BaseGdat.create(str(junk))
+
+def test_sniff_truncated(sample_dir, tmp_path):
+    cut = tmp_path / 'cut.jmb'
+    cut.write_bytes((sample_dir / 'us.jmb').read_bytes()[:100])
+    assert sniff(str(cut))[0] != FileKind.JMB_US
@@ -0,0 +1,88 @@
+import io
+import random
+import struct
+
+import pytest
+
+from jmbTool.jmbStruct import SIChr, SIStr, SIStrPack, stTex, texMeta, texStrImage, texStrImageHeader
+
+def make_strimage(seed: int = 3, pack_num: int = 7, str_num: int = 20, chr_num: int = 50) -> texStrImage:
+    rng = random.Random(seed)
+    strimage = texStrImage()
+    header = texStrImageHeader()
+    header.magic, header.height, header.tume = b'STRIMAGE', 24, 2
+    header.strPackNum, header.strNum, header.chrNum = pack_num, str_num, chr_num
+    strimage.header = header
+    for _ in range(pack_num):
+        pack = SIStrPack()
+        pack.strIndex = [rng.randrange(-1, str_num) for _ in range(31)]
+        strimage.strpack.append(pack)
+    for _ in range(str_num):
+        string = SIStr()
+        string.strIndex = [rng.randrange(-1, chr_num) for _ in range(129)]
+        strimage.str.append(string)
+    for i in range(chr_num):
+        char = SIChr()
+        char.code, char.x, char.y, char.w, char.h = 0x3042 + i, i, 2 * i, 10, 24
+        char.dx, char.dy, char.addx, char.addw, char.code2 = -1, -(i % 3), 11, bytes([i % 4]), 0x3042 + i
+        strimage.chb.append(char)
+    strimage.tex = stTex()
+    strimage.tex.header = texMeta()
+    strimage.tex.header.magic, strimage.tex.header.encoding = b'GCT0', b'\x00\x00\x00\x0e'
+    strimage.tex.header.w = strimage.tex.header.h = 8
+    strimage.tex.dds = b'DDS ' + bytes(rng.randrange(256) for _ in range(300))
+    strimage.tex.header.dds_size = len(strimage.tex.dds)
+    return strimage
+
+def _expected_tables(strimage) -> bytes:
+    """
+    the tables as the per-field reader/writer laid them out, one value at a time
+    """
+    out = b''
+    for record in strimage.strpack + strimage.str:
+        out += b''.join(struct.pack('<h', index) for index in record.strIndex)
+    for char in strimage.chb:
+        out += struct.pack('<I', char.code)
+        out += b''.join(struct.pack('<H', value) for value in (char.x, char.y, char.w, char.h))
+        out += struct.pack('<h', char.dx) + struct.pack('<h', char.dy) + struct.pack('<H', char.addx)
+        out += char.addw + b'\x00' + struct.pack('<I', char.code2)
+    return out
+
+def _fields(strimage):
+    return ([record.strIndex for record in strimage.strpack], [record.strIndex for record in strimage.str],
+            [vars(char) for char in strimage.chb], bytes(strimage.tex.dds))
+
+@pytest.mark.parametrize('sizes', [(7, 20, 50), (0, 0, 0), (1, 1, 1)])
+def test_round_trip(sizes):
+    strimage = make_strimage(3, *sizes)
+    out = io.BytesIO()
+    strimage.write(out)
+    data = out.getvalue()
+    tables = _expected_tables(strimage)
+    assert data[32:32 + len(tables)] == tables
+    assert data[32 + len(tables) + 72:] == strimage.tex.dds
+
+    back = texStrImage(io.BytesIO(data))
+    assert _fields(back) == _fields(strimage)
+    again = io.BytesIO()
+    back.write(again)
+    assert again.getvalue() == data
+
+def test_bulk_read_matches_record_reads():
+    out = io.BytesIO()
+    make_strimage().write(out)
+    fp = io.BytesIO(out.getvalue())
+    header = texStrImageHeader(fp)
+    packs = [SIStrPack(fp) for _ in range(header.strPackNum)]
+    strs = [SIStr(fp) for _ in range(header.strNum)]
+    chars = [SIChr(fp) for _ in range(header.chrNum)]
+    bulk = texStrImage(io.BytesIO(out.getvalue()))
+    assert [p.strIndex for p in packs] == [p.strIndex for p in bulk.strpack]
+    assert [s.strIndex for s in strs] == [s.strIndex for s in bulk.str]
+    assert [vars(c) for c in chars] == [vars(c) for c in bulk.chb]
+
+def test_truncated_table():
+    out = io.BytesIO()
+    make_strimage().write(out)
+    with pytest.raises(AssertionError, match='Size mismatch'):
+        texStrImage(io.BytesIO(out.getvalue()[:32 + 62 * 7 + 100]))
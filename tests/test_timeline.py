@@ -0,0 +1,120 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from jmbTool import jmbTimeline
+from jmbTool.jmbData import BaseGdat
+from jmbTool.jmbStruct import stJimaku_US, stOneSentence
+
+from conftest import full_write
+
+MODES = ['eager', 'lazy', 'packed']
+
+def _open(path, mode):
+    return BaseGdat.create(str(path), lazy=mode == 'lazy', packed=mode == 'packed')
+
+def _timings(gdat):
+    lines = []
+    for sentence in gdat.sentences:
+        for line in getattr(sentence, 'jimaku_list', [sentence]):
+            lines.append((line.wait, line.disp_time, line.char_data[0] != -1))
+    return lines
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb', 'ja_be.jmb'])
+def test_operations_match_reference(sample_dir, name, mode):
+    path = sample_dir / name
+    before = _timings(BaseGdat.create(str(path)))
+    gdat = _open(path, mode)
+    jmbTimeline.shift(gdat, 480)
+    jmbTimeline.scale(gdat, 0.5, origin=100)
+    expected = [(100 + round((w + 480 - 100) * 0.5), round(d * 0.5), v) if v else (w, d, v)
+                for w, d, v in before]
+    assert _timings(gdat) == expected
+
+    # the written file holds the same timings
+    out = sample_dir.parent / f'{mode}_{name}'
+    out.write_bytes(full_write(gdat))
+    assert _timings(BaseGdat.create(str(out))) == expected
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb'])
+def test_held_sentences_stay_attached(sample_dir, name, mode):
+    gdat = _open(sample_dir / name, mode)
+    sentences = gdat.sentences
+    held = gdat.sentences[1]
+    line = held.jimaku_list[0] if name.startswith('ja') else held
+    wait = line.wait
+    jmbTimeline.shift(gdat, 100)
+    assert gdat.sentences is sentences
+    assert line.wait == wait + 100
+    jmbTimeline.shift(gdat, 100)
+    assert line.wait == wait + 200
+
+    # edits through the held object are still part of gdat
+    line.disp_time = 4321
+    target = gdat.sentences[1].jimaku_list[0] if name.startswith('ja') else gdat.sentences[1]
+    assert target.disp_time == 4321
+    reread = sample_dir.parent / f'held_{mode}_{name}'
+    reread.write_bytes(full_write(gdat))
+    reread = BaseGdat.create(str(reread))
+    line = reread.sentences[1].jimaku_list[0] if name.startswith('ja') else reread.sentences[1]
+    assert (line.wait, line.disp_time) == (wait + 200, 4321)
+
+def _count_codec_calls(monkeypatch) -> list:
+    calls = []
+    for cls in (stJimaku_US, stOneSentence):
+        for method in ('unpack_from', 'pack_into'):
+            original = getattr(cls, method)
+            monkeypatch.setattr(cls, method, lambda self, *args, _f=original, **kwargs:
+                                (calls.append(_f), _f(self, *args, **kwargs))[1])
+    return calls
+
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb'])
+def test_operations_do_not_encode_records(sample_dir, monkeypatch, name):
+    gdat = BaseGdat.create(str(sample_dir / name))
+    calls = _count_codec_calls(monkeypatch)
+    jmbTimeline.shift(gdat, 10)
+    jmbTimeline.retime(gdat, 0, 9600, delta=5, factor=2.0)
+    assert calls == []
+
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb'])
+def test_lazy_operations_decode_nothing(sample_dir, monkeypatch, name):
+    calls = _count_codec_calls(monkeypatch)
+    with BaseGdat.create(str(sample_dir / name), lazy=True) as gdat:
+        for _ in range(3):
+            jmbTimeline.shift(gdat, 10)
+            jmbTimeline.clamp(gdat, 0, min_disp_time=5)
+        assert calls == []
+        assert gdat.sentences.loaded_indices() == []
+
+        # a decoded sentence costs one re-encode per operation, not one per sentence
+        gdat.sentences[2]
+        calls.clear()
+        jmbTimeline.shift(gdat, 10)
+        assert len(calls) == 1
+
+def test_out_of_range_is_rejected(sample_dir):
+    gdat = BaseGdat.create(str(sample_dir / 'us.jmb'))
+    before = _timings(gdat)
+    with pytest.raises(AssertionError):
+        jmbTimeline.shift(gdat, 1 << 31)
+    assert _timings(gdat) == before
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', ['us.jmb', 'ja_nomot.jmb', 'ja_be.jmb'])
+def test_patch_after_operation(sample_copy, name, mode):
+    path = sample_copy(name)
+    gdat = _open(path, mode)
+    jmbTimeline.shift(gdat, 4800)
+    ranges = gdat.dirty_ranges()
+    if mode == 'lazy':
+        assert gdat.sentences.loaded_indices() == []
+    # at most one range per sentence, from its first to its last changed timing
+    assert 0 < len(ranges) <= len(gdat.sentences)
+    assert all(size < len(gdat.sentences[0].pack()) for offset, size in ranges)
+    expected = full_write(gdat)
+    assert gdat.patch_file() is True
+    if mode == 'lazy':
+        gdat.close()
+    assert path.read_bytes() == expected
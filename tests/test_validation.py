@@ -0,0 +1,80 @@
+import io
+
+import pytest
+
+from conftest import JMB_SAMPLES, full_write
+from jmbTool import jmbStruct
+from jmbTool.jmbConst import ValidationLevel
+from jmbTool.jmbStruct import (checkSize, check_struct_sizes, pack_records_into, read_records,
+                               set_validation_level, stFontParam, validation_level)
+
+@pytest.fixture
+def level():
+    """
+    set(level) switches the validation level for one test and restores the previous one
+    """
+    previous = validation_level()
+    yield set_validation_level
+    set_validation_level(previous)
+
+class _Short:
+    STRUCT_SIZE = 4
+
+@checkSize
+def _write_two(self, fp):
+    fp.write(b'\x00\x00')
+
+class _BadFontParam(stFontParam):
+    STRUCT_SIZE = 6
+
+def test_check_size_wraps_plain_functions(level):
+    level(ValidationLevel.STRUCTURAL)
+    _write_two(_Short(), io.BytesIO())
+    level(ValidationLevel.PARANOID)
+    with pytest.raises(AssertionError, match='_write_two'):
+        _write_two(_Short(), io.BytesIO())
+
+def test_record_read_write_checked_only_when_paranoid(level, monkeypatch):
+    monkeypatch.setattr(stFontParam, 'STRUCT_SIZE', 6)
+    level(ValidationLevel.OFF)
+    stFontParam(u=1).write(io.BytesIO())
+    level(ValidationLevel.PARANOID)
+    with pytest.raises(AssertionError, match='Size mismatch in write'):
+        stFontParam(u=1).write(io.BytesIO())
+
+def test_static_check(level):
+    check_struct_sizes()
+    assert stFontParam in set(jmbStruct._size_checked_classes())
+    with pytest.raises(AssertionError, match='_BadFontParam'):
+        check_struct_sizes([_BadFontParam])
+
+def test_bulk_paths_checked_only_when_paranoid(level):
+    data = b''.join(stFontParam(u=i).pack() for i in range(4))
+    buf = bytearray(len(data))
+    level(ValidationLevel.STRUCTURAL)
+    assert len(read_records(io.BytesIO(data), _BadFontParam, 4)) == 4
+    pack_records_into(buf, 0, [_BadFontParam(u=1)])
+    level(ValidationLevel.PARANOID)
+    with pytest.raises(AssertionError, match='unpack_records'):
+        read_records(io.BytesIO(data), _BadFontParam, 4)
+    with pytest.raises(AssertionError, match='pack_records_into'):
+        pack_records_into(buf, 0, [_BadFontParam(u=1)])
+    with pytest.raises(AssertionError, match='pack_records_into'):
+        pack_records_into(buf, len(buf) - 4, [stFontParam(u=1)])
+
+@pytest.mark.parametrize('name', list(JMB_SAMPLES))
+def test_paranoid_gdat_round_trip(level, sample_dir, name):
+    _, gdat_cls, bigEndian = JMB_SAMPLES[name]
+    level(ValidationLevel.PARANOID)
+    with gdat_cls(str(sample_dir / name), bigEndian) as gdat:
+        assert full_write(gdat, validation=False) == (sample_dir / name).read_bytes()
+
+def test_paranoid_write_catches_stale_dds_size(level, sample_dir):
+    _, gdat_cls, bigEndian = JMB_SAMPLES['us.jmb']
+    with gdat_cls(str(sample_dir / 'us.jmb'), bigEndian) as gdat:
+        gdat.tex.dds = gdat.tex.dds + b'\x00' * 4
+        level(ValidationLevel.STRUCTURAL)
+        full_write(gdat, validation=False)
+        level(ValidationLevel.PARANOID)
+        with pytest.raises(AssertionError, match='DDS bytes'):
+            full_write(gdat, validation=False)